@@ -0,0 +1,45 @@
+'''
+Compare the throughput of many small remote calls made one at a time
+with ``Portal.run()`` against batched submission with
+``Portal.run_many()``.
+
+'''
+import time
+
+import trio
+import tractor
+
+
+async def double(x: int) -> int:
+    return x * 2
+
+
+async def main(count: int = 2000) -> None:
+    async with tractor.open_nursery() as n:
+        portal = await n.start_actor(
+            'worker',
+            enable_modules=[__name__],
+        )
+
+        start = time.perf_counter()
+        for x in range(count):
+            assert await portal.run(double, x=x) == x * 2
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await portal.run_many(
+            double,
+            ({'x': x} for x in range(count)),
+        )
+        batched = time.perf_counter() - start
+        assert results == [x * 2 for x in range(count)]
+
+        print(
+            f'run(): {count / serial:.0f} calls/s\n'
+            f'run_many(): {count / batched:.0f} calls/s'
+        )
+        await portal.cancel_actor()
+
+
+if __name__ == '__main__':
+    trio.run(main)
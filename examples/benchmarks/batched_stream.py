@@ -0,0 +1,72 @@
+'''
+Compare the throughput of streaming many small (tick-style) values one
+per msg with ``MsgStream.send()`` against ``MsgStream.send_batch()``
+plus ``MsgStream.receive_many()``.
+
+'''
+import time
+
+import trio
+import tractor
+
+
+@tractor.context
+async def ticker(
+    ctx: tractor.Context,
+    count: int,
+    batch_size: int,
+) -> None:
+    await ctx.started()
+    async with ctx.open_stream() as stream:
+        if batch_size == 1:
+            for i in range(count):
+                await stream.send(i)
+        else:
+            for i in range(0, count, batch_size):
+                await stream.send_batch(
+                    range(i, min(i + batch_size, count)))
+
+
+async def bench(
+    portal: tractor.Portal,
+    count: int,
+    batch_size: int,
+) -> float:
+    start = time.perf_counter()
+    async with (
+        portal.open_context(
+            ticker,
+            count=count,
+            batch_size=batch_size,
+        ) as (ctx, _),
+        ctx.open_stream() as stream,
+    ):
+        received = 0
+        if batch_size == 1:
+            async for _ in stream:
+                received += 1
+        else:
+            while received < count:
+                received += len(await stream.receive_many())
+
+    assert received == count
+    return count / (time.perf_counter() - start)
+
+
+async def main(count: int = 20_000) -> None:
+    async with tractor.open_nursery() as n:
+        portal = await n.start_actor(
+            'ticker',
+            enable_modules=[__name__],
+        )
+        single = await bench(portal, count, 1)
+        batched = await bench(portal, count, 100)
+        print(
+            f'send(): {single:.0f} msgs/s\n'
+            f'send_batch(): {batched:.0f} msgs/s'
+        )
+        await portal.cancel_actor()
+
+
+if __name__ == '__main__':
+    trio.run(main)
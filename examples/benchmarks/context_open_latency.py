@@ -0,0 +1,54 @@
+'''
+Measure the latency of opening (and closing) short-lived inter-actor
+task contexts with and without the single round trip RPC protocol
+(``Portal.fast_rpc``).
+
+'''
+import time
+
+import trio
+import tractor
+
+
+@tractor.context
+async def short_lived(
+    ctx: tractor.Context,
+) -> None:
+    await ctx.started('ready')
+
+
+async def bench(
+    portal: tractor.Portal,
+    fast: bool,
+    count: int,
+) -> float:
+    portal.fast_rpc = fast
+    start = time.perf_counter()
+    for _ in range(count):
+        async with portal.open_context(short_lived) as (ctx, first):
+            assert first == 'ready'
+
+    return (time.perf_counter() - start) / count
+
+
+async def main(count: int = 500) -> None:
+    async with tractor.open_nursery() as n:
+        portal = await n.start_actor(
+            'callee',
+            enable_modules=[__name__],
+        )
+
+        # warm up
+        await bench(portal, True, 10)
+
+        for fast in (False, True):
+            latency = await bench(portal, fast, count)
+            print(
+                f'fast_rpc={fast}: {latency * 1e6:.1f} us per context open'
+            )
+
+        await portal.cancel_actor()
+
+
+if __name__ == '__main__':
+    trio.run(main)
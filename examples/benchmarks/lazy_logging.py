@@ -0,0 +1,46 @@
+'''
+Measure the per msg cost of a (disabled) runtime log call in the hot
+path: an eagerly formatted f-string, which takes the ``repr()`` of the
+msg even though nothing is emitted, against deferred ``%``-style args.
+
+'''
+import time
+
+import tractor
+from tractor.msg import Yield
+
+
+log = tractor.log.get_logger('tractor')
+
+
+def eager(msg: Yield, uid: tuple[str, str], count: int) -> float:
+    start = time.perf_counter()
+    for cid in range(count):
+        log.runtime(f"Delivering {msg} from {uid} to caller {cid}")
+    return time.perf_counter() - start
+
+
+def lazy(msg: Yield, uid: tuple[str, str], count: int) -> float:
+    start = time.perf_counter()
+    for cid in range(count):
+        log.runtime('Delivering %s from %s to caller %s', msg, uid, cid)
+    return time.perf_counter() - start
+
+
+def main(count: int = 20_000) -> None:
+    # the default level, runtime msgs are disabled
+    tractor.log.get_console_log('error')
+    msg = Yield(cid=1, pld={'prices': list(range(100))})
+    uid = ('streamer', 'a7e7a6b8-7e3c-4d4e-a0a4-6a2e0b8b7b9f')
+
+    eager_s = eager(msg, uid, count)
+    lazy_s = lazy(msg, uid, count)
+    print(
+        f'eager: {eager_s / count * 1e9:.0f} ns/msg\n'
+        f'lazy: {lazy_s / count * 1e9:.0f} ns/msg'
+    )
+    assert lazy_s < eager_s
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,7 @@ import pytest
 import trio
 import tractor
 from tractor._exceptions import StreamOverrun
+from tractor.msg import Yield, YieldBatch
 
 from conftest import tractor_test
 
@@ -796,3 +797,409 @@ def test_do_not_swallow_error_before_started_by_remote_contextcancelled():
         trio.run(main)
 
     assert excinfo.value.type == TypeError
+
+
+@tractor.context
+async def send_through_queue(
+    ctx: tractor.Context,
+    count: int,
+) -> int:
+    await ctx.started()
+    async with ctx.open_stream(send_buffer_size=8) as stream:
+        for i in range(count):
+            try:
+                stream.send_nowait(i)
+            except trio.WouldBlock:
+                await stream.send(i)
+
+    # all queued msgs are flushed (before the stop) on stream close
+    return stream.send_stats.sent
+
+
+def test_queued_stream_sends():
+    '''
+    Msgs sent through a stream's send queue arrive in order and are
+    all delivered before the stream is closed.
+
+    '''
+    count = 1000
+
+    async def main():
+        async with tractor.open_nursery() as n:
+            portal = await n.start_actor(
+                'queued_sender',
+                enable_modules=[__name__],
+            )
+            async with portal.open_context(
+                send_through_queue,
+                count=count,
+            ) as (ctx, sent):
+                async with ctx.open_stream() as stream:
+                    assert [msg async for msg in stream] == list(range(count))
+
+            assert await ctx.result() == count
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@tractor.context
+async def send_in_batches(
+    ctx: tractor.Context,
+    count: int,
+    batch_size: int,
+) -> None:
+    await ctx.started()
+    async with ctx.open_stream() as stream:
+        await stream.send_batch([])
+        await stream.send_batch([0])
+        for i in range(1, count, batch_size):
+            await stream.send_batch(range(i, min(i + batch_size, count)))
+
+
+@pytest.mark.parametrize('recv', ['single', 'batch', 'many'])
+def test_batched_stream_sends(recv):
+    '''
+    Values sent with ``MsgStream.send_batch()`` arrive in order whether
+    received one at a time or drained in batches.
+
+    '''
+    count = 1000
+
+    async def main():
+        async with tractor.open_nursery() as n:
+            portal = await n.start_actor(
+                'batch_sender',
+                enable_modules=[__name__],
+            )
+            async with portal.open_context(
+                send_in_batches,
+                count=count,
+                batch_size=50,
+            ) as (ctx, sent):
+                async with ctx.open_stream() as stream:
+                    received = []
+                    if recv == 'single':
+                        received = [msg async for msg in stream]
+                    else:
+                        while True:
+                            try:
+                                if recv == 'batch':
+                                    batch = await stream.receive_batch(7)
+                                    assert 1 <= len(batch) <= 7
+                                else:
+                                    batch = await stream.receive_many()
+                            except trio.EndOfChannel:
+                                break
+                            received.extend(batch)
+
+                    assert received == list(range(count))
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@tractor.context
+async def send_flow_controlled(
+    ctx: tractor.Context,
+    count: int,
+) -> int:
+    await ctx.started()
+    async with ctx.open_stream(flow_control=True) as stream:
+        for i in range(count):
+            await stream.send(i)
+
+        # the batch api is paced by credit too
+        await stream.send_batch([count, count + 1])
+
+        # echo back whatever the caller sends us
+        async for msg in stream:
+            await stream.send(msg)
+
+    return count
+
+
+def test_stream_flow_control():
+    '''
+    A flow controlled stream paces a fast sender to a slow consumer
+    with a tiny buffer such that there are no overruns, in either
+    direction, and buffered msgs never exceed the window.
+
+    '''
+    count = 100
+    window = 4
+
+    async def main():
+        async with tractor.open_nursery() as n:
+            portal = await n.start_actor(
+                'flow_controlled',
+                enable_modules=[__name__],
+            )
+            async with portal.open_context(
+                send_flow_controlled,
+                count=count,
+            ) as (ctx, sent):
+                async with ctx.open_stream(
+                    msg_buffer_size=window,
+                    flow_control=True,
+                ) as stream:
+                    rx_state = ctx._recv_chan._state
+                    received = []
+                    async for msg in stream:
+                        assert len(rx_state.data) < window
+                        received.append(msg)
+                        if msg == count + 1:
+                            break
+
+                        if msg % 10 == 0:
+                            await trio.sleep(0.01)
+
+                    assert received == list(range(count + 2))
+
+                    # the far end's (default) window paces our sends
+                    for i in range(count):
+                        await stream.send(i)
+                        assert await stream.receive() == i
+
+            assert await ctx.result() == count
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@tractor.context
+async def send_quotes(
+    ctx: tractor.Context,
+    count: int,
+    conflate: bool,
+) -> int:
+    await ctx.started()
+    async with ctx.open_stream(
+        conflate=(lambda quote: quote[0]) if conflate else False,
+    ) as stream:
+        # queued without checkpointing so updates of still queued
+        # quotes are conflated (and never block when conflating)
+        for i in range(count):
+            try:
+                stream.send_nowait([f'sym{i % 5}', i])
+            except trio.WouldBlock:
+                await stream.send([f'sym{i % 5}', i])
+
+        await stream.send(['done', count])
+        conflated = (
+            stream.send_stats.conflated if stream.send_stats else 0
+        )
+
+        # wait for the caller to close its end
+        async for _ in stream:
+            pass
+
+    return conflated
+
+
+@pytest.mark.parametrize('side', ['sender', 'receiver'])
+def test_conflated_stream(side):
+    '''
+    A conflating stream end only delivers the latest value per key
+    whether the values are replaced in the sender's queue or the
+    receiver's buffer.
+
+    '''
+    count = 1000
+
+    async def main():
+        async with tractor.open_nursery() as n:
+            portal = await n.start_actor(
+                'quoter',
+                enable_modules=[__name__],
+            )
+            async with portal.open_context(
+                send_quotes,
+                count=count,
+                conflate=side == 'sender',
+            ) as (ctx, sent):
+                async with ctx.open_stream(
+                    conflate=(
+                        (lambda quote: quote[0]) if side == 'receiver'
+                        else False
+                    ),
+                ) as stream:
+                    latest = {}
+                    if side == 'receiver':
+                        # let the quotes pile up in our buffer
+                        await trio.sleep(0.5)
+
+                    async for sym, i in stream:
+                        assert i > latest.get(sym, -1)
+                        latest[sym] = i
+                        if sym == 'done':
+                            break
+
+                    # only the final quote of each symbol made it
+                    assert latest == {
+                        **{f'sym{i % 5}': i for i in range(count - 5, count)},
+                        'done': count,
+                    }
+
+            conflated = await ctx.result()
+            if side == 'sender':
+                assert conflated == count - 5
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+def test_conflation_skips_overrun_msgs():
+    '''
+    A value which overran a conflating stream's buffer is not tracked
+    as buffered such that later values with its key are still
+    delivered instead of being merged into the lost msg.
+
+    '''
+    async def main():
+        async with tractor.open_nursery() as n:
+            portal = await n.start_actor(
+                'overrunner',
+                enable_modules=[__name__],
+            )
+            actor = tractor.current_actor()
+            chan = portal.channel
+
+            # an (unused) cid of a context on our end
+            cid = actor._next_cid(chan)
+            ctx = actor.get_context(chan, cid, msg_buffer_size=1)
+            ctx._backpressure = False
+            ctx._conflate = lambda quote: quote[0]
+            ctx._buffered = {}
+
+            async def push(quote):
+                await actor._push_result(chan, cid, Yield(cid=cid, pld=quote))
+
+            await push(['a', 0])
+
+            # overruns the (full) buffer, the far end is sent an error
+            await push(['b', 0])
+            assert list(ctx._buffered) == ['a']
+
+            msg = ctx._recv_chan.receive_nowait()
+            ctx._consumed_msg(msg)
+            assert msg.pld == ['a', 0]
+
+            await push(['b', 1])
+            assert ctx._recv_chan.receive_nowait().pld == ['b', 1]
+
+            actor._release_context(chan.uid, cid)
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@tractor.context
+async def echo_with_flow_control(
+    ctx: tractor.Context,
+    flow_control: bool,
+    count: int,
+) -> None:
+    await ctx.started()
+    async with ctx.open_stream(flow_control=flow_control) as stream:
+        # once the caller's first msg arrives any grant it sent
+        # ahead of it has been too.
+        assert await stream.receive() == 'go'
+        await stream.send_batch(range(count))
+        async for msg in stream:
+            await stream.send(msg)
+
+
+@pytest.mark.parametrize(
+    'callee_flow_control', [True, False], ids=['callee', 'caller'],
+)
+def test_stream_flow_control_one_end(callee_flow_control):
+    '''
+    Flow control enabled on only one end of a stream is enabled on
+    both such that neither end deadlocks waiting for credit (values
+    sent before the switch are charged to the window) and a batch is
+    paced per value to the receiver's window.
+
+    '''
+    count = 20
+    window = 4
+
+    def buffered(msgs) -> int:
+        return sum(
+            len(m.plds) if isinstance(m, YieldBatch) else 1
+            for m in msgs
+        )
+
+    async def main():
+        async with tractor.open_nursery() as n:
+            portal = await n.start_actor(
+                'flow_control_one_end',
+                enable_modules=[__name__],
+            )
+            with trio.fail_after(10):
+                async with portal.open_context(
+                    echo_with_flow_control,
+                    flow_control=callee_flow_control,
+                    count=count,
+                ) as (ctx, sent):
+                    async with ctx.open_stream(
+                        msg_buffer_size=window,
+                        flow_control=not callee_flow_control,
+                    ) as stream:
+                        await stream.send('go')
+                        rx_state = ctx._recv_chan._state
+                        received = []
+                        while len(received) < count:
+                            await trio.sleep(0.01)
+                            assert buffered(rx_state.data) <= window
+                            received.extend(await stream.receive_batch())
+
+                        assert received == list(range(count))
+                        assert ctx._flow_control
+
+                        for i in range(count):
+                            await stream.send(i)
+                            assert await stream.receive() == i
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+async def not_a_context_func() -> None:
+    pass
+
+
+@pytest.mark.parametrize('fast_rpc', [True, False])
+def test_context_open_started_is_first_response(fast_rpc):
+    '''
+    With ``Portal.fast_rpc`` the callee's ``started`` value is its first
+    response and the remote function type is validated by the callee.
+
+    '''
+    async def main():
+        async with tractor.open_nursery() as n:
+            portal = await n.start_actor(
+                'callee',
+                enable_modules=[__name__],
+            )
+            portal.fast_rpc = fast_rpc
+            for _ in range(3):
+                async with portal.open_context(
+                    simple_setup_teardown,
+                    data=10,
+                ) as (ctx, sent):
+                    assert sent == 11
+                assert await ctx.result() == 'yo'
+
+            if fast_rpc:
+                with pytest.raises(tractor.RemoteActorError) as excinfo:
+                    async with portal.open_context(not_a_context_func):
+                        pass
+                assert excinfo.value.type is TypeError
+
+            await portal.cancel_actor()
+
+    trio.run(main)
@@ -6,12 +6,13 @@ import signal
 import platform
 from functools import partial
 import itertools
+import uuid
 
 import pytest
 import tractor
 import trio
 
-from conftest import tractor_test
+from conftest import tractor_test, no_windows
 
 
 @tractor_test
@@ -91,6 +92,76 @@ async def test_trynamic_trio(func, start_method, arb_addr):
         print("CUTTTT CUUTT CUT!!?! Donny!! You're supposed to say...")
 
 
+async def get_parent_transport() -> str:
+    chan = tractor.current_actor()._parent_chan
+    return type(chan.msgstream).__name__
+
+
+@no_windows
+def test_uds_transport_same_host(arb_addr, start_method):
+    '''
+    Verify a ``msg_transport='uds'`` actor tree connects children back
+    to their parent over a unix domain socket and that the registrar
+    hands out UDS addresses to same-host peers.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+            msg_transport='uds',
+        ) as n:
+            portal = await n.start_actor(
+                'uds_actor',
+                enable_modules=[__name__],
+            )
+            assert type(portal.channel.msgstream).__name__ == (
+                'MsgpackUDSStream')
+            assert await portal.run(get_parent_transport) == (
+                'MsgpackUDSStream')
+
+            async with tractor.find_actor('uds_actor') as fportal:
+                assert len(fportal.channel.raddr) == 1
+                assert await fportal.run(hi) == the_line.format('uds_actor')
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@no_windows
+def test_uds_bind_failure_falls_back_to_tcp(arb_addr, monkeypatch):
+    '''
+    An actor which can't bind its UDS path (eg. one exceeding
+    ``sun_path``) still starts and serves tcp only, while tcp only
+    actors never bind one.
+
+    '''
+    monkeypatch.setattr(
+        tractor._runtime,
+        'get_uds_path',
+        lambda uid: '/tmp/' + 'x' * 200 + '.sock',
+    )
+
+    async def main():
+        async with tractor.open_root_actor(
+            arbiter_addr=arb_addr,
+            msg_transport='uds',
+        ) as actor:
+            assert actor.uds_addr is None
+            assert actor.accept_addr
+
+        async with tractor.open_root_actor(arbiter_addr=arb_addr) as actor:
+            assert actor.uds_addr is None
+
+    trio.run(main)
+
+
+def test_uds_path_fits_sun_path(monkeypatch):
+    monkeypatch.setattr('tempfile.tempdir', '/' + 'd' * 120)
+    path = tractor._ipc.get_uds_path(('a' * 64, str(uuid.uuid4())))
+    assert len(path) <= tractor._ipc._max_uds_path
+
+
 async def stream_forever():
     for i in itertools.count():
         yield i
@@ -0,0 +1,500 @@
+"""
+Msg transport (framing) level tests.
+
+"""
+import struct
+
+import pytest
+import trio
+import tractor
+from tractor._ipc import (
+    Channel,
+    MsgpackTCPStream,
+    negotiate_compression,
+)
+from tractor import msg
+from tractor._exceptions import (
+    StreamOverrun,
+    TransportClosed,
+)
+
+
+@pytest.mark.parametrize(
+    'flush_latency, max_batch_bytes',
+    [(0.01, 2**16), (0.01, 64)],
+    ids=['coalesced', 'batch_size_limited'],
+)
+def test_send_coalescing(flush_latency, max_batch_bytes):
+    '''
+    Concurrently sent msgs are coalesced into fewer writes (bounded by
+    ``max_batch_bytes``) and are each delivered intact and in order.
+
+    '''
+    count = 100
+
+    async def main():
+        a, b = trio.socket.socketpair()
+        tx = MsgpackTCPStream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+        tx.flush_latency = flush_latency
+        tx.max_batch_bytes = max_batch_bytes
+
+        async with trio.open_nursery() as n:
+            for i in range(count):
+                n.start_soon(tx.send, {'i': i, 'pad': 'x' * 10})
+
+            received = [await rx.recv() for _ in range(count)]
+
+        assert sorted(m['i'] for m in received) == list(range(count))
+
+        stats = tx.stats
+        assert stats.msgs == count
+        assert stats.batches < count
+        assert stats.mean_batch_msgs > 1
+        assert stats.max_batch_bytes <= max_batch_bytes
+
+        # msgs sent from one task keep their order
+        msgs = [{'i': i} for i in range(count)]
+        for m in msgs:
+            await tx.send(m)
+        assert [await rx.recv() for _ in range(count)] == msgs
+
+        await tx.stream.aclose()
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+def test_recv_batch_decoding():
+    '''
+    All complete frames available in a single read are decoded as one
+    batch while partially received (and larger then a read chunk)
+    frames are buffered until complete.
+
+    '''
+    async def main():
+        a, b = trio.socket.socketpair()
+        tx = MsgpackTCPStream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+        rx.recv_chunk_size = 2**10
+
+        msgs = [{'i': i} for i in range(10)]
+        frames = b''.join(
+            struct.pack('<I', len(data)) + data
+            for data in map(tx.encode, msgs)
+        )
+        await tx.stream.send_all(frames)
+        assert await rx.recv_batch() == msgs
+
+        # a frame split over multiple writes (and reads)
+        big = 'x' * 2**16
+        data = tx.encode({'big': big})
+        frame = struct.pack('<I', len(data)) + data
+        await tx.stream.send_all(frame[:2])
+        with trio.move_on_after(0.1) as cs:
+            await rx.recv_batch()
+        assert cs.cancelled_caught
+
+        async with trio.open_nursery() as n:
+            n.start_soon(tx.stream.send_all, frame[2:])
+            assert await rx.recv_batch() == [{'big': big}]
+
+        # per-msg reads consume from the same buffered state
+        await tx.send({'first': 1})
+        await tx.send({'second': 2})
+        assert await rx.recv() == {'first': 1}
+        assert await rx.recv_batch() == [{'second': 2}]
+
+        await tx.stream.aclose()
+        with pytest.raises(TransportClosed):
+            await rx.recv_batch()
+
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+def test_msg_loop_keeps_rest_of_batch():
+    '''
+    Msgs decoded in the same batch as (but after) the msg loop's
+    terminate sentinel are left for the channel's next reader.
+
+    '''
+    from tractor._runtime import process_messages
+
+    async def main():
+        async with tractor.open_root_actor() as actor:
+            a, b = trio.socket.socketpair()
+            tx = MsgpackTCPStream(trio.SocketStream(a))
+            chan = Channel.from_stream(trio.SocketStream(b))
+            chan.uid = ('peer', 'uuid')
+
+            msgs = [None, {'after': 1}, {'after': 2}]
+            await tx.stream.send_all(b''.join(
+                struct.pack('<I', len(data)) + data
+                for data in map(tx.encode, msgs)
+            ))
+            assert await process_messages(actor, chan) is False
+            assert await chan.recv_batch() == msgs[1:]
+
+            await tx.stream.aclose()
+            await chan.aclose()
+
+    trio.run(main)
+
+
+def test_typed_msgs_roundtrip():
+    '''
+    Runtime protocol msgs are decoded back into their tagged struct
+    types while plain dict payloads and the ``None`` sentinel pass
+    through unchanged.
+
+    '''
+    msgs = [
+        msg.Handshake(uid=('a', 'b'), caps={'shm': False}),
+        msg.Cmd(cid=1, ns='mod', func='f', kwargs={'x': 1}, uid=('a', 'b')),
+        msg.FuncType(cid=1, functype='asyncfunc'),
+        msg.Started(cid=1, pld=[1, 'two']),
+        msg.Yield(cid=1, pld={'nested': [None]}),
+        msg.Stop(cid=1),
+        msg.Return(cid=1, pld=None),
+        msg.Error(type_str='KeyError', tb_str='tb', cid=None),
+        {'bind_host': '127.0.0.1'},
+        None,
+    ]
+
+    async def main():
+        a, b = trio.socket.socketpair()
+        tx = MsgpackTCPStream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+
+        for m in msgs:
+            await tx.send(m)
+
+        for m in msgs:
+            received = await rx.recv()
+            assert received == m
+            assert type(received) is type(m)
+
+        await tx.stream.aclose()
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+@pytest.mark.parametrize('codec', ['zlib', 'lzma'])
+def test_frame_compression(codec):
+    '''
+    Msgs at or above the compression threshold are sent compressed and
+    flagged as such while smaller ones are sent raw; the per-transport
+    counters track both.
+
+    '''
+    async def main():
+        a, b = trio.socket.socketpair()
+        tx = MsgpackTCPStream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+        tx.set_compression(codec)
+        tx.compress_threshold = 2**10
+
+        small = {'small': 'x'}
+        big = {'big': 'y' * 2**16}
+        await tx.send(small)
+        await tx.send(big)
+        assert await rx.recv() == small
+        assert await rx.recv() == big
+
+        cstats = tx.compression_stats
+        assert cstats.raw_msgs == 1
+        assert cstats.compressed_msgs == 1
+        assert cstats.compressed_out < cstats.compressed_in
+        assert cstats.ratio > 1
+
+        assert rx.compression_stats.decompressed_msgs == 1
+        assert rx.compression_stats.decompressed_out == cstats.compressed_in
+
+        await tx.stream.aclose()
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+@pytest.mark.parametrize('codec', [None, 'zlib'])
+def test_chunked_framing(codec):
+    '''
+    Msgs larger then the transport's ``chunk_size`` are sent as chunk
+    frames which are reassembled on receipt and between which frames of
+    concurrently sent msgs are interleaved.
+
+    '''
+    async def main():
+        a, b = trio.socket.socketpair()
+        tx = MsgpackTCPStream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+        tx.chunk_size = 2**12
+        tx.set_compression(codec)
+        tx.compress_threshold = 2**10
+
+        big = {'big': [str(i) for i in range(2**14)]}
+        small = {'small': 'x'}
+
+        async with trio.open_nursery() as n:
+            n.start_soon(tx.send, big)
+            n.start_soon(tx.send, small)
+
+            # the small msg is not stuck behind the big one
+            assert await rx.recv() == small
+            assert await rx.recv() == big
+
+        assert tx.stats.chunked_msgs == 1
+        assert tx.stats.msgs > len(tx.encode(big)) // tx.chunk_size
+        assert not rx._chunked
+
+        if codec:
+            assert tx.compression_stats.compressed_msgs > 1
+        else:
+            assert tx.compression_stats.compressed_msgs == 0
+
+        await tx.stream.aclose()
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+def test_control_lane_priority():
+    '''
+    Control msgs are written ahead of bulk frames already queued behind
+    a blocked write instead of waiting their turn.
+
+    '''
+    count = 50
+
+    async def main():
+        a, b = trio.socket.socketpair()
+        tx = MsgpackTCPStream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+
+        assert msg.is_control_msg(msg.Stop(cid=1))
+        assert msg.is_control_msg(msg.Error(type_str='KeyError'))
+        assert msg.is_control_msg(
+            msg.Cmd(cid=1, ns='self', func='cancel', kwargs={}, uid=('a', 'b'))
+        )
+        assert not msg.is_control_msg(msg.Yield(cid=1, pld=1))
+
+        async with trio.open_nursery() as n:
+            # saturate the socket such that frames pile up in the queue
+            for i in range(count):
+                n.start_soon(
+                    tx.send,
+                    msg.Yield(cid=1, pld=[i, 'x' * 2**16]),
+                )
+            await trio.sleep(0.1)
+
+            n.start_soon(tx.send, msg.Stop(cid=1))
+            await trio.sleep(0.1)
+
+            received = [await rx.recv() for _ in range(count + 1)]
+
+        index = received.index(msg.Stop(cid=1))
+        assert index < count // 2
+        assert tx.stats.priority_msgs == 1
+
+        await tx.stream.aclose()
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+def test_send_queues():
+    '''
+    Per-cid send queues are drained round-robin by the channel's writer
+    task and apply their overflow policy when full.
+
+    '''
+    async def main():
+        a, b = trio.socket.socketpair()
+        chan = Channel.from_stream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+
+        async with trio.open_nursery() as n:
+            q1 = chan.open_send_queue(1, n, maxlen=4)
+            q2 = chan.open_send_queue(2, n, maxlen=4)
+            for i in range(4):
+                q1.send_nowait({'1': i})
+            with pytest.raises(trio.WouldBlock):
+                q1.send_nowait({'1': 4})
+
+            for i in range(4):
+                q2.send_nowait({'2': i})
+
+            assert q1.stats.depth == 4
+            received = [await rx.recv() for _ in range(8)]
+            assert [list(m)[0] for m in received] == ['1', '2'] * 4
+            assert [m['1'] for m in received if '1' in m] == list(range(4))
+
+            await q1.flush()
+            await q2.flush()
+            assert chan.send_queue_stats()[1].sent == 4
+            assert q1.stats.depth == 0
+            assert q1.stats.max_depth == 4
+
+            # a full queue makes (only) its async sender wait
+            for i in range(4):
+                q1.send_nowait({'1': i})
+            await q1.send({'1': 4})
+            assert q1.stats.blocked == 1
+            assert [await rx.recv() for _ in range(5)] == [
+                {'1': i} for i in range(5)
+            ]
+
+            dropper = chan.open_send_queue(
+                3, n, maxlen=2, overflow='drop_oldest')
+            for i in range(5):
+                dropper.send_nowait({'i': i})
+            assert dropper.stats.dropped == 3
+            assert [await rx.recv() for _ in range(2)] == [{'i': 3}, {'i': 4}]
+
+            raiser = chan.open_send_queue(
+                4, n, maxlen=1, overflow='raise')
+            raiser.send_nowait({'i': 0})
+            with pytest.raises(StreamOverrun):
+                await raiser.send({'i': 1})
+            assert await rx.recv() == {'i': 0}
+
+            chan.close_send_queue(1)
+            assert 1 not in chan.send_queue_stats()
+
+            # an unsendable msg is refused up front
+            with pytest.raises(TypeError):
+                q2.send_nowait(object())
+            await q2.flush()
+
+            # msgs are sent as they were when queued
+            payload = {'i': 5}
+            await dropper.send(payload)
+            payload['i'] = 6
+            assert await rx.recv() == {'i': 5}
+
+        await chan.aclose()
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+def test_compression_negotiation():
+    '''
+    The connecting side's codec preference wins, falling back to the
+    accepting side's, and only codecs supported by both are chosen.
+
+    '''
+    def caps(want, codecs=('zlib', 'lzma')):
+        return {'want': list(want), 'codecs': list(codecs)}
+
+    # both sides compute the same result
+    client, server = caps(['lzma']), caps(['zlib'])
+    assert negotiate_compression(client, server, accepted=False) == 'lzma'
+    assert negotiate_compression(server, client, accepted=True) == 'lzma'
+
+    # only the accepting side wants compression
+    client, server = caps([]), caps(['zlib'])
+    assert negotiate_compression(client, server, accepted=False) == 'zlib'
+    assert negotiate_compression(server, client, accepted=True) == 'zlib'
+
+    # unsupported by the peer
+    client, server = caps(['snappy', 'zlib'], ['snappy', 'zlib']), caps([])
+    assert negotiate_compression(client, server, accepted=False) == 'zlib'
+
+    # neither side wants it
+    assert negotiate_compression(caps([]), caps([]), accepted=False) is None
+
+
+def test_oob_buffers():
+    '''
+    ``OOBBuffer`` wrapped (and numpy array) payloads are sent out of band
+    and delivered as views of the memory they were received into,
+    including buffers too large to be received in a single read. Those
+    below the ``oob_threshold`` are encoded inline.
+
+    '''
+    np = pytest.importorskip('numpy')
+
+    async def main():
+        a, b = trio.socket.socketpair()
+        tx = MsgpackTCPStream(trio.SocketStream(a))
+        rx = MsgpackTCPStream(trio.SocketStream(b))
+
+        small = b'x' * 10
+        big = bytearray(range(256)) * 2**14  # 4MB
+        arr = np.arange(2**16, dtype='<f8').reshape(2**8, 2**8)
+
+        async def send():
+            await tx.send(
+                msg.Yield(cid=1, pld=[
+                    msg.OOBBuffer(small),
+                    msg.OOBBuffer(big),
+                    arr,
+                ]),
+            )
+            await tx.send({'after': True})
+            await tx.send(
+                msg.Yield(cid=1, pld=[msg.OOBBuffer(small), arr[0]]),
+            )
+
+        async with trio.open_nursery() as n:
+            n.start_soon(send)
+
+            first = await rx.recv()
+            assert isinstance(first, msg.Yield)
+            rsmall, rbig, rarr = first.pld
+
+            assert isinstance(rsmall, memoryview)
+            assert rsmall == small
+            assert rbig == big
+            assert isinstance(rarr, np.ndarray)
+            assert rarr.dtype == arr.dtype
+            assert (rarr == arr).all()
+
+            # msgs after an oob frame are framed correctly
+            assert await rx.recv() == {'after': True}
+
+            # small buffers don't need an oob frame
+            rsmall, rrow = (await rx.recv()).pld
+            assert rsmall == small
+            assert (rrow == arr[0]).all()
+            rrow[0] = 1
+            assert tx.stats.oob_msgs == 1
+
+        await tx.stream.aclose()
+        await rx.stream.aclose()
+
+    trio.run(main)
+
+
+async def oob_echo(data: memoryview) -> msg.OOBBuffer:
+    assert isinstance(data, memoryview)
+    return msg.OOBBuffer(data)
+
+
+def test_oob_buffers_through_portal(arb_addr, start_method):
+    '''
+    Out-of-band buffers are supported as RPC args and results.
+
+    '''
+    payload = bytes(range(256)) * 2**12
+
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'oob_echoer',
+                enable_modules=[__name__],
+            )
+            result = await portal.run(
+                oob_echo,
+                data=msg.OOBBuffer(payload),
+            )
+            assert result == payload
+            await portal.cancel_actor()
+
+    trio.run(main)
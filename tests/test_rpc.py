@@ -1,8 +1,10 @@
 """
 RPC related
 """
+from functools import partial
 import itertools
 
+from async_generator import aclosing
 import pytest
 import tractor
 import trio
@@ -120,3 +122,612 @@ def test_rpc_errors(arb_addr, to_call, testdir):
 
         if getattr(value, 'type', None):
             assert value.type is inside_err
+
+
+async def big_payload(size: int) -> str:
+    return 'x' * size
+
+
+def test_negotiated_compression(arb_addr, start_method):
+    '''
+    A codec requested by the root actor is negotiated with its child and
+    used for (only) large results.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+            compression='zlib',
+        ) as n:
+            portal = await n.start_actor(
+                'compressor',
+                enable_modules=[__name__],
+            )
+            msgstream = portal.channel.msgstream
+            assert msgstream.compression == 'zlib'
+
+            assert await portal.run(big_payload, size=8) == 'x' * 8
+            cstats = msgstream.compression_stats
+            assert cstats.decompressed_msgs == 0
+
+            size = 2**17
+            assert await portal.run(big_payload, size=size) == 'x' * size
+            assert cstats.decompressed_msgs == 1
+            assert cstats.decompressed_out > size
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+async def count_up(limit: int):
+    for i in range(limit):
+        yield i
+
+
+async def msgs_sent_to_parent() -> int:
+    chan = tractor.current_actor()._parent_chan
+    return chan.msgstream.compression_stats.raw_msgs
+
+
+def test_single_frame_asyncfunc_responses(arb_addr, start_method):
+    '''
+    ``Portal.run()`` calls are answered with just the result msg (no
+    leading functype msg) and endpoints of the wrong type are rejected
+    by the callee.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'responder',
+                enable_modules=[__name__],
+            )
+            # the previous call's result is the only msg sent since
+            first = await portal.run(msgs_sent_to_parent)
+            assert await portal.run(msgs_sent_to_parent) == first + 1
+
+            with pytest.raises(tractor.RemoteActorError) as excinfo:
+                await portal.run_from_ns(__name__, 'count_up', limit=3)
+            assert excinfo.value.type is TypeError
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+async def alloc_cids(n: int) -> list[int]:
+    actor = tractor.current_actor()
+    return [actor._next_cid(actor._parent_chan) for _ in range(n)]
+
+
+def test_compact_cids(arb_addr, start_method):
+    '''
+    Call ids are small integers allocated per actor such that the cids
+    of tasks requested by either side of a channel never collide.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'allocator',
+                enable_modules=[__name__],
+            )
+            actor = tractor.current_actor()
+            ours = [actor._next_cid(portal.channel) for _ in range(8)]
+            theirs = await portal.run(alloc_cids, n=8)
+
+            assert all(isinstance(cid, int) for cid in ours + theirs)
+            assert len(set(ours)) == len(ours)
+            assert not set(ours) & set(theirs)
+            assert {cid % 2 for cid in ours} != {cid % 2 for cid in theirs}
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+async def live_contexts() -> int:
+    return tractor.current_actor().context_stats().live
+
+
+@tractor.context
+async def started_and_done(ctx: tractor.Context) -> None:
+    await ctx.started()
+
+
+def test_context_table_released(arb_addr, start_method):
+    '''
+    Task contexts are dropped from the runtime's table on both sides
+    once a context completes, and contexts orphaned by a disconnected
+    channel are swept.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'releaser',
+                enable_modules=[__name__],
+            )
+            actor = tractor.current_actor()
+            live = actor.context_stats().live
+            released = actor.context_stats().released
+
+            for _ in range(5):
+                async with portal.open_context(started_and_done) as (ctx, _):
+                    await ctx.result()
+
+            stats = actor.context_stats()
+            assert stats.live == live
+            assert stats.released >= released + 5
+
+            # the callee releases its side just after sending the result
+            with trio.fail_after(1):
+                while await portal.run(live_contexts):
+                    await trio.sleep(0.01)
+
+            # a context left behind on a dead channel is swept on the
+            # second sweep which finds it
+            chan = tractor.Channel(destaddr=None)
+            chan.uid = ('dead', 'peer')
+            actor.get_context(chan, 1)
+            assert actor._sweep_contexts() == 0
+            assert actor._sweep_contexts() == 1
+            assert actor.context_stats().swept == 1
+            assert actor.context_stats().live == live
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@pytest.mark.parametrize('fast_rpc', [True, False])
+def test_unary_calls_use_reply_slots(arb_addr, start_method, fast_rpc):
+    '''
+    ``Portal.run()`` calls allocate no task context on either side and
+    their reply slot is released once the result arrives or the caller
+    is cancelled.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'replier',
+                enable_modules=[__name__],
+            )
+            portal.fast_rpc = fast_rpc
+            actor = tractor.current_actor()
+            created = actor.context_stats().created
+
+            for _ in range(10):
+                await portal.run(short_sleep)
+
+            # the remote task keeps running but the caller is done
+            with trio.move_on_after(0.1):
+                await portal.run(
+                    sleep_back_actor,
+                    actor_name=None,
+                    func_name=None,
+                    func_defined=None,
+                    exposed_mods=None,
+                )
+
+            stats = actor.context_stats()
+            assert stats.created == created
+            assert stats.pending_replies == 0
+            assert await portal.run(live_contexts) == 0
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@tractor.rpc(inline=True)
+async def inline_task_name(delay: float = 0) -> str:
+    if delay:
+        await trio.sleep(delay)
+    return trio.lowlevel.current_task().name
+
+
+@tractor.rpc(inline=True)
+async def inline_error() -> None:
+    raise ValueError('inline')
+
+
+def test_inline_rpc(arb_addr, start_method):
+    '''
+    ``@tractor.rpc(inline=True)`` endpoints run in the callee's msg
+    loop task until a call overruns the inline budget after which they
+    are spawned as normal rpc tasks.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'inliner',
+                enable_modules=[__name__],
+            )
+            assert 'process_messages' in await portal.run(inline_task_name)
+
+            with pytest.raises(tractor.RemoteActorError) as excinfo:
+                await portal.run(inline_error)
+            assert excinfo.value.type is ValueError
+
+            # sleeps past the budget so is aborted, run in a task and
+            # demoted
+            assert await portal.run(
+                inline_task_name, delay=0.1) == 'inline_task_name'
+            assert await portal.run(inline_task_name) == 'inline_task_name'
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+def test_slow_inline_rpc_does_not_block_cancel(arb_addr, start_method):
+    '''
+    An inline call which overruns its budget is moved out of the msg
+    loop such that a (concurrent) cancel request is still handled.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'inliner',
+                enable_modules=[__name__],
+            )
+            async with trio.open_nursery() as tn:
+                tn.start_soon(
+                    partial(portal.run, inline_task_name, delay=float('inf')))
+                await trio.sleep(0.1)
+
+                with trio.fail_after(1):
+                    assert await portal.cancel_actor()
+
+                # unary callers are not sent a reply by a cancelled actor
+                tn.cancel_scope.cancel()
+
+    trio.run(main)
+
+
+def test_inline_rpc_requires_async_func():
+    with pytest.raises(TypeError):
+        @tractor.rpc(inline=True)
+        def not_async():
+            pass
+
+
+async def endpoint_kinds() -> dict[str, str]:
+    table = tractor.current_actor()._rpc_table
+    return {
+        name: table[(__name__, name)].kind
+        for name in (
+            'short_sleep',
+            'count_up',
+            'started_and_done',
+            'inline_task_name',
+        )
+    }
+
+
+def test_precompiled_dispatch_table(arb_addr, start_method):
+    '''
+    Functions of enabled modules are compiled into the actor's rpc
+    dispatch table at module load time.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'dispatcher',
+                enable_modules=[__name__],
+            )
+            assert await portal.run(endpoint_kinds) == {
+                'short_sleep': 'asyncfunc',
+                'count_up': 'asyncgen',
+                'started_and_done': 'context',
+                'inline_task_name': 'asyncfunc',
+            }
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+async def add(x: int, y: int) -> int:
+    return x + y
+
+
+def test_bound_remote_funcs(arb_addr, start_method):
+    '''
+    ``Portal.bind()`` handles can be called repeatedly for each remote
+    function type and reject use as the wrong type.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'bound',
+                enable_modules=[__name__],
+            )
+            radd = portal.bind(add)
+            assert (radd.ns, radd.name) == (__name__, 'add')
+            for i in range(10):
+                assert await radd(x=i, y=1) == i + 1
+
+            rcount = portal.bind(count_up)
+            async with rcount.open_stream(limit=3) as stream:
+                assert [i async for i in stream] == [0, 1, 2]
+
+            rctx = portal.bind(started_and_done)
+            async with rctx.open_context() as (ctx, first):
+                assert first is None
+                await ctx.result()
+
+            with pytest.raises(TypeError):
+                await rcount(limit=3)
+
+            with pytest.raises(TypeError):
+                radd.open_stream(x=1, y=2)
+
+            with pytest.raises(TypeError):
+                portal.bind(lambda: None)
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+async def maybe_fail(x: int) -> int:
+    if x == 13:
+        raise ValueError(x)
+    await trio.sleep(0.001 * (x % 3))
+    return x * 2
+
+
+def test_batched_calls(arb_addr, start_method):
+    '''
+    ``Portal.run_many()`` and ``.map()`` batch calls into a few msgs
+    and deliver results in order, raising per call errors when reached.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'batcher',
+                enable_modules=[__name__],
+            )
+            stats = portal.channel.msgstream.compression_stats
+            sent_before = stats.raw_msgs
+
+            # with the whole batch in flight the number of sent msgs
+            # doesn't depend on how results are streamed back.
+            xs = [x for x in range(500) if x != 13]
+            assert await portal.run_many(
+                maybe_fail,
+                ({'x': x} for x in xs),
+                max_in_flight=len(xs),
+                batch_size=50,
+            ) == [x * 2 for x in xs]
+
+            # the open, started, 10 batches and the stop
+            assert stats.raw_msgs - sent_before < 20
+
+            # a window smaller than the batch is refilled as results
+            # arrive
+            assert await portal.run_many(
+                maybe_fail,
+                ({'x': x} for x in xs),
+                max_in_flight=100,
+                batch_size=50,
+            ) == [x * 2 for x in xs]
+
+            results = []
+            with pytest.raises(tractor.RemoteActorError) as excinfo:
+                async with aclosing(
+                    portal.map(maybe_fail, ({'x': x} for x in range(20)))
+                ) as agen:
+                    async for result in agen:
+                        results.append(result)
+
+            assert excinfo.value.type is ValueError
+            assert results == [x * 2 for x in range(13)]
+
+            assert await portal.run_many(maybe_fail, []) == []
+
+            with pytest.raises(TypeError):
+                await portal.run_many(count_up, [{'limit': 1}])
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+_running: dict[str, int] = {}
+_max_running: dict[str, int] = {}
+
+
+async def track_running(key: str, delay: float) -> None:
+    _running[key] = _running.get(key, 0) + 1
+    _max_running[key] = max(_max_running.get(key, 0), _running[key])
+    try:
+        await trio.sleep(delay)
+    finally:
+        _running[key] -= 1
+
+
+async def gated_sleep(delay: float) -> None:
+    await track_running('gated', delay)
+
+
+@tractor.rpc(max_concurrency=1)
+async def serial_sleep(delay: float) -> None:
+    await track_running('serial', delay)
+
+
+@tractor.rpc(inline=True)
+async def rpc_load() -> dict:
+    stats = tractor.current_actor().rpc_load_stats()
+    return {
+        'max_running': _max_running,
+        'admitted': stats.admitted,
+        'rejected': stats.rejected,
+        'waited': stats.waited,
+        'max_queued': stats.max_queued,
+        'queued': stats.queued,
+        'running': stats.running,
+    }
+
+
+def test_rpc_admission_control(arb_addr, start_method):
+    '''
+    Requests beyond an actor's ``rpc_concurrency`` are queued, those
+    beyond its ``rpc_queue_size`` are refused with ``Overloaded`` and
+    ``@rpc(max_concurrency=n)`` funcs run at most ``n`` at a time.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'admitter',
+                enable_modules=[__name__],
+                rpc_concurrency=2,
+                rpc_queue_size=3,
+            )
+            async with trio.open_nursery() as tn:
+                for _ in range(5):
+                    tn.start_soon(
+                        partial(portal.run, gated_sleep, delay=0.1))
+
+            load = await portal.run(rpc_load)
+            assert load['max_running'] == {'gated': 2}
+            assert load['max_queued'] == 3
+            assert load['waited'] == 3
+
+            with pytest.raises(tractor.RemoteActorError) as excinfo:
+                async with trio.open_nursery() as tn:
+                    for _ in range(5):
+                        tn.start_soon(
+                            partial(portal.run, gated_sleep, delay=0.1))
+
+                    # wait for the queue to fill up
+                    await trio.sleep(0.05)
+                    await portal.run(gated_sleep, delay=0)
+
+            assert excinfo.value.type is tractor.Overloaded
+
+            # let the abandoned (not remotely cancelled) calls complete
+            await trio.sleep(0.3)
+
+            async with trio.open_nursery() as tn:
+                for _ in range(3):
+                    tn.start_soon(
+                        partial(portal.run, serial_sleep, delay=0.05))
+
+            load = await portal.run(rpc_load)
+            assert load['max_running']['serial'] == 1
+            assert load['rejected'] == 1
+            assert load['admitted'] == 13
+            assert load['queued'] == load['running'] == 0
+
+            await portal.cancel_actor()
+
+    trio.run(main)
+
+
+@tractor.rpc(inline=True)
+async def rpc_tasks_per_chan() -> list[int]:
+    actor = tractor.current_actor()
+    return [
+        # less this (registered) inline call
+        sum(
+            actor._rpc_tasks[(chan, cid)][1] is not rpc_tasks_per_chan
+            for cid in cids
+        )
+        for chan, cids in actor._rpc_tasks_by_chan.items()
+    ]
+
+
+_exiting: int = 0
+_max_exiting: int = 0
+
+
+async def slow_to_exit() -> None:
+    global _exiting, _max_exiting
+    try:
+        await trio.sleep_forever()
+    finally:
+        _exiting += 1
+        _max_exiting = max(_max_exiting, _exiting)
+        with trio.CancelScope(shield=True):
+            await trio.sleep(0.05)
+        _exiting -= 1
+
+
+@tractor.rpc(inline=True)
+async def exit_stats() -> list[int]:
+    return [_exiting, _max_exiting]
+
+
+def test_cancel_rpc_tasks_in_batch(arb_addr, start_method):
+    '''
+    Rpc tasks are indexed by channel and all those requested over
+    a channel are cancelled concurrently when it disconnects: every
+    task is cancelled before the first has exited.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+        ) as n:
+            portal = await n.start_actor(
+                'sleeper',
+                enable_modules=[__name__],
+            )
+            actor = tractor.current_actor()
+            async with tractor.wait_for_actor('sleeper') as other:
+                for _ in range(100):
+                    await actor.start_remote_task(
+                        other.channel,
+                        __name__,
+                        'slow_to_exit',
+                        {},
+                        expect_functype='asyncfunc',
+                    )
+
+                with trio.fail_after(3):
+                    while 100 not in await portal.run(rpc_tasks_per_chan):
+                        await trio.sleep(0.01)
+
+                # signal the far end msg loop to terminate, which
+                # cancels all tasks requested over the channel.
+                await other.channel.send(None)
+
+                # sequential cancellation would take 100 * 0.05s and
+                # never have more than one task exiting at once.
+                with trio.fail_after(2):
+                    while await portal.run(exit_stats) != [0, 100]:
+                        await trio.sleep(0.01)
+
+            await portal.cancel_actor()
+
+    trio.run(main)
@@ -71,3 +71,34 @@ async def test_lifetime_stack_wipes_tmpfile(
     # tmp file should have been wiped by
     # teardown stack.
     assert not child_tmp_file.exists()
+
+
+def test_lazy_log_args(caplog):
+    '''
+    Args to custom level log methods are only formatted when a record
+    is emitted and records point at the calling line.
+
+    '''
+    class Payload:
+        reprs: int = 0
+
+        def __repr__(self) -> str:
+            Payload.reprs += 1
+            return 'payload'
+
+    log = tractor.log.get_logger('tractor.test')
+    with caplog.at_level('ERROR', logger=log.logger.name):
+        log.runtime('Delivering %s', Payload())
+        log.transport('Received %s', Payload())
+
+    assert Payload.reprs == 0
+    assert not caplog.records
+
+    with caplog.at_level(5, logger=log.logger.name):
+        log.runtime('Delivering %s', Payload())
+
+    # formatted (possibly once per handler) on emit
+    assert Payload.reprs
+    record, = caplog.records
+    assert record.getMessage() == 'Delivering payload'
+    assert record.filename == 'test_runtime.py'
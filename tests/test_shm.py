@@ -0,0 +1,157 @@
+"""
+Shared memory ring-buffer transport testing.
+
+"""
+import pytest
+import trio
+import trio.testing
+import tractor
+from tractor._shm import (
+    RingBuffer,
+    RingBufferStream,
+    MsgpackShmStream,
+)
+
+from conftest import no_windows
+
+
+def test_ring_buffer_wraps():
+    '''
+    Verify writes and reads which straddle the end of the ring are
+    delivered intact and in order.
+
+    '''
+    tx = RingBuffer.create(size=16)
+    rx = RingBuffer.attach(tx.name, size=16)
+    try:
+        assert tx.write(memoryview(b'0123456789')) == 10
+        assert rx.read(8) == b'01234567'
+
+        # only 14 bytes are free so the write is truncated and wraps
+        assert tx.write(memoryview(b'abcdefghijklmnop')) == 14
+        assert rx.readable() == 16
+        assert tx.writable() == 0
+        assert rx.read(100) == b'89abcdefghijklmn'
+        assert rx.readable() == 0
+    finally:
+        rx.close()
+        tx.unlink()
+        tx.close()
+
+
+@no_windows
+def test_ring_stream_wakeups():
+    '''
+    A parked reader is woken by every write whichever side of its
+    park the write lands on, and without polling the ring.
+
+    '''
+    async def main():
+        a, b = trio.socket.socketpair()
+        ring = RingBuffer.create(size=64)
+        back = RingBuffer.create(size=64)
+        tx = RingBufferStream(
+            trio.SocketStream(a), ring, RingBuffer.attach(back.name, 64))
+        rx = RingBufferStream(
+            trio.SocketStream(b), back, RingBuffer.attach(ring.name, 64))
+        try:
+            with trio.fail_after(1):
+                # the writer checked for a parked reader (and so didn't
+                # ring) just before the reader parked, the reader's
+                # re-check of the ring finds the data.
+                readable = rx._rx.readable
+
+                def write_before_park() -> int:
+                    del rx._rx.readable
+                    assert ring.write(memoryview(b'raced')) == 5
+                    return readable()
+
+                rx._rx.readable = write_before_park
+                assert await rx.receive_some() == b'raced'
+
+                # the write lands once the reader is parked (blocked on
+                # the doorbell) and so rings it.
+                received = []
+
+                async def recv():
+                    received.append(await rx.receive_some())
+
+                for i in range(10):
+                    async with trio.open_nursery() as n:
+                        n.start_soon(recv)
+                        await trio.testing.wait_all_tasks_blocked()
+                        assert ring.parked
+                        await tx.send_all(b'%d' % i)
+
+                    assert not ring.parked
+
+                assert received == [b'%d' % i for i in range(10)]
+
+            # a parked reader with nothing to read stays parked
+            with trio.move_on_after(0.1) as cs:
+                await rx.receive_some()
+            assert cs.cancelled_caught
+
+        finally:
+            await tx.aclose()
+            await rx.aclose()
+            ring.unlink()
+            back.unlink()
+
+    trio.run(main)
+
+
+@tractor.context
+async def echo_ctx(
+    ctx: tractor.Context,
+) -> str:
+    chan = tractor.current_actor()._parent_chan
+    await ctx.started(type(chan.msgstream).__name__)
+    async with ctx.open_stream() as stream:
+        async for msg in stream:
+            await stream.send(msg)
+
+    return 'done'
+
+
+@no_windows
+@pytest.mark.parametrize(
+    'payload_size, count',
+    [(8, 1000), (2**21, 4)],
+    ids=['small', 'larger_then_ring'],
+)
+def test_shm_transport_echo(
+    arb_addr,
+    start_method,
+    payload_size,
+    count,
+):
+    '''
+    Stream msgs over a channel negotiated to use the shm transport in
+    both directions, including msgs larger then the ring itself.
+
+    '''
+    async def main():
+        async with tractor.open_nursery(
+            arbiter_addr=arb_addr,
+            msg_transport='shm',
+        ) as n:
+            portal = await n.start_actor(
+                'shm_echoer',
+                enable_modules=[__name__],
+            )
+            assert isinstance(portal.channel.msgstream, MsgpackShmStream)
+
+            async with portal.open_context(echo_ctx) as (ctx, first):
+                assert first == 'MsgpackShmStream'
+
+                async with ctx.open_stream() as stream:
+                    for i in range(count):
+                        msg = [i, 'x' * payload_size]
+                        await stream.send(msg)
+                        assert await stream.receive() == msg
+
+            assert await ctx.result() == 'done'
+            await portal.cancel_actor()
+
+    trio.run(main)
@@ -27,6 +27,7 @@ from ._streaming import (
     MsgStream,
     stream,
     context,
+    rpc,
 )
 from ._discovery import (
     get_arbiter,
@@ -43,6 +44,7 @@ from ._exceptions import (
     RemoteActorError,
     ModuleNotExposed,
     ContextCancelled,
+    Overloaded,
 )
 from ._debug import breakpoint, post_mortem
 from . import msg
@@ -61,6 +63,7 @@ __all__ = [
     'ContextCancelled',
     'ModuleNotExposed',
     'MsgStream',
+    'Overloaded',
     'BaseExceptionGroup',
     'Portal',
     'RemoteActorError',
@@ -76,6 +79,7 @@ __all__ = [
     'open_root_actor',
     'post_mortem',
     'query_actor',
+    'rpc',
     'run_daemon',
     'stream',
     'to_asyncio',
@@ -33,7 +33,12 @@ def parse_uid(arg):
     return str(name), str(uuid)  # ensures str encoding
 
 def parse_ipaddr(arg):
-    host, port = literal_eval(arg)
+    addr = literal_eval(arg)
+    if len(addr) == 1:
+        # UDS path
+        return (str(addr[0]),)
+
+    host, port = addr
     return (str(host), int(port))
 
 
@@ -44,6 +49,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--uid", type=parse_uid)
     parser.add_argument("--loglevel", type=str)
+    parser.add_argument("--msg_transport", type=str)
     parser.add_argument("--parent_addr", type=parse_ipaddr)
     parser.add_argument("--asyncio", action='store_true')
     args = parser.parse_args()
@@ -52,7 +58,8 @@ if __name__ == "__main__":
         args.uid[0],
         uid=args.uid[1],
         loglevel=args.loglevel,
-        spawn_method="trio"
+        spawn_method="trio",
+        msg_transport=args.msg_transport,
     )
 
     _trio_main(
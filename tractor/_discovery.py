@@ -24,6 +24,7 @@ from typing import (
     AsyncGenerator,
 )
 from contextlib import asynccontextmanager as acm
+import socket
 
 from ._ipc import _connect_chan, Channel
 from ._portal import (
@@ -74,6 +75,18 @@ async def get_root(
             yield portal
 
 
+def _same_host_hostname() -> str | None:
+    '''
+    Return this host's name if the runtime prefers UDS for same-host
+    connections such that the registrar can hand out a UDS address.
+
+    '''
+    if _runtime_vars['_msg_transport'] == 'uds':
+        return socket.gethostname()
+
+    return None
+
+
 @acm
 async def query_actor(
     name: str,
@@ -95,6 +108,7 @@ async def query_actor(
             'self',
             'find_actor',
             name=name,
+            hostname=_same_host_hostname(),
         )
 
         # TODO: return portals to all available actors - for now just
@@ -149,6 +163,7 @@ async def wait_for_actor(
             'self',
             'wait_for_actor',
             name=name,
+            hostname=_same_host_hostname(),
         )
         sockaddr = sockaddrs[-1]
 
@@ -19,7 +19,6 @@ Our classy exception set.
 
 """
 from typing import (
-    Any,
     Optional,
     Type,
 )
@@ -30,6 +29,8 @@ import traceback
 import exceptiongroup as eg
 import trio
 
+from .msg import Error
+
 
 _this_mod = importlib.import_module(__name__)
 
@@ -84,6 +85,14 @@ class StreamOverrun(trio.TooSlowError):
     "This stream was overrun by sender"
 
 
+class Overloaded(RuntimeError):
+    "The actor's rpc request queue is full"
+
+
+class MessagingError(Exception):
+    'Some kind of unexpected SC messaging dialog issue'
+
+
 class AsyncioCancelled(Exception):
     '''
     Asyncio cancelled translation (non-base) error
@@ -96,8 +105,9 @@ class AsyncioCancelled(Exception):
 def pack_error(
     exc: BaseException,
     tb=None,
+    cid: Optional[int] = None,
 
-) -> dict[str, Any]:
+) -> Error:
     """Create an "error message" for tranmission over
     a channel (aka the wire).
     """
@@ -106,17 +116,16 @@ def pack_error(
     else:
         tb_str = traceback.format_exc()
 
-    return {
-        'error': {
-            'tb_str': tb_str,
-            'type_str': type(exc).__name__,
-        }
-    }
+    return Error(
+        type_str=type(exc).__name__,
+        tb_str=tb_str,
+        cid=cid,
+    )
 
 
 def unpack_error(
 
-    msg: dict[str, Any],
+    msg: Error,
     chan=None,
     err_type=RemoteActorError
 
@@ -127,11 +136,9 @@ def unpack_error(
 
     '''
     __tracebackhide__ = True
-    error = msg['error']
-
-    tb_str = error.get('tb_str', '')
+    tb_str = msg.tb_str
     message = f"{chan.uid}\n" + tb_str
-    type_name = error['type_str']
+    type_name = msg.type_str
     suberror_type: Type[BaseException] = Exception
 
     if type_name == 'ContextCancelled':
@@ -156,7 +163,8 @@ def unpack_error(
         suberror_type=suberror_type,
 
         # unpack other fields into error type init
-        **msg['error'],
+        tb_str=tb_str,
+        type_str=type_name,
     )
 
     return exc
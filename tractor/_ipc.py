@@ -19,8 +19,15 @@ Inter-process comms abstractions
 
 """
 from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
+import errno
+import hashlib
+import os
 import platform
+import socket
 import struct
+import tempfile
 import typing
 from collections.abc import (
     AsyncGenerator,
@@ -28,6 +35,7 @@ from collections.abc import (
 )
 from typing import (
     Any,
+    Callable,
     runtime_checkable,
     Optional,
     Protocol,
@@ -35,21 +43,87 @@ from typing import (
     TypeVar,
 )
 
-from tricycle import BufferedReceiveStream
 import msgspec
 import trio
 from async_generator import asynccontextmanager
 
 from .log import get_logger
-from ._exceptions import TransportClosed
-log = get_logger(__name__)
+from .msg import (
+    WireMsg,
+    Yield,
+    get_codec,
+    get_oob_type,
+    is_control_msg,
+    _codecs,
+    _oob_kinds,
+)
+from ._exceptions import (
+    StreamOverrun,
+    TransportClosed,
+)
 
 
 _is_windows = platform.system() == 'Windows'
 log = get_logger(__name__)
 
 
+# whether the local platform supports unix domain sockets (UDS)
+_has_uds: bool = (
+    hasattr(socket, 'AF_UNIX')
+    and not _is_windows
+)
+
+
+def is_uds_addr(addr: tuple | list | None) -> bool:
+    '''
+    Predicate for whether ``addr`` is a UDS (filesystem path) address.
+
+    TCP addresses are always ``(host, port)`` pairs whereas UDS
+    addresses are encoded as a single element ``(path,)`` tuple.
+
+    '''
+    return (
+        addr is not None
+        and len(addr) == 1
+    )
+
+
+# ``sun_path`` is 104 bytes on macos/BSD (108 on linux) including the
+# trailing null byte.
+_max_uds_path: int = 103
+
+
+def get_uds_path(uid: tuple[str, str]) -> str:
+    '''
+    Return the filesystem path on which the actor with ``uid`` binds
+    its UDS channel server.
+
+    The file name is a short hash of the uid such that the path fits
+    in ``sun_path``; if the temp dir is too long (eg. a per-user
+    ``$TMPDIR`` on macos) ``/tmp`` is used instead.
+
+    '''
+    digest = hashlib.blake2b(
+        ':'.join(uid).encode(),
+        digest_size=8,
+    ).hexdigest()
+    fname = f'tractor-{digest}.sock'
+    path = os.path.join(tempfile.gettempdir(), fname)
+    if len(os.fsencode(path)) > _max_uds_path:
+        path = os.path.join('/tmp', fname)
+
+    return path
+
+
 def get_stream_addrs(stream: trio.SocketStream) -> tuple:
+    if stream.socket.family == getattr(socket, 'AF_UNIX', None):
+        # UDS sockets are addressed by filesystem path; note that the
+        # connecting side's (client) socket name is normally empty.
+        return (
+            (stream.socket.getsockname(),),
+            (stream.socket.getpeername(),),
+        )
+
     # should both be IP sockets
     lsockname = stream.socket.getsockname()
     rsockname = stream.socket.getpeername()
@@ -77,12 +151,25 @@ class MsgTransport(Protocol[MsgType]):
         ...
 
     # XXX: should this instead be called `.sendall()`?
-    async def send(self, msg: MsgType) -> None:
+    async def send(
+        self,
+        msg: MsgType,
+        priority: Optional[bool] = None,
+    ) -> None:
         ...
 
     async def recv(self) -> MsgType:
         ...
 
+    async def recv_batch(self) -> list[MsgType]:
+        ...
+
+    def unrecv(self, msgs: list[MsgType]) -> None:
+        ...
+
+    def set_compression(self, codec: Optional[str]) -> None:
+        ...
+
     def __aiter__(self) -> MsgType:
         ...
 
@@ -103,6 +190,229 @@ class MsgTransport(Protocol[MsgType]):
         ...
 
 
+# max number of buffers passed to a single ``sendmsg()`` call; must
+# stay below the platform's ``IOV_MAX`` (1024 on linux/macos).
+_max_iovecs: int = 512
+
+_header = struct.Struct('<I')
+
+# the high bits of the length prefix flag a compressed frame payload,
+# a frame followed by out-of-band buffers (see ``_OOBFrame``) or a
+# single chunk of a larger msg (see ``_ChunkedMsg``).
+_compressed_flag: int = 1 << 31
+_oob_flag: int = 1 << 30
+_chunk_flag: int = 1 << 29
+_max_frame_size: int = _chunk_flag - 1
+
+# chunk frames start with the id of the msg transfer they are part of
+# and the (64-bit) total size of its encoded payload; a zero size
+# signals the sender aborted the transfer.
+_chunk_header = struct.Struct('<IQ')
+
+# send queue lanes, see ``MsgpackTCPStream.send()``
+_control_lane: int = 0
+_bulk_lane: int = 1
+
+# msgpack ext type codes for out-of-band buffer references and for
+# (small) registered oob type objects encoded inline.
+_oob_ext_code: int = 1
+_inline_ext_code: int = 2
+
+
+@dataclass
+class SendStats:
+    '''
+    Counters describing the write batching achieved on a transport.
+
+    '''
+    batches: int = 0
+    msgs: int = 0
+    bytes: int = 0
+    max_batch_msgs: int = 0
+    max_batch_bytes: int = 0
+
+    # msgs which were sent as multiple chunk frames
+    chunked_msgs: int = 0
+
+    # msgs sent on the (prioritized) control lane
+    priority_msgs: int = 0
+
+    # msgs sent with out-of-band buffers
+    oob_msgs: int = 0
+
+    def record(self, msgs: int, nbytes: int) -> None:
+        self.batches += 1
+        self.msgs += msgs
+        self.bytes += nbytes
+        self.max_batch_msgs = max(self.max_batch_msgs, msgs)
+        self.max_batch_bytes = max(self.max_batch_bytes, nbytes)
+
+    @property
+    def mean_batch_msgs(self) -> float:
+        return self.msgs / self.batches if self.batches else 0.
+
+    @property
+    def mean_batch_bytes(self) -> float:
+        return self.bytes / self.batches if self.batches else 0.
+
+
+@dataclass
+class CompressionStats:
+    '''
+    Counters of raw vs. compressed frame payload bytes on a transport.
+
+    '''
+    # sent msgs which were not compressed (eg. below the threshold)
+    raw_msgs: int = 0
+    raw_bytes: int = 0
+
+    # sent msgs which were compressed: encoded and on-the-wire sizes
+    compressed_msgs: int = 0
+    compressed_in: int = 0
+    compressed_out: int = 0
+
+    # received compressed msgs: on-the-wire and decompressed sizes
+    decompressed_msgs: int = 0
+    decompressed_in: int = 0
+    decompressed_out: int = 0
+
+    @property
+    def ratio(self) -> float:
+        '''
+        Compression ratio (encoded / sent size) of the compressed msgs.
+
+        '''
+        if not self.compressed_out:
+            return 1.
+        return self.compressed_in / self.compressed_out
+
+
+def get_compression_caps() -> dict[str, list[str]]:
+    '''
+    Return the frame compression capabilities advertised in the initial
+    channel handshake: the (ordered) codecs this actor wants to use, if
+    any, and all codecs it supports.
+
+    '''
+    from ._state import _runtime_vars
+    return {
+        'want': list(_runtime_vars.get('_compression') or ()),
+        'codecs': list(_codecs),
+    }
+
+
+def negotiate_compression(
+    local_caps: dict[str, list[str]],
+    peer_caps: dict[str, list[str]],
+    accepted: bool,
+
+) -> Optional[str]:
+    '''
+    Choose the frame compression codec for a channel: the first codec
+    wanted by the connecting side, then the accepting side, which both
+    sides support. Both ends must compute the same result.
+
+    '''
+    client, server = (
+        (peer_caps, local_caps) if accepted
+        else (local_caps, peer_caps)
+    )
+    common = (
+        set(local_caps.get('codecs', ()))
+        & set(peer_caps.get('codecs', ()))
+    )
+    for name in [
+        *client.get('want', ()),
+        *server.get('want', ()),
+    ]:
+        if name in common:
+            return name
+
+    return None
+
+
+class _OOBFrame:
+    '''
+    A received frame's msg and the (preallocated) memory for its out of
+    band buffers which are filled in as they arrive.
+
+    '''
+    __slots__ = ('body', 'bufs', '_i', '_filled')
+
+    def __init__(self, inline: memoryview) -> None:
+        nbufs, = _header.unpack_from(inline, 0)
+        sizes = struct.unpack_from(f'<{nbufs}Q', inline, 4)
+        self.body: bytes = bytes(inline[4 + 8 * nbufs:])
+        self.bufs: list[bytearray] = [bytearray(n) for n in sizes]
+        self._i: int = 0
+        self._filled: int = 0
+        self._skip_filled()
+
+    def _skip_filled(self) -> None:
+        while (
+            self._i < len(self.bufs)
+            and self._filled == len(self.bufs[self._i])
+        ):
+            self._i += 1
+            self._filled = 0
+
+    @property
+    def done(self) -> bool:
+        return self._i >= len(self.bufs)
+
+    def remaining(self) -> memoryview:
+        return memoryview(self.bufs[self._i])[self._filled:]
+
+    def advance(self, n: int) -> None:
+        self._filled += n
+        self._skip_filled()
+
+    def fill(self, data: memoryview) -> int:
+        '''
+        Copy as much of ``data`` as fits into the unfilled buffers and
+        return the number of bytes consumed.
+
+        '''
+        consumed: int = 0
+        while (
+            not self.done
+            and consumed < len(data)
+        ):
+            with self.remaining() as view:
+                n = min(len(view), len(data) - consumed)
+                view[:n] = data[consumed:consumed + n]
+
+            consumed += n
+            self.advance(n)
+
+        return consumed
+
+
+class _ChunkedMsg:
+    '''
+    The (preallocated) memory for an encoded msg being reassembled from
+    its chunk frames.
+
+    '''
+    __slots__ = ('buf', 'filled')
+
+    def __init__(self, size: int) -> None:
+        self.buf = bytearray(size)
+        self.filled: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.filled == len(self.buf)
+
+    def fill(self, data: bytes | memoryview) -> None:
+        n: int = len(data)
+        if self.filled + n > len(self.buf):
+            raise ValueError('chunk overflows its msg?')
+
+        self.buf[self.filled:self.filled + n] = data
+        self.filled += n
+
+
 # TODO: not sure why we have to inherit here, but it seems to be an
 # issue with ``get_msg_transport()`` returning a ``Type[Protocol]``;
 # probably should make a `mypy` issue?
@@ -112,6 +422,35 @@ class MsgpackTCPStream(MsgTransport):
     using the ``msgspec`` codec lib.
 
     '''
+    # upper bound on the number of (framed) bytes coalesced into
+    # a single write; a single larger msg is always sent whole.
+    max_batch_bytes: int = 2**16
+
+    # time a flushing sender waits for other senders to queue msgs
+    # before writing; the default of zero only coalesces msgs which
+    # are already pending (eg. while a prior write was blocked) and
+    # so never adds latency.
+    flush_latency: float = 0
+
+    # min size of an (encoded) msg for it to be compressed, if
+    # a compression codec was negotiated for the channel.
+    compress_threshold: int = 2**14
+
+    # min number of bytes requested per read from the underlying
+    # stream; every complete frame received is decoded in one pass.
+    recv_chunk_size: int = 2**16
+
+    # (encoded) msgs larger then this are sent as a sequence of chunk
+    # frames each of which is queued only once the prior was written
+    # such that frames of concurrently sent msgs interleave between
+    # them; must be less then ``_max_frame_size``.
+    chunk_size: int = 2**18
+
+    # min size of a registered oob type's buffer (see
+    # ``tractor.msg.register_oob_type()``) for it to be sent out of
+    # band; smaller ones are cheaper to copy into the msg.
+    oob_threshold: int = 2**12
+
     def __init__(
         self,
         stream: trio.SocketStream,
@@ -129,27 +468,312 @@ class MsgpackTCPStream(MsgTransport):
         self._agen = self._iter_packets()
         self._send_lock = trio.StrictFIFOLock()
 
+        # send coalescing state; frames are queued as
+        # ``(seq, parts, nbytes)`` on one of two lanes, control then
+        # bulk (see ``is_control_msg()``), and written in batches
+        # which always drain the control lane first.
+        self._lanes: tuple[
+            deque[tuple[int, list[bytes | memoryview], int]], ...
+        ] = (deque(), deque())
+        self._pending_bytes: int = 0
+        self._seq: int = 0
+
+        # per-lane seq of the last sent and failed frame
+        self._sent_seq: list[int] = [0, 0]
+        self._failed_seq: list[int] = [0, 0]
+        self._send_exc: BaseException | None = None
+        self._xfer_id: int = 0
+        self.stats = SendStats()
+
+        # scatter-gather writes are only possible when we have direct
+        # access to a (non-windows) socket.
+        self._vectored: bool = (
+            isinstance(stream, trio.SocketStream)
+            and hasattr(stream.socket, 'sendmsg')
+        )
+
         # public i guess?
         self.drained: list[dict] = []
 
-        self.recv_stream = BufferedReceiveStream(transport_stream=stream)
+        # receive side frame buffer and any already decoded msgs not
+        # yet consumed by the caller.
+        self._rbuf = bytearray()
+        self._rneeded: int = 0
+        self._ready: deque[Any] = deque()
+        self._decodes_failed: int = 0
+        self._chunked: dict[int, _ChunkedMsg] = {}
         self.prefix_size = prefix_size
 
-        # TODO: struct aware messaging coders
-        self.encode = msgspec.msgpack.Encoder().encode
-        self.decode = msgspec.msgpack.Decoder().decode  # dict[str, Any])
+        # negotiated frame compression, see ``.set_compression()``
+        self.compression: Optional[str] = None
+        self._compress: Optional[Callable[[bytes], bytes]] = None
+        self._codec_prefix: bytes = b''
+        self.compression_stats = CompressionStats()
+
+        # out-of-band buffers collected while encoding a msg and those
+        # received (with a frame) for decoding one, see ``tractor.msg``.
+        self._oob_out: Optional[list[memoryview]] = None
+        self._oob_in: Optional[list[bytearray]] = None
+        self._oob_frame: Optional[_OOBFrame] = None
+
+        # decoding dispatches on the tag of the runtime's msg types
+        self.encode = msgspec.msgpack.Encoder(
+            enc_hook=self._enc_hook,
+        ).encode
+        self.decode = msgspec.msgpack.Decoder(
+            WireMsg,
+            ext_hook=self._ext_hook,
+        ).decode
+
+    def _enc_hook(self, obj: Any) -> Any:
+        entry = get_oob_type(obj)
+        if (
+            entry is None
+            or self._oob_out is None
+        ):
+            raise TypeError(
+                f'Objects of type {type(obj)} are not supported')
+
+        kind, to_buffer, _ = entry
+        buf, meta = to_buffer(obj)
+        view = memoryview(buf).cast('B')
+        if view.nbytes < self.oob_threshold:
+            return msgspec.msgpack.Ext(
+                _inline_ext_code,
+                msgspec.msgpack.encode((kind, meta, view)),
+            )
+
+        index: int = len(self._oob_out)
+        self._oob_out.append(view)
+        return msgspec.msgpack.Ext(
+            _oob_ext_code,
+            msgspec.msgpack.encode((index, kind, meta)),
+        )
+
+    def _ext_hook(self, code: int, data: memoryview) -> Any:
+        if code == _inline_ext_code:
+            kind, meta, buf = msgspec.msgpack.decode(data)
+            return _oob_kinds[kind](memoryview(bytearray(buf)), meta)
 
-    async def _iter_packets(self) -> AsyncGenerator[dict, None]:
-        '''Yield packets from the underlying stream.
+        if (
+            code != _oob_ext_code
+            or self._oob_in is None
+        ):
+            return msgspec.msgpack.Ext(code, bytes(data))
 
+        index, kind, meta = msgspec.msgpack.decode(data)
+        from_buffer = _oob_kinds[kind]
+        return from_buffer(memoryview(self._oob_in[index]), meta)
+
+    def _parse_frames(self) -> list[Any]:
         '''
-        import msgspec  # noqa
-        decodes_failed: int = 0
+        Decode every complete frame in the receive buffer in a single
+        synchronous pass and drop the consumed bytes.
 
-        while True:
+        '''
+        buf: bytearray = self._rbuf
+        end: int = len(buf)
+        off: int = 0
+        msgs: list[Any] = []
+        with memoryview(buf) as view:
+            while end - off >= self.prefix_size:
+                size, = _header.unpack_from(view, off)
+                compressed: int = size & _compressed_flag
+                oob: int = size & _oob_flag
+                chunk: int = size & _chunk_flag
+                size &= _max_frame_size
+                start = off + self.prefix_size
+                if end - start < size:
+                    # wait for the rest of this frame
+                    self._rneeded = size - (end - start)
+                    break
+
+                off = start + size
+                if oob:
+                    # allocate the frame's buffers and copy in any
+                    # bytes of them we already have; the rest are
+                    # received directly into them by ``.recv_batch()``.
+                    frame = _OOBFrame(view[start:off])
+                    off += frame.fill(view[off:end])
+                    if not frame.done:
+                        self._oob_frame = frame
+                        self._rneeded = 0
+                        break
+
+                    msgs.extend(self._decode_oob(frame))
+                    continue
+
+                try:
+                    if chunk:
+                        msgs.extend(
+                            self._on_chunk(view[start:off], compressed)
+                        )
+                    elif compressed:
+                        frame = self._decompress_frame(view[start:off])
+                        msgs.append(self.decode(frame))
+                    else:
+                        msgs.append(self.decode(view[start:off]))
+                except (
+                    msgspec.DecodeError,
+                    UnicodeDecodeError,
+                ):
+                    self._on_decode_error(bytes(view[start:off]))
+            else:
+                self._rneeded = 0
+
+        del buf[:off]
+        return msgs
+
+    def _on_chunk(
+        self,
+        data: memoryview,
+        compressed: int,
+
+    ) -> list[Any]:
+        '''
+        Copy a chunk frame's payload into its msg's reassembly buffer
+        and decode the msg once all its chunks have arrived.
+
+        '''
+        xid, total = _chunk_header.unpack_from(data, 0)
+        data = data[_chunk_header.size:]
+        if not total:
+            # the sender aborted (eg. was cancelled) mid-transfer
+            self._chunked.pop(xid, None)
+            return []
+
+        partial = self._chunked.get(xid)
+        if partial is None:
+            partial = self._chunked[xid] = _ChunkedMsg(total)
+
+        partial.fill(
+            self._decompress_frame(data) if compressed else data
+        )
+        if not partial.done:
+            return []
+
+        del self._chunked[xid]
+        return [self.decode(partial.buf)]
+
+    def _decode_oob(self, frame: _OOBFrame) -> list[Any]:
+        self._oob_in = frame.bufs
+        try:
+            return [self.decode(frame.body)]
+        except (
+            msgspec.DecodeError,
+            UnicodeDecodeError,
+        ):
+            self._on_decode_error(frame.body)
+            return []
+        finally:
+            self._oob_in = None
+
+    async def _recv_oob(self, frame: _OOBFrame) -> list[Any]:
+        '''
+        Receive the remainder of a frame's out-of-band buffers directly
+        into their (preallocated) memory and decode its msg.
+
+        '''
+        sock = self.stream.socket if self._vectored else None
+        while not frame.done:
+            view = frame.remaining()
             try:
-                header = await self.recv_stream.receive_exactly(4)
+                if sock:
+                    n: int = await sock.recv_into(view)
+                else:
+                    data = await self.stream.receive_some(len(view))
+                    n = len(data)
+                    view[:n] = data
 
+            except (
+                OSError,
+                trio.BrokenResourceError,
+            ):
+                raise TransportClosed(
+                    f'transport {self} was already closed prior ro read'
+                )
+            finally:
+                view.release()
+
+            if not n:
+                raise TransportClosed(
+                    f'transport {self} was already closed prior ro read'
+                )
+
+            frame.advance(n)
+
+        self._oob_frame = None
+        return self._decode_oob(frame)
+
+    def _decompress_frame(self, data: memoryview) -> bytes:
+        # compressed payloads are prefixed with their codec's name such
+        # that decoding never depends on (racing) negotiation state.
+        n: int = data[0]
+        codec = bytes(data[1:1 + n]).decode()
+        _, decompress = get_codec(codec)
+        out: bytes = decompress(data[1 + n:])
+        cstats = self.compression_stats
+        cstats.decompressed_msgs += 1
+        cstats.decompressed_in += len(data)
+        cstats.decompressed_out += len(out)
+        return out
+
+    def set_compression(
+        self,
+        codec: Optional[str],
+
+    ) -> None:
+        '''
+        Set the codec used to compress sent frame payloads at or above
+        ``compress_threshold`` bytes; ``None`` disables compression.
+
+        '''
+        self.compression = codec
+        self._compress = get_codec(codec)[0] if codec else None
+        self._codec_prefix = (
+            bytes([len(codec)]) + codec.encode() if codec else b''
+        )
+
+    def _on_decode_error(self, msg_bytes: bytes) -> None:
+        if self._decodes_failed < 4:
+            # ignore decoding errors for now and assume they have to
+            # do with a channel drop - hope that receiving from the
+            # channel will raise an expected error and bubble up.
+            try:
+                msg_str: str | bytes = msg_bytes.decode()
+            except UnicodeDecodeError:
+                msg_str = msg_bytes
+
+            log.error(
+                '`msgspec` failed to decode!?\n'
+                'dumping bytes:\n'
+                f'{msg_str!r}'
+            )
+            self._decodes_failed += 1
+        else:
+            raise
+
+    async def recv_batch(self) -> list[Any]:
+        '''
+        Return all msgs which have been fully received, waiting for
+        at least one to arrive if none are ready.
+
+        '''
+        if self._ready:
+            msgs = list(self._ready)
+            self._ready.clear()
+            return msgs
+
+        while True:
+            if self._oob_frame:
+                msgs = await self._recv_oob(self._oob_frame)
+                if msgs:
+                    return msgs
+
+            try:
+                data = await self.stream.receive_some(
+                    max(self.recv_chunk_size, self._rneeded)
+                )
             except (
                 ValueError,
                 ConnectionResetError,
@@ -163,52 +787,346 @@ class MsgpackTCPStream(MsgTransport):
                     f'transport {self} was already closed prior ro read'
                 )
 
-            if header == b'':
+            if data == b'':
                 raise TransportClosed(
                     f'transport {self} was already closed prior ro read'
                 )
 
-            size, = struct.unpack("<I", header)
+            self._rbuf += data
+            msgs = self._parse_frames()
+            if msgs:
+                log.transport(  # type: ignore
+                    'received batch of %d msgs', len(msgs))
+                return msgs
 
-            log.transport(f'received header {size}')  # type: ignore
+    def unrecv(self, msgs: list[Any]) -> None:
+        '''
+        Push already received (but unprocessed) msgs back such that
+        they are delivered, in order, ahead of any others.
 
-            msg_bytes = await self.recv_stream.receive_exactly(size)
+        '''
+        self._ready.extendleft(reversed(msgs))
 
-            log.transport(f"received {msg_bytes}")  # type: ignore
-            try:
-                yield self.decode(msg_bytes)
-            except (
-                msgspec.DecodeError,
-                UnicodeDecodeError,
-            ):
-                if decodes_failed < 4:
-                    # ignore decoding errors for now and assume they have to
-                    # do with a channel drop - hope that receiving from the
-                    # channel will raise an expected error and bubble up.
-                    try:
-                        msg_str: str | bytes = msg_bytes.decode()
-                    except UnicodeDecodeError:
-                        msg_str = msg_bytes
-
-                    log.error(
-                        '`msgspec` failed to decode!?\n'
-                        'dumping bytes:\n'
-                        f'{msg_str!r}'
-                    )
-                    decodes_failed += 1
-                else:
-                    raise
+    async def _iter_packets(self) -> AsyncGenerator[dict, None]:
+        '''Yield packets from the underlying stream.
 
-    async def send(self, msg: Any) -> None:
-        async with self._send_lock:
+        '''
+        while True:
+            if not self._ready:
+                self._ready.extend(await self.recv_batch())
+
+            yield self._ready.popleft()
+
+    def _frame(
+        self,
+        bytes_data: bytes | memoryview,
+        chunk_header: bytes = b'',
+
+    ) -> list[bytes | memoryview]:
+        '''
+        Length prefix (and maybe compress) an encoded msg or, when
+        a ``chunk_header`` is passed, a chunk of one.
+
+        '''
+        flags: int = _chunk_flag if chunk_header else 0
+        cstats = self.compression_stats
+        if (
+            self._compress
+            and len(bytes_data) >= self.compress_threshold
+        ):
+            compressed: bytes = self._compress(bytes_data)
+            prefix: bytes = chunk_header + self._codec_prefix
+            size: int = len(prefix) + len(compressed)
+
+            # only pay the decompression cost if it was worth it
+            if size < len(chunk_header) + len(bytes_data):
+                cstats.compressed_msgs += 1
+                cstats.compressed_in += len(bytes_data)
+                cstats.compressed_out += size
+                return [
+                    struct.pack(
+                        "<I", size | flags | _compressed_flag,
+                    ) + prefix,
+                    compressed,
+                ]
+
+        cstats.raw_msgs += 1
+        cstats.raw_bytes += len(bytes_data)
+
+        # supposedly the fastest says,
+        # https://stackoverflow.com/a/54027962
+        return [
+            struct.pack(
+                "<I", (len(chunk_header) + len(bytes_data)) | flags,
+            ) + chunk_header,
+            bytes_data,
+        ]
+
+    def _frame_oob(
+        self,
+        bytes_data: bytes,
+        oob: list[memoryview],
+
+    ) -> list[bytes | memoryview]:
+        '''
+        Frame an encoded msg followed by its out-of-band buffers: the
+        (never compressed) inline part is prefixed with a table of the
+        buffer sizes and the buffers themselves are written straight
+        from their memory.
+
+        '''
+        table: bytes = struct.pack(
+            f'<I{len(oob)}Q',
+            len(oob),
+            *(buf.nbytes for buf in oob),
+        )
+        return [
+            struct.pack(
+                "<I", (len(table) + len(bytes_data)) | _oob_flag,
+            ) + table,
+            bytes_data,
+            *oob,
+        ]
+
+    async def send(
+        self,
+        msg: Any,
+        priority: Optional[bool] = None,
+
+    ) -> None:
+        '''
+        Frame and send ``msg``, possibly coalesced with other msgs
+        concurrently pending on this transport.
+
+        Msgs are queued in call order and whichever sender task
+        acquires the send lock "combines" (flushes) as many pending
+        frames as fit within ``max_batch_bytes`` in one (vectored)
+        write; tasks whose frames were sent by another flusher return
+        without touching the socket. Each call still only returns once
+        its own msg has been handed to the OS.
+
+        Msgs larger then ``chunk_size`` are sent as chunk frames (see
+        ``._send_chunked()``) which removes the 4GB frame limit.
+
+        Control msgs (cancel requests, stops and errors) or any sent
+        with ``priority=True`` jump ahead of all pending (bulk) frames
+        and are written by the next flush.
+
+        '''
+        bytes_data, oob = self.encode_msg(msg)
+        if priority is None:
+            priority = is_control_msg(msg)
+
+        await self.send_encoded(bytes_data, oob, priority)
+
+    def encode_msg(
+        self,
+        msg: Any,
+
+    ) -> tuple[bytes, list[memoryview]]:
+        '''
+        Encode ``msg`` returning its payload and any out-of-band
+        buffers to be sent after it (see ``.send_encoded()``).
+
+        '''
+        oob: list[memoryview] = []
+        self._oob_out = oob
+        try:
+            return self.encode(msg), oob
+        finally:
+            self._oob_out = None
+
+    async def send_encoded(
+        self,
+        bytes_data: bytes,
+        oob: list[memoryview],
+        priority: bool = False,
+
+    ) -> None:
+        '''
+        Frame and send a msg already encoded by ``.encode_msg()``.
+
+        '''
+        lane: int = _bulk_lane
+        if priority:
+            lane = _control_lane
+            self.stats.priority_msgs += 1
+
+        if oob:
+            self.stats.oob_msgs += 1
+            if len(bytes_data) > _max_frame_size:
+                raise ValueError(
+                    f'msg of {len(bytes_data)} bytes exceeds the max '
+                    'frame size'
+                )
+            await self._send_frame(
+                self._frame_oob(bytes_data, oob),
+                lane,
+            )
+
+        elif len(bytes_data) > self.chunk_size:
+            await self._send_chunked(bytes_data, lane)
 
-            bytes_data: bytes = self.encode(msg)
+        else:
+            await self._send_frame(self._frame(bytes_data), lane)
 
-            # supposedly the fastest says,
-            # https://stackoverflow.com/a/54027962
-            size: bytes = struct.pack("<I", len(bytes_data))
+    async def _send_chunked(
+        self,
+        bytes_data: bytes,
+        lane: int = _bulk_lane,
 
-            return await self.stream.send_all(size + bytes_data)
+    ) -> None:
+        '''
+        Send an encoded msg as a sequence of ``chunk_size`` frames,
+        yielding the transport to other senders between each.
+
+        '''
+        self._xfer_id = (self._xfer_id + 1) & 0xffffffff
+        xid: int = self._xfer_id
+        total: int = len(bytes_data)
+        view = memoryview(bytes_data)
+        try:
+            for off in range(0, total, self.chunk_size):
+                await self._send_frame(
+                    self._frame(
+                        view[off:off + self.chunk_size],
+                        chunk_header=_chunk_header.pack(xid, total),
+                    ),
+                    lane,
+                )
+
+        except BaseException:
+            # tell the receiver to drop any partial msg; this is only
+            # queued, to be written by the next flusher.
+            self._enqueue(
+                [
+                    _header.pack(_chunk_header.size | _chunk_flag)
+                    + _chunk_header.pack(xid, 0)
+                ],
+                lane,
+            )
+            raise
+
+        self.stats.chunked_msgs += 1
+
+    def _enqueue(
+        self,
+        parts: list[bytes | memoryview],
+        lane: int = _bulk_lane,
+
+    ) -> int:
+        nbytes: int = sum(map(len, parts))
+        self._seq += 1
+        seq: int = self._seq
+        self._lanes[lane].append((seq, parts, nbytes))
+        self._pending_bytes += nbytes
+        return seq
+
+    async def _send_frame(
+        self,
+        parts: list[bytes | memoryview],
+        lane: int = _bulk_lane,
+
+    ) -> None:
+        seq: int = self._enqueue(parts, lane)
+        try:
+            async with self._send_lock:
+                while self._sent_seq[lane] < seq:
+                    if self._failed_seq[lane] >= seq:
+                        break
+
+                    if (
+                        self.flush_latency
+                        and not self._lanes[_control_lane]
+                        and self._pending_bytes < self.max_batch_bytes
+                    ):
+                        # wait for other senders to "pile on"
+                        await trio.sleep(self.flush_latency)
+
+                    await self._flush()
+
+        except BaseException:
+            # never leave a msg from a failed or cancelled call queued
+            # to be delivered by some later flusher.
+            self._discard(seq, lane)
+            raise
+
+        if self._failed_seq[lane] >= seq:
+            raise trio.BrokenResourceError(
+                f'transport {self} broke while sending'
+            ) from self._send_exc
+
+    def _discard(self, seq: int, lane: int) -> None:
+        pending = self._lanes[lane]
+        for i, (pseq, _, nbytes) in enumerate(pending):
+            if pseq == seq:
+                del pending[i]
+                self._pending_bytes -= nbytes
+                break
+
+    async def _flush(self) -> None:
+        '''
+        Write (up to ``max_batch_bytes`` of) the pending frame queues,
+        control lane first, to the underlying stream.
+
+        '''
+        bufs: list[bytes | memoryview] = []
+        msgs: int = 0
+        nbytes: int = 0
+        last: list[int] = list(self._sent_seq)
+        for lane, pending in enumerate(self._lanes):
+            while (
+                pending
+                and len(bufs) < _max_iovecs
+            ):
+                seq, parts, n = pending[0]
+                if bufs and nbytes + n > self.max_batch_bytes:
+                    break
+
+                pending.popleft()
+                self._pending_bytes -= n
+                bufs.extend(parts)
+                msgs += 1
+                nbytes += n
+                last[lane] = seq
+
+        try:
+            await self._send_buffers(bufs)
+        except BaseException as err:
+            # a partial write leaves the frame stream corrupt so all
+            # msgs in this batch are considered failed.
+            self._failed_seq = list(map(max, self._failed_seq, last))
+            self._send_exc = err
+            raise
+
+        self._sent_seq = last
+        self.stats.record(msgs, nbytes)
+
+    async def _send_buffers(
+        self,
+        bufs: list[bytes | memoryview],
+    ) -> None:
+        if not self._vectored:
+            return await self.stream.send_all(b''.join(bufs))
+
+        sock = self.stream.socket
+        views: list[memoryview] = [memoryview(buf) for buf in bufs]
+        while views:
+            try:
+                sent: int = await sock.sendmsg(views[:_max_iovecs])
+            except OSError as err:
+                # mimic ``trio.SocketStream.send_all()`` error translation
+                if err.errno == errno.EBADF:
+                    raise trio.ClosedResourceError(
+                        'this socket was already closed') from None
+                raise trio.BrokenResourceError(
+                    f'socket connection broken: {err}') from err
+
+            # consume fully sent buffers and trim a partial one
+            while views and sent >= len(views[0]):
+                sent -= len(views.pop(0))
+            if sent:
+                views[0] = views[0][sent:]
 
     @property
     def laddr(self) -> tuple[str, int]:
@@ -242,15 +1160,253 @@ class MsgpackTCPStream(MsgTransport):
         return self.stream.socket.fileno() != -1
 
 
+class MsgpackUDSStream(MsgpackTCPStream):
+    '''
+    A ``trio.SocketStream`` over a unix domain socket delivering
+    ``msgpack`` formatted data; the framing is identical to the TCP
+    transport but avoids the loopback network stack for same-host
+    actors.
+
+    '''
+
+
+_transports: dict[tuple[str, str], Type[MsgTransport]] = {
+    ('msgpack', 'tcp'): MsgpackTCPStream,
+    ('msgpack', 'uds'): MsgpackUDSStream,
+}
+
+
 def get_msg_transport(
 
     key: tuple[str, str],
 
 ) -> Type[MsgTransport]:
 
-    return {
-        ('msgpack', 'tcp'): MsgpackTCPStream,
-    }[key]
+    return _transports[key]
+
+
+def get_transport_key(
+    addr: tuple | list | None,
+    codec: str = 'msgpack',
+
+) -> tuple[str, str]:
+    '''
+    Return the ``(codec, protocol)`` transport key appropriate for
+    connecting to ``addr``.
+
+    '''
+    return (codec, 'uds' if is_uds_addr(addr) else 'tcp')
+
+
+@dataclass
+class SendQueueStats:
+    '''
+    Counters for a single context's (cid's) send queue.
+
+    '''
+    depth: int = 0
+    max_depth: int = 0
+    sent: int = 0
+    dropped: int = 0
+
+    # sends which had to wait on a full queue
+    blocked: int = 0
+
+    # values which replaced a still queued one (see ``conflate``)
+    conflated: int = 0
+
+
+_overflow_policies: tuple[str, ...] = (
+    'block',
+    'drop_oldest',
+    'raise',
+)
+
+
+class SendQueue:
+    '''
+    A bounded, per-context queue of msgs to be sent over a ``Channel``
+    by its writer task (see ``Channel.open_send_queue()``).
+
+    Enqueuing never touches the transport such that a slow peer can
+    only ever block the channel's (single) writer task and, when its
+    queue is full, the context's own sender(s). The ``overflow``
+    policy decides what happens to a msg sent to a full queue:
+
+    - ``'block'``: ``.send()`` waits for space, ``.send_nowait()``
+      raises ``trio.WouldBlock``.
+    - ``'drop_oldest'``: the oldest queued msg is discarded.
+    - ``'raise'``: both methods raise ``StreamOverrun``.
+
+    If a ``conflate`` key func is provided, a ``Yield`` msg whose
+    value has the same key as that of a still queued one instead
+    replaces the latter in place.
+
+    Msgs are encoded when queued such that a payload mutated by the
+    caller after sending is still sent as it was; note that the memory
+    of out-of-band buffers (see ``tractor.msg.OOBBuffer``) is not
+    copied.
+
+    '''
+    def __init__(
+        self,
+        chan: Channel,
+        cid: int,
+        nursery: trio.Nursery,
+        maxlen: int,
+        overflow: str = 'block',
+        conflate: Optional[Callable[[Any], Any]] = None,
+
+    ) -> None:
+        if overflow not in _overflow_policies:
+            raise ValueError(
+                f'Unknown overflow policy {overflow!r}, '
+                f'expected one of {_overflow_policies}'
+            )
+        if maxlen < 1:
+            raise ValueError('`maxlen` must be at least 1')
+
+        self.chan = chan
+        self.cid = cid
+        self.maxlen = maxlen
+        self.overflow = overflow
+        self.stats = SendQueueStats()
+
+        self._nursery = nursery
+
+        # queued ``[payload, oob buffers, priority, conflation key]``
+        # entries, see ``MsgpackTCPStream.encode_msg()``.
+        self._buf: deque[list] = deque()
+        self._scheduled: bool = False
+        self._inflight: bool = False
+        self._error: Optional[BaseException] = None
+
+        # map {key -> queued entry} for conflation
+        self._conflate = conflate
+        self._queued: dict[Any, list] = {}
+
+        # set on (and replaced after) every dequeue and on failure
+        self._changed = trio.Event()
+
+    def _check(self) -> None:
+        if self._error:
+            raise trio.BrokenResourceError(
+                f'Send queue for {self.cid} failed'
+            ) from self._error
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = trio.Event()
+
+    def send_nowait(self, msg: Any) -> bool:
+        '''
+        Queue ``msg`` to be sent by the channel's writer task, return
+        whether it was (vs. conflated into a queued msg).
+
+        '''
+        self._check()
+        stats = self.stats
+        key: Any = None
+        conflate = self._conflate is not None and type(msg) is Yield
+        if conflate:
+            key = self._conflate(msg.pld)  # type: ignore
+            queued = self._queued.get(key)
+            if queued is not None:
+                queued[:2] = self._encode(msg)
+                stats.conflated += 1
+                return False
+
+        full: bool = len(self._buf) >= self.maxlen
+        if full:
+            match self.overflow:
+                case 'raise':
+                    raise StreamOverrun(
+                        f'Send queue for {self.cid} is full '
+                        f'({self.maxlen} msgs)'
+                    )
+
+                case 'block':
+                    raise trio.WouldBlock
+
+        # encoded up front such that a payload mutated after sending
+        # is never sent and an unserializable one never evicts
+        # a queued msg.
+        data, oob = self._encode(msg)
+        if full:
+            # 'drop_oldest'
+            self._forget(self._buf.popleft())
+            stats.dropped += 1
+
+        entry = [data, oob, is_control_msg(msg), key]
+        self._buf.append(entry)
+        if conflate:
+            self._queued[key] = entry
+
+        stats.depth = len(self._buf)
+        stats.max_depth = max(stats.max_depth, stats.depth)
+        self.chan._schedule_send(self)
+        return True
+
+    def _encode(self, msg: Any) -> tuple[bytes, list[memoryview]]:
+        assert self.chan.msgstream
+        return self.chan.msgstream.encode_msg(msg)
+
+    def _forget(self, entry: list) -> None:
+        '''
+        Drop a dequeued entry from the conflation table.
+
+        '''
+        if (
+            self._queued
+            and self._queued.get(entry[3]) is entry
+        ):
+            del self._queued[entry[3]]
+
+    async def send(self, msg: Any) -> bool:
+        '''
+        Queue ``msg``, waiting for space as per the ``'block'`` policy.
+
+        '''
+        await trio.lowlevel.checkpoint_if_cancelled()
+        blocked: bool = False
+        while True:
+            try:
+                queued = self.send_nowait(msg)
+                break
+            except trio.WouldBlock:
+                pass
+
+            if not blocked:
+                blocked = True
+                self.stats.blocked += 1
+
+            await self._changed.wait()
+
+        await trio.lowlevel.cancel_shielded_checkpoint()
+        return queued
+
+    async def flush(self) -> None:
+        '''
+        Wait until all queued msgs have been handed to the transport.
+
+        '''
+        while (
+            self._buf
+            or self._inflight
+        ):
+            self._check()
+            await self._changed.wait()
+
+        self._check()
+
+    def _fail(self, err: BaseException) -> None:
+        self._error = err
+        self._scheduled = False
+        self._inflight = False
+        self._buf.clear()
+        self._queued.clear()
+        self.stats.depth = 0
+        self._notify()
 
 
 class Channel:
@@ -260,16 +1416,16 @@ class Channel:
     Wraps a ``MsgStream``: transport + encoding IPC connection.
 
     Currently we only support ``trio.SocketStream`` for transport
-    (aka TCP) and the ``msgpack`` interchange format via the ``msgspec``
-    codec libary.
+    (aka TCP or UDS) and the ``msgpack`` interchange format via the
+    ``msgspec`` codec libary.
 
     '''
     def __init__(
 
         self,
-        destaddr: Optional[tuple[str, int]],
+        destaddr: Optional[tuple[str, int] | tuple[str]],
 
-        msg_transport_type_key: tuple[str, str] = ('msgpack', 'tcp'),
+        msg_transport_type_key: Optional[tuple[str, str]] = None,
 
         # TODO: optional reconnection support?
         # auto_reconnect: bool = False,
@@ -281,7 +1437,10 @@ class Channel:
         # self._autorecon = auto_reconnect
 
         self._destaddr = destaddr
-        self._transport_key = msg_transport_type_key
+        self._transport_key = (
+            msg_transport_type_key
+            or get_transport_key(destaddr)
+        )
 
         # Either created in ``.connect()`` or passed in by
         # user in ``.from_stream()``.
@@ -291,6 +1450,10 @@ class Channel:
         # set after handshake - always uid of far end
         self.uid: Optional[tuple[str, str]] = None
 
+        # whether this channel was accepted by our channel server (vs.
+        # connected from this side), set in ``.from_stream()``.
+        self._accepted: bool = False
+
         self._agen = self._aiter_recv()
         self._exc: Optional[Exception] = None  # set if far end actor errors
         self._closed: bool = False
@@ -298,6 +1461,12 @@ class Channel:
         # remote (peer) cancellation of the far end actor runtime.
         self._cancel_called: bool = False  # set on ``Portal.cancel_actor()``
 
+        # per-cid send queues and the (round-robin) order in which
+        # those with pending msgs are served by the writer task.
+        self._send_qs: dict[int, SendQueue] = {}
+        self._send_ready: deque[SendQueue] = deque()
+        self._writer_running: bool = False
+
     @classmethod
     def from_stream(
         cls,
@@ -307,10 +1476,15 @@ class Channel:
     ) -> Channel:
 
         src, dst = get_stream_addrs(stream)
+        kwargs.setdefault(
+            'msg_transport_type_key',
+            get_transport_key(src),
+        )
         chan = Channel(destaddr=dst, **kwargs)
 
         # set immediately here from provided instance
         chan._stream = stream
+        chan._accepted = True
         chan.set_msg_transport(stream)
         return chan
 
@@ -352,23 +1526,151 @@ class Channel:
         destaddr = destaddr or self._destaddr
         assert isinstance(destaddr, tuple)
 
-        stream = await trio.open_tcp_stream(
-            *destaddr,
-            **kwargs
+        stream: trio.SocketStream
+        if is_uds_addr(destaddr):
+            stream = await trio.open_unix_socket(*destaddr)
+        else:
+            stream = await trio.open_tcp_stream(
+                *destaddr,
+                **kwargs
+            )
+
+        msgstream = self.set_msg_transport(
+            stream,
+            type_key=get_transport_key(destaddr),
         )
-        msgstream = self.set_msg_transport(stream)
 
         log.transport(
             f'Opened channel[{type(msgstream)}]: {self.laddr} -> {self.raddr}'
         )
         return msgstream
 
-    async def send(self, item: Any) -> None:
+    async def send(
+        self,
+        item: Any,
+        priority: Optional[bool] = None,
+
+    ) -> None:
 
-        log.transport(f"send `{item}`")  # type: ignore
+        log.transport('send `%s`', item)  # type: ignore
         assert self.msgstream
 
-        await self.msgstream.send(item)
+        await self.msgstream.send(item, priority=priority)
+
+    def open_send_queue(
+        self,
+        cid: int,
+        nursery: trio.Nursery,
+        maxlen: int,
+        overflow: str = 'block',
+        conflate: Optional[Callable[[Any], Any]] = None,
+
+    ) -> SendQueue:
+        '''
+        Allocate a bounded send queue for the context ``cid`` which
+        is drained (fairly, round-robin with all other queues on this
+        channel) by a writer task spawned on demand in ``nursery``.
+
+        '''
+        q = self._send_qs.get(cid)
+        if q is None:
+            q = self._send_qs[cid] = SendQueue(
+                self,
+                cid,
+                nursery,
+                maxlen,
+                overflow=overflow,
+                conflate=conflate,
+            )
+        return q
+
+    def close_send_queue(self, cid: int) -> None:
+        q = self._send_qs.pop(cid, None)
+        if q and q._buf:
+            log.warning(
+                f'Discarding {len(q._buf)} unsent msgs for {cid}')
+            q._fail(trio.ClosedResourceError('send queue was closed'))
+
+    def send_queue_stats(self) -> dict[int, SendQueueStats]:
+        '''
+        Return the stats of every open send queue keyed by cid.
+
+        '''
+        return {cid: q.stats for cid, q in self._send_qs.items()}
+
+    def _schedule_send(self, q: SendQueue) -> None:
+        if not (
+            q._scheduled
+            or q._inflight
+        ):
+            q._scheduled = True
+            self._send_ready.append(q)
+
+        if not self._writer_running:
+            self._writer_running = True
+            q._nursery.start_soon(self._write_send_queues)
+
+    async def _write_send_queues(self) -> None:
+        '''
+        Send one msg at a time from each ready send queue in turn until
+        all are empty.
+
+        '''
+        ready = self._send_ready
+        q: Optional[SendQueue] = None
+        try:
+            while ready:
+                q = ready.popleft()
+                q._scheduled = False
+                if not q._buf:
+                    continue
+
+                entry = q._buf.popleft()
+                q._forget(entry)
+                q._inflight = True
+                q.stats.depth = len(q._buf)
+                q._notify()
+                data, oob, priority, _ = entry
+                try:
+                    assert self.msgstream
+                    await self.msgstream.send_encoded(data, oob, priority)
+
+                except (
+                    trio.BrokenResourceError,
+                    trio.ClosedResourceError,
+                ) as err:
+                    log.warning(f'Send queue writer for {self} failed')
+                    for sq in [q, *self._send_qs.values()]:
+                        sq._fail(err)
+                    ready.clear()
+                    return
+
+                except Exception as err:
+                    # eg. an unserializable msg; only its own queue
+                    # is failed and reports it on the next send.
+                    log.exception(f'Failed to send queued msg for {q.cid}')
+                    q._fail(err)
+                    continue
+
+                q._inflight = False
+                q.stats.sent += 1
+                if q._buf:
+                    q._scheduled = True
+                    ready.append(q)
+                q._notify()
+
+        finally:
+            self._writer_running = False
+            stale = list(ready)
+            if q and q._inflight:
+                stale.append(q)
+
+            if stale:
+                # cancelled with msgs still queued
+                err = trio.ClosedResourceError('send queue writer exited')
+                for q in stale:
+                    q._fail(err)
+                ready.clear()
 
     async def recv(self) -> Any:
         assert self.msgstream
@@ -382,6 +1684,34 @@ class Channel:
         #         return await self.recv()
         #     raise
 
+    async def recv_batch(self) -> list[Any]:
+        '''
+        Receive all msgs which are ready (at least one) from the
+        underlying transport.
+
+        '''
+        assert self.msgstream
+        return await self.msgstream.recv_batch()
+
+    def unrecv(self, msgs: list[Any]) -> None:
+        '''
+        Return unprocessed msgs from a batch to the underlying
+        transport to be received again by the next reader.
+
+        '''
+        assert self.msgstream
+        self.msgstream.unrecv(msgs)
+
+    async def iter_batches(self) -> AsyncGenerator[list[Any], None]:
+        '''
+        Async iterate batches of msgs from the underlying stream; this
+        avoids a (generator) context switch per msg on hot receive
+        loops.
+
+        '''
+        while True:
+            yield await self.recv_batch()
+
     async def aclose(self) -> None:
 
         log.transport(
@@ -467,14 +1797,16 @@ class Channel:
 
 @asynccontextmanager
 async def _connect_chan(
-    host: str, port: int
+    *addr: str | int,
 ) -> typing.AsyncGenerator[Channel, None]:
     '''
     Create and connect a channel with disconnect on context manager
     teardown.
 
+    ``addr`` is either a TCP ``host, port`` pair or a lone UDS path.
+
     '''
-    chan = Channel((host, port))
+    chan = Channel(tuple(addr))
     await chan.connect()
     yield chan
     await chan.aclose()
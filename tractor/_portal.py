@@ -25,51 +25,67 @@ import inspect
 from typing import (
     Any, Optional,
     Callable, AsyncGenerator,
-    Type,
+    AsyncContextManager,
+    Iterable,
+    Type, TYPE_CHECKING,
 )
 from functools import partial
+from itertools import islice
 from dataclasses import dataclass
 from pprint import pformat
 import warnings
 
 import trio
-from async_generator import asynccontextmanager
+from async_generator import (
+    aclosing,
+    asynccontextmanager,
+)
 
 from .trionics import maybe_open_nursery
 from ._state import current_actor
 from ._ipc import Channel
 from .log import get_logger
-from .msg import NamespacePath
+from .msg import (
+    NamespacePath,
+    Msg,
+    Started,
+    Return,
+    Error,
+)
 from ._exceptions import (
     unpack_error,
     NoResult,
     ContextCancelled,
+    MessagingError,
 )
 from ._streaming import (
     Context,
     MsgStream,
 )
 
+if TYPE_CHECKING:
+    from ._runtime import ReplySlot
+
 
 log = get_logger(__name__)
 
 
 def _unwrap_msg(
-    msg: dict[str, Any],
+    msg: Msg,
     channel: Channel
 
 ) -> Any:
     __tracebackhide__ = True
-    try:
-        return msg['return']
-    except KeyError:
-        # internal error should never get here
-        assert msg.get('cid'), "Received internal error at portal?"
-        raise unpack_error(msg, channel) from None
+    match msg:
+        case Return(pld=result):
+            return result
 
+        case Error():
+            raise unpack_error(msg, channel) from None
 
-class MessagingError(Exception):
-    'Some kind of unexpected SC messaging dialog issue'
+        case _:
+            raise MessagingError(
+                f'Expected a `return` msg but received:\n{msg}')
 
 
 class Portal:
@@ -95,6 +111,11 @@ class Portal:
     # a(n) (peer) actor.
     cancel_timeout = 0.5
 
+    # have the callee validate the remote function type and skip its
+    # initial ``FuncType`` response for ``.run()``, ``.run_from_ns()``
+    # and ``.open_context()`` (see ``msg.Cmd.expect``).
+    fast_rpc: bool = True
+
     def __init__(self, channel: Channel) -> None:
         self.channel = channel
         # during the portal's lifetime
@@ -117,6 +138,8 @@ class Portal:
         assert self._expect_result is None, \
                 "A pending main result has already been submitted"
 
+        # NOTE: uses a full context (and waits on the functype msg) such
+        # that a bad request is raised here, in the spawning task.
         self._expect_result = await self.actor.start_remote_task(
             self.channel,
             ns,
@@ -126,13 +149,15 @@ class Portal:
 
     async def _return_once(
         self,
-        ctx: Context,
-
-    ) -> dict[str, Any]:
+        slot: ReplySlot,
 
-        assert ctx._remote_func_type == 'asyncfunc'  # single response
-        msg = await ctx._recv_chan.receive()
-        return msg
+    ) -> Msg:
+        try:
+            return await slot.receive()
+        finally:
+            # whether the response arrived or we were cancelled waiting
+            # on it the slot is done.
+            self.actor._release_reply_slot(slot)
 
     async def result(self) -> Any:
         '''
@@ -155,12 +180,15 @@ class Portal:
             return NoResult
 
         # expecting a "main" result
-        assert self._expect_result
+        ctx = self._expect_result
+        assert ctx
+        assert ctx._remote_func_type == 'asyncfunc'  # single response
 
         if self._result_msg is None:
-            self._result_msg = await self._return_once(
-                self._expect_result
-            )
+            try:
+                self._result_msg = await ctx._recv_chan.receive()
+            finally:
+                self.actor._release_context(self.channel.uid, ctx.cid)
 
         return _unwrap_msg(self._result_msg, self.channel)
 
@@ -252,14 +280,14 @@ class Portal:
             internals.
 
         '''
-        ctx = await self.actor.start_remote_task(
+        slot = await self.actor.start_unary_task(
             self.channel,
             namespace_path,
             function_name,
             kwargs,
+            expect_functype='asyncfunc' if self.fast_rpc else None,
         )
-        ctx._portal = self
-        msg = await self._return_once(ctx)
+        msg = await self._return_once(slot)
         return _unwrap_msg(msg, self.channel)
 
     async def run(
@@ -301,18 +329,122 @@ class Portal:
 
             fn_mod_path, fn_name = NamespacePath.from_ref(func).to_tuple()
 
-        ctx = await self.actor.start_remote_task(
+        slot = await self.actor.start_unary_task(
             self.channel,
             fn_mod_path,
             fn_name,
             kwargs,
+            expect_functype='asyncfunc' if self.fast_rpc else None,
         )
-        ctx._portal = self
         return _unwrap_msg(
-            await self._return_once(ctx),
+            await self._return_once(slot),
             self.channel,
         )
 
+    async def map(
+        self,
+        func: Callable,
+        kwargs_iter: Iterable[dict[str, Any]],
+        max_in_flight: int = 2**10,
+        batch_size: int = 2**7,
+
+    ) -> AsyncGenerator[Any, None]:
+        '''
+        Run the (unary) async ``func`` remotely once for each kwargs
+        ``dict`` in ``kwargs_iter`` and yield the results in order.
+
+        Calls are sent in batches of up to ``batch_size`` per msg, with
+        at most ``max_in_flight`` calls outstanding, and are run
+        concurrently by the remote actor which streams back results
+        (batched) as they complete. A failed call raises its
+        ``RemoteActorError`` when its result is reached.
+
+        Use with ``async_generator.aclosing()`` if not exhausting the
+        results; closing early cancels any outstanding calls.
+
+        '''
+        fn = self.bind(func)
+        fn._check('asyncfunc')
+        items = enumerate(kwargs_iter)
+        results: dict[int, tuple[bool, Any]] = {}
+        sent: int = 0
+        received: int = 0
+        next_index: int = 0
+        exhausted: bool = False
+
+        async with (
+            self._open_context(
+                'self',
+                '_run_batch',
+                {'ns': fn.ns, 'func': fn.name},
+            ) as (ctx, _),
+            ctx.open_stream() as stream,
+        ):
+            while True:
+                # top up the in flight window
+                while (
+                    not exhausted
+                    and (window := max_in_flight - (sent - received)) > 0
+                ):
+                    batch = list(islice(items, min(batch_size, window)))
+                    if not batch:
+                        exhausted = True
+                        break
+
+                    await stream.send(batch)
+                    sent += len(batch)
+
+                if exhausted and received == sent:
+                    break
+
+                for index, ok, result in await stream.receive():
+                    results[index] = (ok, result)
+                    received += 1
+
+                while next_index in results:
+                    ok, result = results.pop(next_index)
+                    next_index += 1
+                    if not ok:
+                        type_str, tb_str = result
+                        raise unpack_error(
+                            Error(type_str=type_str, tb_str=tb_str),
+                            self.channel,
+                        )
+
+                    yield result
+
+    async def run_many(
+        self,
+        func: Callable,
+        kwargs_list: Iterable[dict[str, Any]],
+        **kwargs,
+
+    ) -> list[Any]:
+        '''
+        Run the (unary) async ``func`` remotely once for each kwargs
+        ``dict`` in ``kwargs_list`` and return the results in order.
+
+        See ``.map()`` for details and the batching ``**kwargs``.
+
+        '''
+        async with aclosing(
+            self.map(func, kwargs_list, **kwargs)
+        ) as results:
+            return [result async for result in results]
+
+    def bind(
+        self,
+        func: Callable,
+
+    ) -> RemoteFunc:
+        '''
+        Return a reusable handle for calling ``func`` in the remote
+        actor which resolves and validates the function reference once
+        instead of on every call.
+
+        '''
+        return RemoteFunc(self, func)
+
     @asynccontextmanager
     async def open_stream_from(
         self,
@@ -331,6 +463,21 @@ class Portal:
 
         fn_mod_path, fn_name = NamespacePath.from_ref(
             async_gen_func).to_tuple()
+        async with self._open_stream_from(
+            fn_mod_path,
+            fn_name,
+            kwargs,
+        ) as stream:
+            yield stream
+
+    @asynccontextmanager
+    async def _open_stream_from(
+        self,
+        fn_mod_path: str,
+        fn_name: str,
+        kwargs: dict[str, Any],
+
+    ) -> AsyncGenerator[MsgStream, None]:
         ctx = await self.actor.start_remote_task(
             self.channel,
             fn_mod_path,
@@ -371,6 +518,7 @@ class Portal:
             # XXX: should this always be done?
             # await recv_chan.aclose()
             self._streams.remove(rchan)
+            self.actor._release_context(self.channel.uid, ctx.cid)
 
     @asynccontextmanager
     async def open_context(
@@ -397,30 +545,42 @@ class Portal:
                 f'{func} must be an async generator function!')
 
         fn_mod_path, fn_name = NamespacePath.from_ref(func).to_tuple()
+        async with self._open_context(
+            fn_mod_path,
+            fn_name,
+            kwargs,
+        ) as ctx_and_first:
+            yield ctx_and_first
 
+    @asynccontextmanager
+    async def _open_context(
+        self,
+        fn_mod_path: str,
+        fn_name: str,
+        kwargs: dict[str, Any],
+
+    ) -> AsyncGenerator[tuple[Context, Any], None]:
         ctx = await self.actor.start_remote_task(
             self.channel,
             fn_mod_path,
             fn_name,
-            kwargs
+            kwargs,
+            expect_functype='context' if self.fast_rpc else None,
         )
 
         assert ctx._remote_func_type == 'context'
         msg = await ctx._recv_chan.receive()
 
-        try:
-            # the "first" value here is delivered by the callee's
-            # ``Context.started()`` call.
-            first = msg['started']
-            ctx._started_called = True
-
-        except KeyError:
-            assert msg.get('cid'), ("Received internal error at context?")
+        match msg:
+            case Started(pld=first):
+                # the "first" value here is delivered by the callee's
+                # ``Context.started()`` call.
+                ctx._started_called = True
 
-            if msg.get('error'):
-                # raise kerr from unpack_error(msg, self.channel)
+            case Error():
                 raise unpack_error(msg, self.channel) from None
-            else:
+
+            case _:
                 raise MessagingError(
                     f'Context for {ctx.cid} was expecting a `started` message'
                     f' but received a non-error msg:\n{pformat(msg)}'
@@ -501,8 +661,8 @@ class Portal:
                 )
                 result = await ctx.result()
                 log.runtime(
-                    f'Context {fn_name} returned '
-                    f'value from callee `{result}`'
+                    'Context %s returned value from callee `%s`',
+                    fn_name, result,
                 )
 
             # though it should be impossible for any tasks
@@ -537,11 +697,85 @@ class Portal:
             await maybe_wait_for_debugger()
 
             # remove the context from runtime tracking
-            self.actor._contexts.pop(
-                (self.channel.uid, ctx.cid),
-                None,
+            self.actor._release_context(self.channel.uid, ctx.cid)
+
+
+class RemoteFunc:
+    '''
+    A remote function bound to a ``Portal``, see ``Portal.bind()``.
+
+    The function's namespace path and type are resolved at bind time
+    such that calls skip the reflection done by ``Portal.run()``,
+    ``.open_stream_from()`` and ``.open_context()``.
+
+    '''
+    __slots__ = ('portal', 'func', 'ns', 'name', 'functype')
+
+    def __init__(
+        self,
+        portal: Portal,
+        func: Callable,
+
+    ) -> None:
+        if getattr(func, '_tractor_context_function', False):
+            functype = 'context'
+        elif (
+            inspect.isasyncgenfunction(func)
+            or getattr(func, '_tractor_stream_function', False)
+        ):
+            functype = 'asyncgen'
+        elif inspect.iscoroutinefunction(func):
+            functype = 'asyncfunc'
+        else:
+            raise TypeError(f'{func} must be an async function!')
+
+        self.portal = portal
+        self.func = func
+        self.ns, self.name = NamespacePath.from_ref(func).to_tuple()
+        self.functype = functype
+
+    def __repr__(self) -> str:
+        return (
+            f'<RemoteFunc {self.ns}:{self.name} ({self.functype}) '
+            f'@ {self.portal.channel.uid}>'
+        )
+
+    def _check(self, functype: str) -> None:
+        if self.functype != functype:
+            raise TypeError(
+                f'{self.func} is an `{self.functype}` endpoint not an '
+                f'`{functype}`'
             )
 
+    async def __call__(self, **kwargs) -> Any:
+        '''
+        Run the (async) function remotely and return its result, like
+        ``Portal.run()``.
+
+        '''
+        self._check('asyncfunc')
+        return await self.portal.run_from_ns(self.ns, self.name, **kwargs)
+
+    def open_stream(self, **kwargs) -> AsyncContextManager[MsgStream]:
+        '''
+        Like ``Portal.open_stream_from()``.
+
+        '''
+        self._check('asyncgen')
+        return self.portal._open_stream_from(self.ns, self.name, kwargs)
+
+    def open_context(
+        self,
+        **kwargs,
+
+    ) -> AsyncContextManager[tuple[Context, Any]]:
+        '''
+        Like ``Portal.open_context()``.
+
+        '''
+        self._check('context')
+        return self.portal._open_context(self.ns, self.name, kwargs)
+
 
 @dataclass
 class LocalPortal:
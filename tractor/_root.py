@@ -40,8 +40,12 @@ from . import _debug
 from . import _spawn
 from . import _state
 from . import log
-from ._ipc import _connect_chan
+from ._ipc import (
+    _connect_chan,
+    _has_uds,
+)
 from ._exceptions import is_multi_cancelled
+from .msg import _codecs
 
 
 # set at startup and after forks
@@ -78,6 +82,17 @@ async def open_root_actor(
     enable_modules: list | None = None,
     rpc_module_paths: list | None = None,
 
+    # preferred transport for same-host actor connections: one of
+    # ``'tcp'`` (the default), ``'uds'`` (unix domain sockets) or
+    # ``'shm'`` (shared memory rings with a TCP control connection).
+    msg_transport: str = 'tcp',
+
+    # frame compression codec(s) to request (in order of preference)
+    # for msgs exceeding the transport's ``compress_threshold``: eg.
+    # ``'zlib'`` or ``'lzma'`` or any codec registered with
+    # ``tractor.msg.register_codec()``.
+    compression: str | list[str] | None = None,
+
 ) -> typing.Any:
     '''
     Runtime init entry point for ``tractor``.
@@ -152,6 +167,28 @@ async def open_root_actor(
             "Debug mode is only supported for the `trio` backend!"
         )
 
+    if msg_transport not in ('tcp', 'uds', 'shm'):
+        raise ValueError(f'Unknown msg transport: {msg_transport}')
+
+    elif (
+        msg_transport == 'uds'
+        and not _has_uds
+    ):
+        raise RuntimeError(
+            "The `uds` transport is not supported on this platform!"
+        )
+
+    _state._runtime_vars['_msg_transport'] = msg_transport
+
+    if isinstance(compression, str):
+        compression = [compression]
+
+    for codec in compression or ():
+        if codec not in _codecs:
+            raise ValueError(f'Unknown compression codec: {codec}')
+
+    _state._runtime_vars['_compression'] = list(compression or ())
+
     log.get_console_log(loglevel)
 
     try:
@@ -19,14 +19,19 @@ Actor primitives and helpers
 
 """
 from __future__ import annotations
+import bisect
 from collections import defaultdict
+from dataclasses import dataclass
 from functools import partial
 from itertools import chain
 import importlib
 import importlib.util
 import inspect
+import math
 import signal
+import socket
 import sys
+import time
 from typing import (
     Any, Optional,
     Union, TYPE_CHECKING,
@@ -43,9 +48,35 @@ from exceptiongroup import BaseExceptionGroup
 import trio  # type: ignore
 from trio_typing import TaskStatus
 
-from ._ipc import Channel
-from ._streaming import Context
+from ._ipc import (
+    Channel,
+    _has_uds,
+    get_uds_path,
+    get_compression_caps,
+    negotiate_compression,
+)
+from ._shm import (
+    get_shm_caps,
+    can_upgrade_to_shm,
+    maybe_upgrade_to_shm,
+)
+from ._streaming import (
+    Context,
+    context,
+)
 from .log import get_logger
+from .msg import (
+    Msg,
+    Handshake,
+    Cmd,
+    FuncType,
+    Yield,
+    Stop,
+    Credit,
+    Return,
+    Error,
+    _control_funcs,
+)
 from ._exceptions import (
     pack_error,
     unpack_error,
@@ -54,6 +85,7 @@ from ._exceptions import (
     ContextCancelled,
     TransportClosed,
     StreamOverrun,
+    Overloaded,
 )
 from . import _debug
 from ._discovery import get_arbiter
@@ -72,12 +104,15 @@ log = get_logger('tractor')
 async def _invoke(
 
     actor: 'Actor',
-    cid: str,
+    cid: int,
     chan: Channel,
     func: Callable,
     kwargs: dict[str, Any],
 
     is_rpc: bool = True,
+    expect_functype: Optional[str] = None,
+    endpoint: Optional[RpcEndpoint] = None,
+    admitted: bool = False,
     task_status: TaskStatus[
         Union[trio.CancelScope, BaseException]
     ] = trio.TASK_STATUS_IGNORED,
@@ -87,6 +122,14 @@ async def _invoke(
 
     This is the core "RPC task" starting machinery.
 
+    If the caller sent an ``expect_functype`` it is validated and, for
+    an ``'asyncfunc'`` or ``'context'``, the leading ``FuncType``
+    response is elided. The (precompiled) ``endpoint`` for ``func`` is
+    compiled on the fly if not provided.
+
+    An ``admitted`` task holds one of the actor's rpc concurrency slots
+    (see ``Actor._admit_rpc()``) which is released on exit.
+
     '''
     __tracebackhide__ = True
     treat_as_gen: bool = False
@@ -99,49 +142,49 @@ async def _invoke(
     # activated cancel scope ref
     cs: Optional[trio.CancelScope] = None
 
-    ctx = actor.get_context(chan, cid)
-    context: bool = False
-
-    if getattr(func, '_tractor_stream_function', False):
-        # handle decorated ``@tractor.stream`` async functions
-        sig = inspect.signature(func)
-        params = sig.parameters
-
-        # compat with old api
-        kwargs['ctx'] = ctx
-
-        if 'ctx' in params:
-            warnings.warn(
-                "`@tractor.stream decorated funcs should now declare "
-                "a `stream`  arg, `ctx` is now designated for use with "
-                "@tractor.context",
-                DeprecationWarning,
-                stacklevel=2,
-            )
-
-        elif 'stream' in params:
-            assert 'stream' in params
-            kwargs['stream'] = ctx
-
-        treat_as_gen = True
-
-    elif getattr(func, '_tractor_context_function', False):
-        # handle decorated ``@tractor.context`` async function
-        kwargs['ctx'] = ctx
-        context = True
+    # only streaming and context endpoints need a (runtime tracked)
+    # task context, plain async funcs just return a single msg.
+    ctx: Optional[Context] = None
+    ep = endpoint or _compile_endpoint(func)
+    functype: str = ep.functype
+    context: bool = ep.kind == 'context'
+
+    if ep.ctx_kwargs:
+        # handle decorated ``@tractor.stream`` and ``@tractor.context``
+        # async functions
+        ctx = actor.get_context(chan, cid)
+        for name in ep.ctx_kwargs:
+            kwargs[name] = ctx
+
+        if ep.kind == 'stream':
+            treat_as_gen = True
+            if ep.deprecated_ctx:
+                warnings.warn(
+                    "`@tractor.stream decorated funcs should now declare "
+                    "a `stream`  arg, `ctx` is now designated for use with "
+                    "@tractor.context",
+                    DeprecationWarning,
+                    stacklevel=2,
+                )
 
     # errors raised inside this block are propgated back to caller
     try:
-        if not (
-            inspect.isasyncgenfunction(func) or
-            inspect.iscoroutinefunction(func)
-        ):
+        if not ep.is_async:
             raise TypeError(f'{func} must be an async function!')
 
+        if (
+            expect_functype
+            and expect_functype != functype
+        ):
+            raise TypeError(
+                f'{func} is an `{functype}` endpoint but the caller '
+                f'expected an `{expect_functype}`'
+            )
+
         coro = func(**kwargs)
 
         if inspect.isasyncgen(coro):
-            await chan.send({'functype': 'asyncgen', 'cid': cid})
+            await chan.send(FuncType(cid=cid, functype='asyncgen'))
             # XXX: massive gotcha! If the containing scope
             # is cancelled and we execute the below line,
             # any ``ActorNursery.__aexit__()`` WON'T be
@@ -160,17 +203,17 @@ async def _invoke(
                         # to_send = await chan.recv_nowait()
                         # if to_send is not None:
                         #     to_yield = await coro.asend(to_send)
-                        await chan.send({'yield': item, 'cid': cid})
+                        await chan.send(Yield(cid=cid, pld=item))
 
-            log.runtime(f"Finished iterating {coro}")
+            log.runtime('Finished iterating %s', coro)
             # TODO: we should really support a proper
             # `StopAsyncIteration` system here for returning a final
             # value if desired
-            await chan.send({'stop': True, 'cid': cid})
+            await chan.send(Stop(cid=cid))
 
         # one way @stream func that gets treated like an async gen
         elif treat_as_gen:
-            await chan.send({'functype': 'asyncgen', 'cid': cid})
+            await chan.send(FuncType(cid=cid, functype='asyncgen'))
             # XXX: the async-func may spawn further tasks which push
             # back values like an async-generator would but must
             # manualy construct the response dict-packet-responses as
@@ -182,11 +225,13 @@ async def _invoke(
             if not cs.cancelled_caught:
                 # task was not cancelled so we can instruct the
                 # far end async gen to tear down
-                await chan.send({'stop': True, 'cid': cid})
+                await chan.send(Stop(cid=cid))
 
         elif context:
-            # context func with support for bi-dir streaming
-            await chan.send({'functype': 'context', 'cid': cid})
+            # context func with support for bi-dir streaming; the
+            # caller may take the ``Started`` msg as the functype.
+            if expect_functype != 'context':
+                await chan.send(FuncType(cid=cid, functype='context'))
 
             try:
                 async with trio.open_nursery() as scope_nursery:
@@ -194,7 +239,7 @@ async def _invoke(
                     cs = scope_nursery.cancel_scope
                     task_status.started(cs)
                     res = await coro
-                    await chan.send({'return': res, 'cid': cid})
+                    await chan.send(Return(cid=cid, pld=res))
 
             except BaseExceptionGroup:
                 # if a context error was set then likely
@@ -212,11 +257,12 @@ async def _invoke(
                 # don't pop the local context until we know the
                 # associated child isn't in debug any more
                 await _debug.maybe_wait_for_debugger()
-                ctx = actor._contexts.pop((chan.uid, cid))
+                ctx = actor._release_context(chan.uid, cid)
 
                 if ctx:
                     log.runtime(
-                        f'Context entrypoint {func} was terminated:\n{ctx}'
+                        'Context entrypoint %s was terminated:\n%s',
+                        func, ctx,
                     )
 
             assert cs
@@ -246,31 +292,52 @@ async def _invoke(
                 )
 
         else:
-            # regular async function
+            # regular async function; responses to runtime cancel
+            # requests skip ahead of any queued (stream) traffic.
+            priority: bool = (
+                getattr(func, '__self__', None) is actor
+                and func.__name__ in _control_funcs
+            )
             try:
-                await chan.send({'functype': 'asyncfunc', 'cid': cid})
+                if expect_functype != 'asyncfunc':
+                    await chan.send(
+                        FuncType(cid=cid, functype='asyncfunc'),
+                        priority=priority,
+                    )
             except trio.BrokenResourceError:
                 failed_resp = True
                 if is_rpc:
                     raise
                 else:
                     log.warning(
-                        f'Failed to respond to non-rpc request: {func}'
-                    )
+                        'Failed to respond to non-rpc request: %s', func)
 
             with cancel_scope as cs:
                 task_status.started(cs)
                 result = await coro
-                log.cancel(f'result: {result}')
+                log.cancel('result: %s', result)
+                if admitted:
+                    # free the slot before replying such that a caller
+                    # never observes its own (completed) call as running
+                    admitted = False
+                    actor._release_rpc(ep)
+
                 if not failed_resp:
                     # only send result if we know IPC isn't down
-                    await chan.send({'return': result, 'cid': cid})
+                    await chan.send(
+                        Return(cid=cid, pld=result),
+                        priority=priority,
+                    )
 
     except (
         Exception,
         BaseExceptionGroup,
     ) as err:
 
+        if admitted:
+            admitted = False
+            actor._release_rpc(ep)
+
         if not is_multi_cancelled(err):
 
             # TODO: maybe we'll want different "levels" of debugging
@@ -284,6 +351,7 @@ async def _invoke(
                 not isinstance(err, ContextCancelled)
                 or (
                     isinstance(err, ContextCancelled)
+                    and ctx is not None
                     and ctx._cancel_called
 
                     # if the root blocks the debugger lock request from a child
@@ -305,8 +373,7 @@ async def _invoke(
                     log.exception("Actor crashed:")
 
         # always ship errors back to caller
-        err_msg = pack_error(err, tb=tb)
-        err_msg['cid'] = cid
+        err_msg = pack_error(err, tb=tb, cid=cid)
         try:
             await chan.send(err_msg)
 
@@ -320,17 +387,28 @@ async def _invoke(
         ):
             # if we can't propagate the error that's a big boo boo
             log.exception(
-                f"Failed to ship error to caller @ {chan.uid} !?"
-            )
+                'Failed to ship error to caller @ %s !?', chan.uid)
 
         if cs is None:
             # error is from above code not from rpc invocation
             task_status.started(err)
 
     finally:
+        # the final response has been sent (or the task was cancelled)
+        # so drop the callee side context; on a self-connection the
+        # entry is shared with, and released by, the local caller.
+        if (
+            ctx is not None
+            and chan.uid != actor.uid
+        ):
+            actor._release_context(chan.uid, cid)
+
+        if admitted:
+            actor._release_rpc(ep)
+
         # RPC task bookeeping
         try:
-            scope, func, is_complete = actor._rpc_tasks.pop((chan, cid))
+            scope, func, is_complete = actor._pop_rpc_task(chan, cid)
             is_complete.set()
 
         except KeyError:
@@ -338,13 +416,236 @@ async def _invoke(
                 # If we're cancelled before the task returns then the
                 # cancel scope will not have been inserted yet
                 log.warning(
-                    f"Task {func} likely errored or cancelled before start")
+                    'Task %s likely errored or cancelled before start', func)
         finally:
             if not actor._rpc_tasks:
                 log.runtime("All RPC tasks have completed")
                 actor._ongoing_rpc_tasks.set()
 
 
+@dataclass(frozen=True)
+class RpcEndpoint:
+    '''
+    An rpc dispatch table entry: a function plus the (precomputed)
+    invocation details ``_invoke()`` would otherwise introspect per
+    call.
+
+    '''
+    func: Callable
+
+    # one of 'asyncfunc', 'asyncgen', 'stream' or 'context'
+    kind: str
+    is_async: bool
+
+    # names of the kwargs the task ``Context`` is passed as
+    ctx_kwargs: tuple[str, ...] = ()
+    inline: bool = False
+
+    # a ``@stream`` func declaring the (deprecated) ``ctx`` arg
+    deprecated_ctx: bool = False
+
+    # limit on the number of concurrently running tasks of ``func``
+    max_concurrency: Optional[int] = None
+
+    @property
+    def functype(self) -> str:
+        '''
+        The type reported to (and validated for) the caller.
+
+        '''
+        return 'asyncgen' if self.kind == 'stream' else self.kind
+
+
+def _compile_endpoint(func: Callable) -> RpcEndpoint:
+    ctx_kwargs: tuple[str, ...] = ()
+    deprecated_ctx: bool = False
+    if getattr(func, '_tractor_stream_function', False):
+        kind = 'stream'
+        params = inspect.signature(func).parameters
+
+        # always passed as ``ctx`` for compat with the old api
+        ctx_kwargs = ('ctx',)
+        if 'ctx' in params:
+            deprecated_ctx = True
+        elif 'stream' in params:
+            ctx_kwargs = ('ctx', 'stream')
+
+    elif getattr(func, '_tractor_context_function', False):
+        kind = 'context'
+        ctx_kwargs = ('ctx',)
+
+    elif inspect.isasyncgenfunction(func):
+        kind = 'asyncgen'
+
+    else:
+        kind = 'asyncfunc'
+
+    return RpcEndpoint(
+        func=func,
+        kind=kind,
+        is_async=(
+            inspect.isasyncgenfunction(func)
+            or inspect.iscoroutinefunction(func)
+        ),
+        ctx_kwargs=ctx_kwargs,
+        inline=getattr(func, '_tractor_inline_function', False),
+        deprecated_ctx=deprecated_ctx,
+        max_concurrency=getattr(func, '_tractor_max_concurrency', None),
+    )
+
+
+@dataclass
+class ContextStats:
+    '''
+    Counters for an actor's table of IPC task contexts.
+
+    '''
+    live: int = 0
+    created: int = 0
+    released: int = 0
+
+    # orphans (of disconnected channels) released by the sweeper
+    swept: int = 0
+
+    # unary calls awaiting their reply (see ``ReplySlot``)
+    pending_replies: int = 0
+
+
+@dataclass
+class RpcLoadStats:
+    '''
+    Counters for an actor's rpc admission control.
+
+    '''
+    running: int = 0
+    queued: int = 0
+    max_queued: int = 0
+    admitted: int = 0
+
+    # requests refused with an ``Overloaded`` error
+    rejected: int = 0
+
+    # number of admitted requests which had to wait in the queue and
+    # their queueing delays (in seconds)
+    waited: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+
+
+class ReplySlot:
+    '''
+    A one-shot receiver for the response to a unary (async function)
+    RPC request: a slim stand-in for a full ``Context`` and its feeder
+    mem chan.
+
+    '''
+    __slots__ = ('chan', 'cid', 'msg', '_done')
+
+    def __init__(
+        self,
+        chan: Channel,
+        cid: int,
+
+    ) -> None:
+        self.chan = chan
+        self.cid = cid
+        self.msg: Optional[Msg] = None
+        self._done = trio.Event()
+
+    def deliver(
+        self,
+        msg: Msg,
+
+    ) -> bool:
+        '''
+        Set the reply and return whether it was final; a leading
+        ``'asyncfunc'`` functype msg, only sent when the callee was
+        not asked to validate the endpoint type, is skipped.
+
+        '''
+        if (
+            type(msg) is FuncType
+            and msg.functype == 'asyncfunc'
+        ):
+            return False
+
+        self.msg = msg
+        self._done.set()
+        return True
+
+    async def receive(self) -> Msg:
+        await self._done.wait()
+        assert self.msg is not None
+        return self.msg
+
+
+async def _invoke_inline(
+
+    actor: 'Actor',
+    cid: int,
+    chan: Channel,
+    func: Callable,
+    kwargs: dict[str, Any],
+
+) -> bool:
+    '''
+    Run an ``@rpc(inline=True)`` async function directly in the
+    (calling) msg loop task, without the task, cancel scope and start
+    sync of ``_invoke()``, and send back its result.
+
+    The call is registered as an rpc task, so it can be cancelled like
+    any other, and run under a cancel scope with a deadline of
+    ``Actor.inline_budget``. A call which overruns the budget is
+    aborted at its next checkpoint, the function demoted and ``False``
+    returned: the caller must then run the request again as a normal
+    rpc task, as it will all later requests for the function. Any
+    work done before the first checkpoint may thus be repeated.
+
+    '''
+    cs = trio.CancelScope(
+        deadline=trio.current_time() + actor.inline_budget)
+    is_complete = actor._add_rpc_task(chan, cid, cs, func)
+    msg: Optional[Msg] = None
+    try:
+        with cs:
+            try:
+                msg = Return(cid=cid, pld=await func(**kwargs))
+            except Exception as err:
+                log.exception('Inline rpc %s errored:', func)
+                msg = pack_error(err, cid=cid)
+    finally:
+        actor._pop_rpc_task(chan, cid)
+        is_complete.set()
+        if not actor._rpc_tasks:
+            actor._ongoing_rpc_tasks.set()
+
+    if trio.current_time() >= cs.deadline:
+        # a handler which never checkpoints can't be aborted, its
+        # (late) result is still sent.
+        log.warning(
+            'Inline rpc %s overran the %ss budget; it will be run in a '
+            'task from now on.', func, actor.inline_budget,
+        )
+        actor._inline_demoted.add(func)
+        if msg is None:
+            return False
+
+    if msg is None:
+        # cancelled by request, like a task there's no reply
+        return True
+
+    try:
+        await chan.send(msg)
+    except (
+        trio.ClosedResourceError,
+        trio.BrokenResourceError,
+    ):
+        log.warning(
+            'Failed to respond to %s for inline %s', chan.uid, func)
+
+    return True
+
+
 def _get_mod_abspath(module):
     return os.path.abspath(module.__file__)
 
@@ -399,6 +700,21 @@ class Actor:
     is_arbiter: bool = False
     msg_buffer_size: int = 2**6
 
+    # period between sweeps of the context table for orphans
+    context_sweep_period: float = 30
+
+    # max run time of an ``@rpc(inline=True)`` call in the msg loop
+    inline_budget: float = 1e-3
+
+    # rpc admission control: the max number of concurrently running rpc
+    # tasks (``None`` is unbounded), the max number of requests queued
+    # waiting for a slot (beyond which callers are sent an
+    # ``Overloaded`` error) and queueing priorities by caller (actor)
+    # name, lower runs first and the default is 0.
+    rpc_concurrency: Optional[int] = None
+    rpc_queue_size: int = 2**10
+    rpc_priorities: dict[str, int] = {}
+
     # nursery placeholders filled in by `async_main()` after fork
     _root_n: Optional[trio.Nursery] = None
     _service_n: Optional[trio.Nursery] = None
@@ -426,7 +742,8 @@ class Actor:
         uid: str | None = None,
         loglevel: str | None = None,
         arbiter_addr: Optional[tuple[str, int]] = None,
-        spawn_method: Optional[str] = None
+        spawn_method: Optional[str] = None,
+        msg_transport: Optional[str] = None,
     ) -> None:
         '''
         This constructor is called in the parent actor **before** the spawning
@@ -436,6 +753,10 @@ class Actor:
         self.name = name
         self.uid = (name, uid or str(uuid.uuid4()))
 
+        # seq number for allocating the cids of tasks we request from
+        # other actors, see ``._next_cid()``.
+        self._cid_seq: int = 0
+
         self._cancel_complete = trio.Event()
         self._cancel_called: bool = False
 
@@ -453,8 +774,15 @@ class Actor:
 
         self.enable_modules = mods
         self._mods: dict[str, ModuleType] = {}
+
+        # rpc dispatch table: map {(ns, funcname) -> RpcEndpoint}
+        self._rpc_table: dict[tuple[str, str], RpcEndpoint] = {}
         self.loglevel = loglevel
 
+        # preferred transport for channels this actor connects, if not
+        # set the runtime-wide ``_msg_transport`` setting is used.
+        self._msg_transport = msg_transport
+
         self._arb_addr: tuple[str, int] | None = (
             str(arbiter_addr[0]),
             int(arbiter_addr[1])
@@ -474,17 +802,46 @@ class Actor:
 
         # (chan, cid) -> (cancel_scope, func)
         self._rpc_tasks: dict[
-            tuple[Channel, str],
+            tuple[Channel, int],
             tuple[trio.CancelScope, Callable, trio.Event]
         ] = {}
 
+        # index of the above by channel: chan -> {cids}
+        self._rpc_tasks_by_chan: dict[Channel, set[int]] = {}
+
         # map {actor uids -> Context}
         self._contexts: dict[
-            tuple[tuple[str, str], str],
+            tuple[tuple[str, str], int],
             Context
         ] = {}
+        self._ctx_stats = ContextStats()
+
+        # inline rpc funcs which overran their budget
+        self._inline_demoted: set[Callable] = set()
+
+        # rpc admission state: running task counts (in total and per
+        # func) and the queue of requests waiting for a slot, kept
+        # sorted by (priority, seq).
+        self._rpc_running: int = 0
+        self._rpc_running_per_func: dict[Callable, int] = {}
+        self._rpc_pending: list[tuple] = []
+        self._rpc_seq: int = 0
+        self._rpc_load = RpcLoadStats()
+
+        # pending unary calls: map {(actor uid, cid) -> ReplySlot}
+        self._reply_slots: dict[
+            tuple[tuple[str, str], int],
+            ReplySlot
+        ] = {}
+
+        # orphaned (table index, key) pairs found by the last sweep
+        self._ctx_orphans: set[
+            tuple[int, tuple[tuple[str, str], int]]
+        ] = set()
 
         self._listeners: list[trio.abc.Listener] = []
+        # filesystem path of the UDS channel server, if bound
+        self._uds_path: str | None = None
         self._parent_chan: Optional[Channel] = None
         self._forkserver_info: Optional[
             tuple[Any, Any, Any, Any, Any]] = None
@@ -533,8 +890,10 @@ class Actor:
                 log.runtime(f"Attempting to import {modpath}@{filepath}")
                 mod = importlib.import_module(modpath)
                 self._mods[modpath] = mod
+                self._compile_rpc_table(modpath, mod)
                 if modpath == '__main__':
                     self._mods['__mp_main__'] = mod
+                    self._compile_rpc_table('__mp_main__', mod)
 
         except ModuleNotFoundError:
             # it is expected the corresponding `ModuleNotExposed` error
@@ -542,6 +901,44 @@ class Actor:
             log.error(f"Failed to import {modpath} in {self.name}")
             raise
 
+    def _compile_rpc_table(
+        self,
+        ns: str,
+        mod: ModuleType,
+
+    ) -> None:
+        '''
+        Precompile dispatch table entries for all functions in the
+        enabled module ``mod``.
+
+        '''
+        for name, obj in vars(mod).items():
+            if inspect.isfunction(obj):
+                self._rpc_table[(ns, name)] = _compile_endpoint(obj)
+
+    def _get_rpc_endpoint(
+        self,
+        ns: str,
+        funcname: str,
+
+    ) -> RpcEndpoint:
+        '''
+        Look up the dispatch table entry for ``ns.funcname``, compiling
+        (and caching) it on a miss; the ``'self'`` namespace resolves to
+        methods of this actor.
+
+        '''
+        try:
+            return self._rpc_table[(ns, funcname)]
+        except KeyError:
+            if ns == 'self':
+                func = getattr(self, funcname)
+            else:
+                func = self._get_rpc_func(ns, funcname)
+
+            ep = self._rpc_table[(ns, funcname)] = _compile_endpoint(func)
+            return ep
+
     def _get_rpc_func(self, ns, funcname):
         try:
             return getattr(self._mods[ns], funcname)
@@ -679,8 +1076,8 @@ class Actor:
                         # making sure any RPC response to that call is
                         # delivered the local calling task.
                         # TODO: factor this into a helper?
-                        log.runtime(f'drained {msg} for {chan.uid}')
-                        cid = msg.get('cid')
+                        log.runtime('drained %s for %s', msg, chan.uid)
+                        cid = getattr(msg, 'cid', None)
                         if cid:
                             # deliver response to local caller/waiter
                             await self._push_result(chan, cid, msg)
@@ -767,8 +1164,8 @@ class Actor:
     async def _push_result(
         self,
         chan: Channel,
-        cid: str,
-        msg: dict[str, Any],
+        cid: int,
+        msg: Msg,
     ) -> None:
         '''
         Push an RPC result to the local consumer's queue.
@@ -776,22 +1173,59 @@ class Actor:
         '''
         uid = chan.uid
         assert uid, f"`chan.uid` can't be {uid}"
+        slot = self._reply_slots.get((uid, cid))
+        if slot is not None:
+            if slot.deliver(msg):
+                self._reply_slots.pop((uid, cid), None)
+            return
+
         try:
             ctx = self._contexts[(uid, cid)]
         except KeyError:
             log.warning(
-                f'Ignoring msg from [no-longer/un]known context {uid}:'
-                f'\n{msg}')
+                'Ignoring msg from [no-longer/un]known context %s:\n%s',
+                uid, msg)
             return
 
         send_chan = ctx._send_chan
 
-        log.runtime(f"Delivering {msg} from {chan.uid} to caller {cid}")
+        log.runtime(
+            'Delivering %s from %s to caller %s', msg, chan.uid, cid)
+
+        # stream flow control: grants are consumed by the runtime (even
+        # if not yet enabled on our end, which may happen after).
+        match msg:
+            case Credit(n=n):
+                ctx._grant_credit(n)
+                if not ctx._flow_control:
+                    # the far end's stream is flow controlled, so
+                    # ours must be too (now or once opened).
+                    ctx._peer_flow_control = True
+                    if ctx._stream_opened:
+                        ctx._enable_flow_control()
+                        assert self._service_n
+                        self._service_n.start_soon(
+                            ctx._send_credit, ctx._credit_window)
+                return
+
+            case Stop() | Return() | Error():
+                # the far end won't consume (or grant credit for) any
+                # more stream msgs so unblock any of our senders.
+                ctx._grant_credit(math.inf)
+
+            case Yield() if (
+                ctx._conflate is not None
+                and ctx._conflate_msg(msg)
+            ):
+                # replaced a still buffered value
+                return
 
         # XXX: we do **not** maintain backpressure and instead
         # opt to relay stream overrun errors to the sender.
         try:
             send_chan.send_nowait(msg)
+            ctx._buffered_msg(msg)
+
             # if an error is deteced we should always
             # expect it to be raised by any context (stream)
             # consumer task
@@ -806,7 +1240,7 @@ class Actor:
 
             # XXX: local consumer has closed their side
             # so cancel the far end streaming task
-            log.warning(f"{send_chan} consumer is already closed")
+            log.warning('%s consumer is already closed', send_chan)
             return
 
         except trio.WouldBlock:
@@ -831,27 +1265,27 @@ class Actor:
                 log.warning(text)
                 try:
                     await send_chan.send(msg)
+                    ctx._buffered_msg(msg)
                 except trio.BrokenResourceError:
                     # XXX: local consumer has closed their side
                     # so cancel the far end streaming task
-                    log.warning(f"{chan} is already closed")
+                    log.warning('%s is already closed', chan)
             else:
                 try:
                     raise StreamOverrun(text) from None
                 except StreamOverrun as err:
-                    err_msg = pack_error(err)
-                    err_msg['cid'] = cid
+                    err_msg = pack_error(err, cid=cid)
                     try:
                         await chan.send(err_msg)
                     except trio.BrokenResourceError:
                         # XXX: local consumer has closed their side
                         # so cancel the far end streaming task
-                        log.warning(f"{chan} is already closed")
+                        log.warning('%s is already closed', chan)
 
     def get_context(
         self,
         chan: Channel,
-        cid: str,
+        cid: int,
         msg_buffer_size: Optional[int] = None,
 
     ) -> Context:
@@ -863,7 +1297,7 @@ class Actor:
         task-as-function invocation.
 
         '''
-        log.runtime(f"Getting result queue for {chan.uid} cid {cid}")
+        log.runtime('Getting result queue for %s cid %s', chan.uid, cid)
         actor_uid = chan.uid
         assert actor_uid
         try:
@@ -886,9 +1320,446 @@ class Actor:
                 _recv_chan=recv_chan,
             )
             self._contexts[(actor_uid, cid)] = ctx
+            self._ctx_stats.created += 1
+
+        return ctx
+
+    def _release_context(
+        self,
+        uid: tuple[str, str],
+        cid: int,
+
+    ) -> Optional[Context]:
+        '''
+        Drop a task context from the runtime's tracking table, if it's
+        (still) present.
+
+        '''
+        ctx = self._contexts.pop((uid, cid), None)
+        if ctx is not None:
+            self._ctx_stats.released += 1
 
         return ctx
 
+    def _release_reply_slot(
+        self,
+        slot: ReplySlot,
+
+    ) -> None:
+        self._reply_slots.pop((slot.chan.uid, slot.cid), None)
+
+    def _sweep_contexts(self) -> int:
+        '''
+        Release contexts (and reply slots) orphaned by a (now)
+        disconnected channel and return how many were swept.
+
+        An entry is only swept if it was found orphaned by the previous
+        sweep as well, giving any teardown (msg draining) on the
+        channel a full period to complete.
+
+        '''
+        tables = (self._contexts, self._reply_slots)
+        orphans = {
+            (i, key)
+            for i, table in enumerate(tables)
+            for key, entry in table.items()
+            if not entry.chan.connected()
+            and (entry.chan, entry.cid) not in self._rpc_tasks
+        }
+        swept = 0
+        for i, key in orphans & self._ctx_orphans:
+            log.runtime('Sweeping orphaned context %s', key)
+            if tables[i].pop(key, None) is not None:
+                swept += 1
+
+        self._ctx_orphans = orphans - self._ctx_orphans
+        self._ctx_stats.swept += swept
+        return swept
+
+    async def _context_sweeper(self) -> None:
+        while True:
+            await trio.sleep(self.context_sweep_period)
+            self._sweep_contexts()
+
+    def context_stats(self) -> ContextStats:
+        '''
+        Return the counters for this actor's task context table.
+
+        '''
+        self._ctx_stats.live = len(self._contexts)
+        self._ctx_stats.pending_replies = len(self._reply_slots)
+        return self._ctx_stats
+
+    def rpc_load_stats(self) -> RpcLoadStats:
+        '''
+        Return the counters for this actor's rpc admission control.
+
+        '''
+        self._rpc_load.running = self._rpc_running
+        self._rpc_load.queued = len(self._rpc_pending)
+        return self._rpc_load
+
+    def _admit_rpc(
+        self,
+        ep: RpcEndpoint,
+
+    ) -> bool:
+        '''
+        Reserve a slot to run a task for ``ep`` if both the actor-wide
+        and per-function concurrency limits allow it.
+
+        '''
+        limit = self.rpc_concurrency
+        if limit is not None and self._rpc_running >= limit:
+            return False
+
+        func_limit = ep.max_concurrency
+        running = self._rpc_running_per_func.get(ep.func, 0)
+        if func_limit is not None and running >= func_limit:
+            return False
+
+        self._rpc_running += 1
+        self._rpc_running_per_func[ep.func] = running + 1
+        self._rpc_load.admitted += 1
+        return True
+
+    def _release_rpc(
+        self,
+        ep: RpcEndpoint,
+
+    ) -> None:
+        '''
+        Release the slot held by a completed task for ``ep`` and start
+        as many queued requests as the limits now allow, in priority
+        order.
+
+        '''
+        self._unadmit_rpc(ep)
+        if self._cancel_called:
+            return
+
+        now = time.perf_counter()
+        for entry in self._rpc_pending.copy():
+            limit = self.rpc_concurrency
+            if limit is not None and self._rpc_running >= limit:
+                break
+
+            _, _, queued_at, call = entry
+            if not self._admit_rpc(call[-1]):
+                # this func is at its own limit, try lower priorities
+                continue
+
+            self._rpc_pending.remove(entry)
+            wait = now - queued_at
+            stats = self._rpc_load
+            stats.waited += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            try:
+                assert self._service_n
+                self._service_n.start_soon(self._start_queued_rpc, *call)
+            except RuntimeError:
+                # service nursery closed during teardown, leave the
+                # request queued to be refused by ``_drop_queued_rpcs()``.
+                self._unadmit_rpc(call[-1])
+                self._rpc_pending.insert(0, entry)
+                return
+
+    def _unadmit_rpc(
+        self,
+        ep: RpcEndpoint,
+
+    ) -> None:
+        self._rpc_running -= 1
+        running = self._rpc_running_per_func[ep.func] - 1
+        if running:
+            self._rpc_running_per_func[ep.func] = running
+        else:
+            del self._rpc_running_per_func[ep.func]
+
+    async def _queue_rpc(
+        self,
+        chan: Channel,
+        cid: int,
+        funcname: str,
+        func: Callable,
+        kwargs: dict[str, Any],
+        expect: Optional[str],
+        ep: RpcEndpoint,
+
+    ) -> None:
+        '''
+        Queue a request which could not be admitted to run until
+        a slot frees up, or refuse it with an ``Overloaded`` error if
+        the queue is full.
+
+        '''
+        stats = self._rpc_load
+        if len(self._rpc_pending) >= self.rpc_queue_size:
+            stats.rejected += 1
+            log.warning(
+                f'Rejecting rpc request {funcname} from {chan.uid}, '
+                f'{len(self._rpc_pending)} requests are already queued'
+            )
+            await chan.send(
+                pack_error(
+                    Overloaded(
+                        f'Actor {self.uid} is overloaded, '
+                        f'{self._rpc_running} rpc tasks running and '
+                        f'{len(self._rpc_pending)} queued'
+                    ),
+                    cid=cid,
+                )
+            )
+            return
+
+        assert chan.uid
+        self._rpc_seq += 1
+        bisect.insort(
+            self._rpc_pending,
+            (
+                self.rpc_priorities.get(chan.uid[0], 0),
+                self._rpc_seq,
+                time.perf_counter(),
+                (chan, cid, funcname, func, kwargs, expect, ep),
+            ),
+        )
+        stats.max_queued = max(stats.max_queued, len(self._rpc_pending))
+
+    async def _drop_queued_rpcs(
+        self,
+        chan: Optional[Channel] = None,
+        cid: Optional[int] = None,
+
+    ) -> int:
+        '''
+        Drop queued (not yet started) requests from ``chan``, and with
+        ``cid`` if provided, or all of them if no channel is given.
+
+        The callers are sent a ``ContextCancelled`` error.
+
+        '''
+        dropped = [
+            entry for entry in self._rpc_pending
+            if chan is None or (
+                entry[3][0] is chan
+                and (cid is None or entry[3][1] == cid)
+            )
+        ]
+        for entry in dropped:
+            self._rpc_pending.remove(entry)
+
+        for *_, (qchan, qcid, funcname, *_) in dropped:
+            log.cancel(
+                'Dropping queued rpc request %s (%s)', funcname, qcid)
+            await self._refuse_queued_rpc(qchan, qcid, funcname)
+
+        return len(dropped)
+
+    async def _refuse_queued_rpc(
+        self,
+        chan: Channel,
+        cid: int,
+        funcname: str,
+
+    ) -> None:
+        '''
+        Send the caller of a queued request which will never run
+        a ``ContextCancelled`` error.
+
+        '''
+        if not chan.connected():
+            log.warning(
+                f'Dropped queued rpc request {funcname} ({cid}), '
+                f'{chan.uid} is disconnected'
+            )
+            return
+
+        try:
+            await chan.send(
+                pack_error(
+                    ContextCancelled(
+                        f'Queued request for {funcname} was '
+                        f'cancelled by {self.uid}'
+                    ),
+                    cid=cid,
+                )
+            )
+        except (
+            trio.ClosedResourceError,
+            trio.BrokenResourceError,
+            TransportClosed,
+        ):
+            log.warning(
+                f'Failed to refuse queued rpc request {funcname} '
+                f'({cid}), {chan.uid} is disconnected'
+            )
+
+    async def _start_rpc_task(
+        self,
+        chan: Channel,
+        cid: int,
+        funcname: str,
+        func: Callable,
+        kwargs: dict[str, Any],
+        expect: Optional[str],
+        ep: RpcEndpoint,
+        admitted: bool = False,
+
+    ) -> None:
+        '''
+        Spawn and register a task for an rpc request in the service
+        nursery.
+
+        '''
+        log.runtime('Spawning task for %s', func)
+        assert self._service_n
+        cs = await self._service_n.start(
+            partial(
+                _invoke, self, cid, chan, func, kwargs,
+                expect_functype=expect,
+                endpoint=ep,
+                admitted=admitted,
+            ),
+            name=funcname,
+        )
+
+        # never allow cancelling cancel requests (results in
+        # deadlock and other weird behaviour)
+        # if func != actor.cancel:
+        if isinstance(cs, Exception):
+            log.warning(
+                f"Task for RPC func {func} failed with"
+                f"{cs}")
+        else:
+            log.runtime('RPC func is %s', func)
+            self._add_rpc_task(chan, cid, cs, func)
+
+    def _add_rpc_task(
+        self,
+        chan: Channel,
+        cid: int,
+        cs: trio.CancelScope,
+        func: Callable,
+
+    ) -> trio.Event:
+        '''
+        Register the cancel scope of an rpc task, such that the task
+        can be cancelled gracefully if requested, and return the event
+        to set once it completes.
+
+        '''
+        # mark that we have ongoing rpc tasks
+        if self._ongoing_rpc_tasks.is_set():
+            self._ongoing_rpc_tasks = trio.Event()
+
+        is_complete = trio.Event()
+        self._rpc_tasks[(chan, cid)] = (cs, func, is_complete)
+        self._rpc_tasks_by_chan.setdefault(chan, set()).add(cid)
+        return is_complete
+
+    def _pop_rpc_task(
+        self,
+        chan: Channel,
+        cid: int,
+
+    ) -> tuple[trio.CancelScope, Callable, trio.Event]:
+        '''
+        Remove (and return) a task's entry from the rpc task table and
+        its per-channel index; raises ``KeyError`` if not found.
+
+        '''
+        entry = self._rpc_tasks.pop((chan, cid))
+        cids = self._rpc_tasks_by_chan[chan]
+        cids.discard(cid)
+        if not cids:
+            del self._rpc_tasks_by_chan[chan]
+
+        return entry
+
+    async def _start_queued_rpc(
+        self,
+        *call: Any,
+
+    ) -> None:
+        try:
+            await self._start_rpc_task(*call, admitted=True)
+        except RuntimeError:
+            # service nursery closed before the task was spawned, so
+            # ``_invoke()`` will never release its slot or reply.
+            log.cancel(
+                'Service nursery cancelled before it ran %s', call[2])
+            self._unadmit_rpc(call[-1])
+            with trio.move_on_after(0.5) as cs:
+                cs.shield = True
+                await self._refuse_queued_rpc(*call[:3])
+
+        except BaseExceptionGroup:
+            # service nursery cancelled before the task started
+            log.cancel(
+                'Service nursery cancelled before it ran %s', call[2])
+
+    def _next_cid(
+        self,
+        chan: Channel,
+
+    ) -> int:
+        '''
+        Allocate a compact integer cid for a task request sent over
+        ``chan``.
+
+        Contexts are keyed by ``(peer uid, cid)`` for both the tasks we
+        request and those requested by the peer, so each side of an
+        actor pair draws from a disjoint (odd/even) cid space picked by
+        comparing uids. The seq is actor-wide and never reset such that
+        cids are not reused across channels (eg. after a reconnect) to
+        the same peer.
+
+        '''
+        self._cid_seq += 1
+        return 2 * self._cid_seq + int(self.uid > chan.uid)
+
+    async def start_unary_task(
+        self,
+        chan: Channel,
+        ns: str,
+        func: str,
+        kwargs: dict,
+        expect_functype: Optional[str] = 'asyncfunc',
+
+    ) -> ReplySlot:
+        '''
+        Send a ``Cmd`` requesting a single response (async function)
+        task and return the ``ReplySlot`` to which its ``Return`` (or
+        ``Error``) will be delivered.
+
+        Unlike ``.start_remote_task()`` no ``Context`` (nor feeder mem
+        chan) is allocated.
+
+        '''
+        assert chan.uid
+        cid = self._next_cid(chan)
+        slot = ReplySlot(chan, cid)
+        self._reply_slots[(chan.uid, cid)] = slot
+        log.runtime(
+            'Sending cmd to %s: %s.%s(%s)', chan.uid, ns, func, kwargs)
+        try:
+            await chan.send(
+                Cmd(
+                    cid=cid,
+                    ns=ns,
+                    func=func,
+                    kwargs=kwargs,
+                    uid=self.uid,
+                    expect=expect_functype,
+                )
+            )
+        except BaseException:
+            self._release_reply_slot(slot)
+            raise
+
+        return slot
+
     async def start_remote_task(
         self,
         chan: Channel,
@@ -896,6 +1767,7 @@ class Actor:
         func: str,
         kwargs: dict,
         msg_buffer_size: Optional[int] = None,
+        expect_functype: Optional[str] = None,
 
     ) -> Context:
         '''
@@ -906,26 +1778,55 @@ class Actor:
         side task ``Context`` that can be used to wait for responses
         delivered by the local runtime's message processing loop.
 
+        When ``expect_functype`` is ``'asyncfunc'`` or ``'context'`` the
+        validation is instead done by the callee and the context is
+        returned without waiting on a response; the first msg delivered
+        to it is then the ``Return`` or ``Started`` (or an ``Error``).
+
         '''
-        cid = str(uuid.uuid4())
         assert chan.uid
+        cid = self._next_cid(chan)
         ctx = self.get_context(chan, cid, msg_buffer_size=msg_buffer_size)
-        log.runtime(f"Sending cmd to {chan.uid}: {ns}.{func}({kwargs})")
-        await chan.send({'cmd': (ns, func, kwargs, self.uid, cid)})
-
-        # Wait on first response msg and validate; this should be
-        # immediate.
-        first_msg = await ctx._recv_chan.receive()
-        functype = first_msg.get('functype')
+        log.runtime(
+            'Sending cmd to %s: %s.%s(%s)', chan.uid, ns, func, kwargs)
+        try:
+            await chan.send(
+                Cmd(
+                    cid=cid,
+                    ns=ns,
+                    func=func,
+                    kwargs=kwargs,
+                    uid=self.uid,
+                    expect=expect_functype,
+                )
+            )
+            if expect_functype in ('asyncfunc', 'context'):
+                ctx._remote_func_type = expect_functype
+                return ctx
+
+            # Wait on first response msg and validate; this should be
+            # immediate.
+            first_msg = await ctx._recv_chan.receive()
+            match first_msg:
+                case FuncType(functype=functype) if functype in (
+                    'asyncfunc',
+                    'asyncgen',
+                    'context',
+                ):
+                    ctx._remote_func_type = functype
+                    return ctx
 
-        if 'error' in first_msg:
-            raise unpack_error(first_msg, chan)
+                case Error():
+                    raise unpack_error(first_msg, chan)
 
-        elif functype not in ('asyncfunc', 'asyncgen', 'context'):
-            raise ValueError(f"{first_msg} is an invalid response packet?")
+                case _:
+                    raise ValueError(
+                        f"{first_msg} is an invalid response packet?")
 
-        ctx._remote_func_type = functype
-        return ctx
+        except BaseException:
+            # the context never made it to the caller
+            self._release_context(chan.uid, cid)
+            raise
 
     async def _from_parent(
         self,
@@ -1017,11 +1918,73 @@ class Actor:
                     "Started tcp server(s) on"
                     f" {[getattr(l, 'socket', 'unknown socket') for l in l]}")
                 self._listeners.extend(l)
+
+                # actors which use the uds transport also listen on
+                # a UDS path such that same-host peers can avoid the
+                # loopback TCP stack.
+                uds_listener: trio.SocketListener | None = None
+                if (
+                    _has_uds
+                    and (
+                        self._msg_transport
+                        or _state._runtime_vars['_msg_transport']
+                    ) == 'uds'
+                ):
+                    try:
+                        uds_listener = await self._open_uds_listener()
+                    except OSError as err:
+                        log.warning(
+                            f'Failed to bind uds server on '
+                            f'{get_uds_path(self.uid)}, serving tcp '
+                            f'only:\n{err}'
+                        )
+
+                if uds_listener:
+                    await server_n.start(
+                        partial(
+                            trio.serve_listeners,
+                            self._stream_handler,
+                            [uds_listener],
+                            handler_nursery=handler_nursery,
+                        )
+                    )
+                    log.runtime(f"Started uds server on {self._uds_path}")
+                    self._listeners.append(uds_listener)
+
                 task_status.started(server_n)
         finally:
+            if self._uds_path:
+                try:
+                    os.unlink(self._uds_path)
+                except FileNotFoundError:
+                    pass
+
             # signal the server is down since nursery above terminated
             self._server_down.set()
 
+    async def _open_uds_listener(self) -> trio.SocketListener:
+        '''
+        Bind and listen on this actor's unix domain socket path.
+
+        '''
+        path = get_uds_path(self.uid)
+        try:
+            # remove any stale socket file from a prior crashed run
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+        sock = trio.socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            await sock.bind(path)
+            sock.listen()
+        except BaseException:
+            sock.close()
+            raise
+
+        self._uds_path = path
+        return trio.SocketListener(sock)
+
     def cancel_soon(self) -> None:
         '''
         Cancel this actor asap; can be called from a sync context.
@@ -1086,6 +2049,75 @@ class Actor:
     #         for n in root.child_nurseries:
     #             n.cancel_scope.cancel()
 
+    @context
+    async def _run_batch(
+        self,
+        ctx: Context,
+        ns: str,
+        func: str,
+
+    ) -> None:
+        '''
+        Run batches of calls to the (unary) async function ``ns.func``,
+        see ``Portal.map()``.
+
+        Each stream msg received is a batch of ``[index, kwargs]``
+        invocations which are each run in a task; their results are
+        streamed back, batched by completion, as ``[index, ok, result]``
+        entries where ``result`` is the ``[type_str, tb_str]`` of the
+        error when not ``ok``.
+
+        '''
+        ep = self._get_rpc_endpoint(ns, func)
+        if ep.functype != 'asyncfunc':
+            raise TypeError(
+                f'{ep.func} is an `{ep.functype}` endpoint but only '
+                '`asyncfunc`s can be batched'
+            )
+
+        await ctx.started()
+
+        done_tx, done_rx = trio.open_memory_channel(float('inf'))
+
+        async def run_item(
+            index: int,
+            kwargs: dict[str, Any],
+        ) -> None:
+            try:
+                entry = [index, True, await ep.func(**kwargs)]
+            except Exception as err:
+                err_msg = pack_error(err)
+                entry = [index, False, [err_msg.type_str, err_msg.tb_str]]
+
+            done_tx.send_nowait(entry)
+
+        async with (
+            ctx.open_stream() as stream,
+            trio.open_nursery() as n,
+        ):
+            async def send_results() -> None:
+                async for entry in done_rx:
+                    # send all results which completed since the last
+                    # send as one msg.
+                    batch = [entry]
+                    while True:
+                        try:
+                            batch.append(done_rx.receive_nowait())
+                        except trio.WouldBlock:
+                            break
+
+                    await stream.send(batch)
+
+            n.start_soon(send_results)
+
+            async for batch in stream:
+                for index, kwargs in batch:
+                    n.start_soon(run_item, index, kwargs)
+
+            # the caller stopped the stream, either after receiving all
+            # results or to abandon any which are still pending.
+            n.cancel_scope.cancel()
+
     async def _cancel_task(self, cid, chan):
         '''
         Cancel a local task by call-id / channel.
@@ -1103,7 +2135,8 @@ class Actor:
             # be cancelled was indeed spawned by a request from this channel
             scope, func, is_complete = self._rpc_tasks[(chan, cid)]
         except KeyError:
-            log.cancel(f"{cid} has already completed/terminated?")
+            if not await self._drop_queued_rpcs(chan, cid):
+                log.cancel(f"{cid} has already completed/terminated?")
             return
 
         log.cancel(
@@ -1132,28 +2165,47 @@ class Actor:
         only_chan: Optional[Channel] = None,
     ) -> None:
         '''
-        Cancel all existing RPC responder tasks using the cancel scope
-        registered for each.
+        Cancel all existing RPC responder tasks, or only those requested
+        over ``only_chan``, using the cancel scope registered for each.
+
+        All scopes are cancelled up front after which we wait once for
+        the whole batch to complete.
+
+        Queued requests (see ``rpc_concurrency``) are dropped first.
 
         '''
-        tasks = self._rpc_tasks
-        if tasks:
-            log.cancel(f"Cancelling all {len(tasks)} rpc tasks:\n{tasks} ")
-            for (
-                (chan, cid),
-                (scope, func, is_complete),
-            ) in tasks.copy().items():
-                if only_chan is not None:
-                    if only_chan != chan:
-                        continue
+        await self._drop_queued_rpcs(only_chan)
 
-                # TODO: this should really done in a nursery batch
-                if func != self._cancel_task:
-                    await self._cancel_task(cid, chan)
+        if only_chan is None:
+            keys = list(self._rpc_tasks)
+        else:
+            keys = [
+                (only_chan, cid)
+                for cid in self._rpc_tasks_by_chan.get(only_chan, ())
+            ]
 
-            log.cancel(
-                f"Waiting for remaining rpc tasks to complete {tasks}")
+        if not keys:
+            return
+
+        log.cancel(f"Cancelling {len(keys)} rpc tasks")
+        pending: list[trio.Event] = []
+        for key in keys:
+            scope, func, is_complete = self._rpc_tasks[key]
+
+            # never cancel cancel requests (results in deadlock)
+            if func == self._cancel_task:
+                continue
+
+            scope.cancel()
+            pending.append(is_complete)
+
+        log.cancel(
+            f"Waiting for {len(pending)} cancelled rpc tasks to complete")
+        if only_chan is None:
             await self._ongoing_rpc_tasks.wait()
+        else:
+            for is_complete in pending:
+                await is_complete.wait()
 
     def cancel_server(self) -> None:
         '''
@@ -1174,6 +2226,15 @@ class Actor:
         # throws OSError on failure
         return self._listeners[0].socket.getsockname()  # type: ignore
 
+    @property
+    def uds_addr(self) -> Optional[tuple[str]]:
+        '''
+        Address of this actor's unix domain socket channel server (if
+        one is bound) encoded as a ``(path,)`` tuple.
+
+        '''
+        return (self._uds_path,) if self._uds_path else None
+
     def get_parent(self) -> Portal:
         '''
         Return a portal to our parent actor.
@@ -1201,14 +2262,46 @@ class Actor:
         parlance.
 
         '''
-        await chan.send(self.uid)
-        value = await chan.recv()
-        uid: tuple[str, str] = (str(value[0]), str(value[1]))
+        # advertise our host and transport capabilities such that
+        # same-host peers can negotiate a shared memory transport; an
+        # accepting channel offers it to any peer which asks.
+        caps = get_shm_caps(
+            want_shm=(
+                chan._accepted
+                or (
+                    self._msg_transport
+                    or _state._runtime_vars['_msg_transport']
+                ) == 'shm'
+            ),
+        )
+        caps['compression'] = get_compression_caps()
+        await chan.send(Handshake(uid=self.uid, caps=caps))
+        msg = await chan.recv()
 
-        if not isinstance(uid, tuple):
-            raise ValueError(f"{uid} is not a valid uid?!")
+        if not isinstance(msg, Handshake):
+            raise ValueError(f"{msg} is not a valid handshake?!")
+
+        uid: tuple[str, str] = msg.uid
+        chan.uid = uid
+
+        if not (
+            can_upgrade_to_shm(caps, msg.caps)
+            and await maybe_upgrade_to_shm(chan)
+        ):
+            # compressing frames copied through shared memory makes no
+            # sense so it's only negotiated for socket transports.
+            codec = negotiate_compression(
+                caps['compression'],
+                msg.caps.get('compression', {}),
+                accepted=chan._accepted,
+            )
+            if codec:
+                assert chan.msgstream
+                chan.msgstream.set_compression(codec)
+                log.transport(  # type: ignore
+                    f'Using {codec} frame compression for {uid}'
+                )
 
-        chan.uid = str(uid[0]), str(uid[1])
         log.runtime(f"Handshake with actor {uid}@{chan.raddr} complete")
         return uid
 
@@ -1295,6 +2388,7 @@ async def async_main(
                         accept_port=port
                     )
                 )
+                service_nursery.start_soon(actor._context_sweeper)
                 accept_addr = actor.accept_addr
                 if _state._runtime_vars['_is_root']:
                     _state._runtime_vars['_root_mailbox'] = accept_addr
@@ -1309,6 +2403,8 @@ async def async_main(
                         'register_actor',
                         uid=actor.uid,
                         sockaddr=accept_addr,
+                        udsaddr=actor.uds_addr,
+                        hostname=socket.gethostname(),
                     )
 
                 registered_with_arbiter = True
@@ -1435,7 +2531,7 @@ async def process_messages(
     msg = None
     nursery_cancelled_before_task: bool = False
 
-    log.runtime(f"Entering msg loop for {chan} from {chan.uid}")
+    log.runtime('Entering msg loop for %s from %s', chan, chan.uid)
     try:
         with trio.CancelScope(shield=shield) as loop_cs:
             # this internal scope allows for keeping this message
@@ -1444,161 +2540,200 @@ async def process_messages(
             # a locally spawned task) and recieve this scope using
             # ``scope = Nursery.start()``
             task_status.started(loop_cs)
-            async for msg in chan:
+            async for msgs in chan.iter_batches():
+                for i, msg in enumerate(msgs):
 
-                if msg is None:  # loop terminate sentinel
+                    if msg is None:  # loop terminate sentinel
 
-                    log.cancel(
-                        f"Channel to {chan.uid} terminated?\n"
-                        "Cancelling all associated tasks..")
+                        log.cancel(
+                            'Channel to %s terminated?\n'
+                            'Cancelling all associated tasks..', chan.uid)
 
-                    for (channel, cid) in actor._rpc_tasks.copy():
-                        if channel is chan:
-                            await actor._cancel_task(cid, channel)
+                        await actor.cancel_rpc_tasks(chan)
 
-                    log.runtime(
-                            f"Msg loop signalled to terminate for"
-                            f" {chan} from {chan.uid}")
+                        log.runtime(
+                            'Msg loop signalled to terminate for %s from %s',
+                            chan, chan.uid)
 
-                    break
-
-                log.transport(   # type: ignore
-                    f"Received msg {msg} from {chan.uid}")
-
-                cid = msg.get('cid')
-                if cid:
-                    # deliver response to local caller/waiter
-                    await actor._push_result(chan, cid, msg)
+                        break
 
-                    log.runtime(
-                        f"Waiting on next msg for {chan} from {chan.uid}")
-                    continue
+                    log.transport(   # type: ignore
+                        'Received msg %s from %s', msg, chan.uid)
+
+                    match msg:
+                        case Cmd(
+                            cid=cid,
+                            ns=ns,
+                            func=funcname,
+                            kwargs=kwargs,
+                            uid=actorid,
+                            expect=expect,
+                        ):
+                            # process command request below
+                            pass
+
+                        case Error(cid=None):
+                            # This is the non-rpc error case, that is, an
+                            # error **not** raised inside a call to
+                            # ``_invoke()`` (i.e. no cid was provided in the
+                            # msg - see below). Push this error to all local
+                            # channel consumers (normally portals) by marking
+                            # the channel as errored
+                            assert chan.uid
+                            exc = unpack_error(msg, chan=chan)
+                            chan._exc = exc
+                            raise exc
+
+                        case Msg(cid=cid):  # type: ignore
+                            # deliver response to local caller/waiter
+                            await actor._push_result(chan, cid, msg)
 
-                # process command request
-                try:
-                    ns, funcname, kwargs, actorid, cid = msg['cmd']
-                except KeyError:
-                    # This is the non-rpc error case, that is, an
-                    # error **not** raised inside a call to ``_invoke()``
-                    # (i.e. no cid was provided in the msg - see above).
-                    # Push this error to all local channel consumers
-                    # (normally portals) by marking the channel as errored
-                    assert chan.uid
-                    exc = unpack_error(msg, chan=chan)
-                    chan._exc = exc
-                    raise exc
+                            log.runtime(
+                                'Waiting on next msg for %s from %s',
+                                chan, chan.uid)
+                            continue
 
-                log.runtime(
-                    f"Processing request from {actorid}\n"
-                    f"{ns}.{funcname}({kwargs})")
-
-                if ns == 'self':
-                    func = getattr(actor, funcname)
-
-                    if funcname == 'cancel':
-
-                        # don't start entire actor runtime
-                        # cancellation if this actor is in debug
-                        # mode
-                        pdb_complete = _debug.Lock.local_pdb_complete
-                        if pdb_complete:
-                            await pdb_complete.wait()
-
-                        # we immediately start the runtime machinery
-                        # shutdown
-                        with trio.CancelScope(shield=True):
-                            # actor.cancel() was called so kill this
-                            # msg loop and break out into
-                            # ``async_main()``
-                            log.cancel(
-                                f"Actor {actor.uid} was remotely cancelled "
-                                f"by {chan.uid}"
+                        case _:
+                            log.warning(
+                                'Ignoring unexpected msg from %s:\n%s',
+                                chan.uid, msg,
                             )
-                            await _invoke(
-                                actor, cid, chan, func, kwargs, is_rpc=False
-                            )
-
-                        loop_cs.cancel()
-                        break
-
-                    if funcname == '_cancel_task':
+                            continue
 
-                        # we immediately start the runtime machinery
-                        # shutdown
-                        with trio.CancelScope(shield=True):
-                            # actor.cancel() was called so kill this
-                            # msg loop and break out into
-                            # ``async_main()``
-                            kwargs['chan'] = chan
-                            log.cancel(
-                                f'Remote request to cancel task\n'
-                                f'remote actor: {chan.uid}\n'
-                                f'task: {cid}'
-                            )
-                            try:
+                    log.runtime(
+                        'Processing request from %s\n%s.%s(%s)',
+                        actorid, ns, funcname, kwargs)
+
+                    if ns == 'self':
+                        ep = actor._get_rpc_endpoint(ns, funcname)
+                        func = ep.func
+
+                        if funcname == 'cancel':
+
+                            # don't start entire actor runtime
+                            # cancellation if this actor is in debug
+                            # mode
+                            pdb_complete = _debug.Lock.local_pdb_complete
+                            if pdb_complete:
+                                await pdb_complete.wait()
+
+                            # we immediately start the runtime machinery
+                            # shutdown
+                            with trio.CancelScope(shield=True):
+                                # actor.cancel() was called so kill this
+                                # msg loop and break out into
+                                # ``async_main()``
+                                log.cancel(
+                                    'Actor %s was remotely cancelled by %s',
+                                    actor.uid, chan.uid,
+                                )
                                 await _invoke(
-                                    actor,
-                                    cid,
-                                    chan,
-                                    func,
-                                    kwargs,
+                                    actor, cid, chan, func, kwargs,
                                     is_rpc=False,
+                                    expect_functype=expect,
+                                    endpoint=ep,
                                 )
-                            except BaseException:
-                                log.exception("failed to cancel task?")
 
+                            loop_cs.cancel()
+                            break
+
+                        if funcname == '_cancel_task':
+
+                            # we immediately start the runtime machinery
+                            # shutdown
+                            with trio.CancelScope(shield=True):
+                                # actor.cancel() was called so kill this
+                                # msg loop and break out into
+                                # ``async_main()``
+                                kwargs['chan'] = chan
+                                log.cancel(
+                                    'Remote request to cancel task\n'
+                                    'remote actor: %s\n'
+                                    'task: %s',
+                                    chan.uid, cid,
+                                )
+                                try:
+                                    await _invoke(
+                                        actor,
+                                        cid,
+                                        chan,
+                                        func,
+                                        kwargs,
+                                        is_rpc=False,
+                                        expect_functype=expect,
+                                        endpoint=ep,
+                                    )
+                                except BaseException:
+                                    log.exception("failed to cancel task?")
+
+                                continue
+                    else:
+                        # complain to client about restricted modules
+                        try:
+                            ep = actor._get_rpc_endpoint(ns, funcname)
+                            func = ep.func
+                        except (ModuleNotExposed, AttributeError) as err:
+                            err_msg = pack_error(err, cid=cid)
+                            await chan.send(err_msg)
                             continue
-                else:
-                    # complain to client about restricted modules
-                    try:
-                        func = actor._get_rpc_func(ns, funcname)
-                    except (ModuleNotExposed, AttributeError) as err:
-                        err_msg = pack_error(err)
-                        err_msg['cid'] = cid
-                        await chan.send(err_msg)
+
+                    # run trivial (unary) handlers in this loop task,
+                    # except in debug mode where a crash must be able to
+                    # engage the debugger (over IPC).
+                    if (
+                        expect == 'asyncfunc'
+                        and ep.inline
+                        and func not in actor._inline_demoted
+                        and not _state.debug_mode()
+                    ):
+                        if await _invoke_inline(
+                            actor, cid, chan, func, kwargs,
+                        ):
+                            continue
+
+                        # the call overran its budget and was aborted,
+                        # run it (again) in a task.
+
+                    # runtime ('self') requests bypass admission
+                    # control, others wait for a free slot.
+                    admitted: bool = ns != 'self'
+                    if admitted and not actor._admit_rpc(ep):
+                        await actor._queue_rpc(
+                            chan, cid, funcname, func, kwargs, expect, ep,
+                        )
                         continue
 
-                # spin up a task for the requested function
-                log.runtime(f"Spawning task for {func}")
-                assert actor._service_n
-                try:
-                    cs = await actor._service_n.start(
-                        partial(_invoke, actor, cid, chan, func, kwargs),
-                        name=funcname,
-                    )
-                except (
-                    RuntimeError,
-                    BaseExceptionGroup,
-                ):
-                    # avoid reporting a benign race condition
-                    # during actor runtime teardown.
-                    nursery_cancelled_before_task = True
-                    break
-
-                # never allow cancelling cancel requests (results in
-                # deadlock and other weird behaviour)
-                # if func != actor.cancel:
-                if isinstance(cs, Exception):
-                    log.warning(
-                        f"Task for RPC func {func} failed with"
-                        f"{cs}")
+                    # spin up a task for the requested function
+                    try:
+                        await actor._start_rpc_task(
+                            chan, cid, funcname, func, kwargs, expect, ep,
+                            admitted=admitted,
+                        )
+                    except (
+                        RuntimeError,
+                        BaseExceptionGroup,
+                    ):
+                        # avoid reporting a benign race condition
+                        # during actor runtime teardown.
+                        nursery_cancelled_before_task = True
+                        break
+
+                    log.runtime(
+                        'Waiting on next msg for %s from %s', chan, chan.uid)
                 else:
-                    # mark that we have ongoing rpc tasks
-                    actor._ongoing_rpc_tasks = trio.Event()
-                    log.runtime(f"RPC func is {func}")
-                    # store cancel scope such that the rpc task can be
-                    # cancelled gracefully if requested
-                    actor._rpc_tasks[(chan, cid)] = (
-                        cs, func, trio.Event())
+                    continue
 
-                log.runtime(
-                    f"Waiting on next msg for {chan} from {chan.uid}")
+                # the inner (per msg) loop was broken, leave any msgs
+                # after the terminating one for the chan's next reader.
+                if rest := msgs[i + 1:]:
+                    chan.unrecv(rest)
+
+                break
 
             # end of async for, channel disconnect vis
             # ``trio.EndOfChannel``
             log.runtime(
-                f"{chan} for {chan.uid} disconnected, cancelling tasks"
-            )
+                '%s for %s disconnected, cancelling tasks', chan, chan.uid)
             await actor.cancel_rpc_tasks(chan)
 
     except (
@@ -1610,8 +2745,8 @@ async def process_messages(
         # the message loop and expect the teardown sequence to clean
         # up.
         log.runtime(
-            f'channel from {chan.uid} closed abruptly:\n'
-            f'-> {chan.raddr}\n'
+            'channel from %s closed abruptly:\n-> %s\n',
+            chan.uid, chan.raddr,
         )
 
         # transport **was** disconnected
@@ -1625,8 +2760,7 @@ async def process_messages(
             sn = actor._service_n
             assert sn and sn.cancel_scope.cancel_called
             log.cancel(
-                f'Service nursery cancelled before it handled {funcname}'
-            )
+                'Service nursery cancelled before it handled %s', funcname)
         else:
             # ship any "internal" exception (i.e. one from internal
             # machinery not from an rpc task) to parent
@@ -1641,8 +2775,8 @@ async def process_messages(
     finally:
         # msg debugging for when he machinery is brokey
         log.runtime(
-            f"Exiting msg loop for {chan} from {chan.uid} "
-            f"with last msg:\n{msg}")
+            'Exiting msg loop for %s from %s with last msg:\n%s',
+            chan, chan.uid, msg)
 
     # transport **was not** disconnected
     return False
@@ -1667,6 +2801,12 @@ class Arbiter(Actor):
             tuple[str, str],
             tuple[str, int],
         ] = {}
+        # uid -> (hostname, uds path) for actors which bound a UDS
+        # channel server; handed out to same-host peers only.
+        self._uds_registry: dict[
+            tuple[str, str],
+            tuple[str, str],
+        ] = {}
         self._waiters: dict[
             str,
             # either an event to sync to receiving an actor uid (which
@@ -1677,15 +2817,35 @@ class Arbiter(Actor):
 
         super().__init__(*args, **kwargs)
 
+    def _get_addr(
+        self,
+        uid: tuple[str, str],
+        hostname: str | None = None,
+
+    ) -> tuple[str, int] | tuple[str]:
+        '''
+        Return the best address for ``uid``: its UDS path if the
+        requester is on the same ``hostname``, otherwise its TCP
+        sockaddr.
+
+        '''
+        if hostname:
+            entry = self._uds_registry.get(uid)
+            if entry and entry[0] == hostname:
+                return (entry[1],)
+
+        return self._registry[uid]
+
     async def find_actor(
         self,
         name: str,
+        hostname: str | None = None,
 
-    ) -> tuple[str, int] | None:
+    ) -> tuple[str, int] | tuple[str] | None:
 
-        for uid, sockaddr in self._registry.items():
+        for uid in self._registry:
             if name in uid:
-                return sockaddr
+                return self._get_addr(uid, hostname)
 
         return None
 
@@ -1708,8 +2868,9 @@ class Arbiter(Actor):
     async def wait_for_actor(
         self,
         name: str,
+        hostname: str | None = None,
 
-    ) -> list[tuple[str, int]]:
+    ) -> list[tuple[str, int] | tuple[str]]:
         '''
         Wait for a particular actor to register.
 
@@ -1717,12 +2878,11 @@ class Arbiter(Actor):
         registered.
 
         '''
-        sockaddrs: list[tuple[str, int]] = []
-        sockaddr: tuple[str, int]
+        sockaddrs: list[tuple[str, int] | tuple[str]] = []
 
-        for (aname, _), sockaddr in self._registry.items():
-            if name == aname:
-                sockaddrs.append(sockaddr)
+        for uid in self._registry:
+            if name == uid[0]:
+                sockaddrs.append(self._get_addr(uid, hostname))
 
         if not sockaddrs:
             waiter = trio.Event()
@@ -1731,18 +2891,22 @@ class Arbiter(Actor):
 
             for uid in self._waiters[name]:
                 if not isinstance(uid, trio.Event):
-                    sockaddrs.append(self._registry[uid])
+                    sockaddrs.append(self._get_addr(uid, hostname))
 
         return sockaddrs
 
     async def register_actor(
         self,
         uid: tuple[str, str],
-        sockaddr: tuple[str, int]
+        sockaddr: tuple[str, int],
+        udsaddr: tuple[str] | None = None,
+        hostname: str | None = None,
 
     ) -> None:
         uid = name, _ = (str(uid[0]), str(uid[1]))
         self._registry[uid] = (str(sockaddr[0]), int(sockaddr[1]))
+        if udsaddr and hostname:
+            self._uds_registry[uid] = (str(hostname), str(udsaddr[0]))
 
         # pop and signal all waiter events
         events = self._waiters.pop(name, [])
@@ -1758,3 +2922,4 @@ class Arbiter(Actor):
     ) -> None:
         uid = (str(uid[0]), str(uid[1]))
         self._registry.pop(uid)
+        self._uds_registry.pop(uid, None)
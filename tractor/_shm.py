@@ -0,0 +1,435 @@
+# tractor: structured concurrent "actors".
+# Copyright 2018-eternity Tyler Goodlet.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+'''
+Shared memory ring-buffer IPC transport for same-host actors.
+
+Each direction of a channel is a single-producer, single-consumer
+(SPSC) byte ring allocated with ``multiprocessing.shared_memory``.
+The original socket connection is kept as the "control plane": it is
+used for the initial handshake, to deliver (1 byte) wakeups to a reader
+which has parked waiting for data and to detect peer disconnects via
+EOF.
+
+'''
+from __future__ import annotations
+from multiprocessing import shared_memory
+from multiprocessing import resource_tracker
+import socket
+import struct
+import threading
+import uuid
+from typing import (
+    Any,
+    TYPE_CHECKING,
+)
+
+import trio
+
+from .log import get_logger
+from ._ipc import (
+    _is_windows,
+    MsgpackTCPStream,
+)
+
+if TYPE_CHECKING:
+    from ._ipc import Channel
+
+
+log = get_logger(__name__)
+
+
+_has_shm: bool = not _is_windows
+
+# default per-direction ring capacity in bytes
+_default_ring_size: int = 2**20
+
+# header layout: all fields are 8-byte aligned unsigned ints
+#
+# - head: total bytes ever written (only written by the producer)
+# - tail: total bytes ever read (only written by the consumer)
+# - parked: consumer is blocked waiting on a wakeup
+_HEAD: int = 0
+_TAIL: int = 8
+_PARKED: int = 16
+_HDR_SIZE: int = 64
+
+_u64 = struct.Struct('<Q')
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    '''
+    Attach to an existing shared memory segment without registering it
+    with the local ``resource_tracker`` (which would otherwise unlink it
+    on process exit, the segment is owned by the creating actor).
+
+    '''
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(
+            shm._name,  # type: ignore
+            'shared_memory',
+        )
+    except Exception:
+        pass
+
+    return shm
+
+
+class RingBuffer:
+    '''
+    A SPSC byte ring in a shared memory segment.
+
+    Positions are monotonically increasing byte counts such that the
+    amount of readable data is always ``head - tail``; this means no
+    slot is ever "wasted" to disambiguate full from empty.
+
+    '''
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        size: int,
+
+    ) -> None:
+        self._shm = shm
+        self._buf = shm.buf
+        self.size = size
+
+    @classmethod
+    def create(
+        cls,
+        size: int = _default_ring_size,
+
+    ) -> RingBuffer:
+        shm = shared_memory.SharedMemory(
+            name=f'tractor_{uuid.uuid4().hex[:16]}',
+            create=True,
+            size=_HDR_SIZE + size,
+        )
+        shm.buf[:_HDR_SIZE] = bytes(_HDR_SIZE)
+        return cls(shm, size)
+
+    @classmethod
+    def attach(
+        cls,
+        name: str,
+        size: int,
+
+    ) -> RingBuffer:
+        return cls(_attach_shm(name), size)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _get(self, field: int) -> int:
+        return _u64.unpack_from(self._buf, field)[0]
+
+    def _set(self, field: int, value: int) -> None:
+        _u64.pack_into(self._buf, field, value)
+
+    def readable(self) -> int:
+        return self._get(_HEAD) - self._get(_TAIL)
+
+    def writable(self) -> int:
+        return self.size - self.readable()
+
+    @property
+    def parked(self) -> bool:
+        return bool(self._get(_PARKED))
+
+    @parked.setter
+    def parked(self, value: bool) -> None:
+        self._set(_PARKED, int(value))
+
+    def write(self, data: memoryview) -> int:
+        '''
+        Write as much of ``data`` as there is free space for and return
+        the number of bytes written.
+
+        '''
+        head = self._get(_HEAD)
+        n = min(len(data), self.size - (head - self._get(_TAIL)))
+        if not n:
+            return 0
+
+        start = head % self.size
+        first = min(n, self.size - start)
+        off = _HDR_SIZE + start
+        self._buf[off:off + first] = data[:first]
+        if first < n:
+            # wrap around to the start of the ring
+            self._buf[_HDR_SIZE:_HDR_SIZE + n - first] = data[first:n]
+
+        # publish only after the payload has been copied in
+        self._set(_HEAD, head + n)
+        return n
+
+    def read(self, max_bytes: int) -> bytes:
+        '''
+        Read (and consume) up to ``max_bytes`` of available data.
+
+        '''
+        tail = self._get(_TAIL)
+        n = min(max_bytes, self._get(_HEAD) - tail)
+        if not n:
+            return b''
+
+        start = tail % self.size
+        first = min(n, self.size - start)
+        off = _HDR_SIZE + start
+        data = bytes(self._buf[off:off + first])
+        if first < n:
+            data += bytes(self._buf[_HDR_SIZE:_HDR_SIZE + n - first])
+
+        self._set(_TAIL, tail + n)
+        return data
+
+    def close(self) -> None:
+        self._buf = None  # type: ignore
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.unlink()
+
+
+# an (uncontended) lock round trip is a full memory barrier, its
+# atomic ops order prior stores before later loads, which python
+# doesn't otherwise expose.
+_fence_lock = threading.Lock()
+
+
+def _fence() -> None:
+    _fence_lock.acquire()
+    _fence_lock.release()
+
+
+class RingBufferStream(trio.abc.Stream):
+    '''
+    A ``trio.abc.Stream`` which transfers bytes through a pair of
+    shared memory rings (one per direction) and uses the wrapped socket
+    stream only for reader wakeups and disconnect detection.
+
+    A reader with nothing to read sets its ring's parked flag and then
+    re-checks the ring, while a writer publishes its data and then
+    checks the flag (each side fenced in between) so that at least one
+    of them always sees the other: either the reader finds the data or
+    the writer rings the doorbell (a byte over the socket).
+
+    '''
+    # bounds on the backoff used by a producer waiting on ring space
+    _min_backoff: float = 1e-5
+    _max_backoff: float = 1e-3
+
+    def __init__(
+        self,
+        stream: trio.SocketStream,
+        tx: RingBuffer,
+        rx: RingBuffer,
+
+    ) -> None:
+        self._stream = stream
+        self._tx = tx
+        self._rx = rx
+        self._eof: bool = False
+        self._closed: bool = False
+
+    @property
+    def socket(self) -> trio.socket.SocketType:
+        return self._stream.socket
+
+    async def send_all(self, data: bytes | bytearray | memoryview) -> None:
+        if self._closed:
+            raise trio.ClosedResourceError('ring stream was closed')
+
+        view = memoryview(data)
+        backoff = self._min_backoff
+        while view:
+            n = self._tx.write(view)
+            if n:
+                view = view[n:]
+                backoff = self._min_backoff
+
+                # only signal the reader if it is blocked waiting on us
+                _fence()
+                if self._tx.parked:
+                    self._tx.parked = False
+                    await self._stream.send_all(b'\x01')
+            else:
+                # ring is full, wait on the reader to consume
+                await trio.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+
+        await trio.lowlevel.checkpoint()
+
+    async def wait_send_all_might_not_block(self) -> None:
+        await self._stream.wait_send_all_might_not_block()
+
+    async def receive_some(self, max_bytes: int | None = None) -> bytes:
+        if self._closed:
+            raise trio.ClosedResourceError('ring stream was closed')
+
+        max_bytes = max_bytes or self._rx.size
+        while True:
+            data = self._rx.read(max_bytes)
+            if data:
+                await trio.lowlevel.checkpoint()
+                return data
+
+            if self._eof:
+                return b''
+
+            # park and re-check to avoid racing a concurrent write
+            self._rx.parked = True
+            _fence()
+            if self._rx.readable():
+                self._rx.parked = False
+                continue
+
+            wakeup = await self._stream.receive_some(2**10)
+            if wakeup == b'':
+                # peer closed the control connection
+                self._eof = True
+
+            self._rx.parked = False
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        try:
+            await self._stream.aclose()
+        finally:
+            self._tx.close()
+            self._rx.close()
+
+
+class MsgpackShmStream(MsgpackTCPStream):
+    '''
+    A ``msgpack`` framed message transport over shared memory rings.
+
+    The framing and codec are identical to ``MsgpackTCPStream``; only
+    the underlying byte stream is swapped for a ``RingBufferStream``.
+
+    '''
+
+
+def get_shm_caps(
+    want_shm: bool,
+
+) -> dict[str, Any]:
+    '''
+    Return the transport capabilities advertised in the initial channel
+    handshake.
+
+    '''
+    return {
+        'hostname': socket.gethostname(),
+        'shm': _has_shm and want_shm,
+    }
+
+
+def can_upgrade_to_shm(
+    local_caps: dict[str, Any],
+    peer_caps: dict[str, Any],
+
+) -> bool:
+    '''
+    Predicate for whether both ends of a channel want a shared memory
+    transport and are (apparently) on the same host.
+
+    '''
+    return bool(
+        local_caps['shm']
+        and peer_caps.get('shm')
+        and peer_caps.get('hostname') == local_caps['hostname']
+    )
+
+
+async def maybe_upgrade_to_shm(
+    chan: Channel,
+    ring_size: int = _default_ring_size,
+
+) -> bool:
+    '''
+    Conduct the shared memory transport negotiation for ``chan`` after
+    the initial (uid) handshake and, if successful, swap the channel's
+    msg transport for a ``MsgpackShmStream``.
+
+    The connecting side allocates both rings and offers them to the
+    accepting side which attaches and acks; if anything fails the
+    channel simply remains on its socket transport.
+
+    '''
+    assert chan.msgstream
+    stream = chan.msgstream.stream
+
+    if not chan._accepted:
+        try:
+            tx = RingBuffer.create(ring_size)
+            rx = RingBuffer.create(ring_size)
+        except OSError:
+            log.exception('Failed to allocate shm rings?')
+            await chan.send({'shm': None})
+            # drain the peer's (necessarily negative) response
+            await chan.recv()
+            return False
+
+        await chan.send({
+            'shm': {
+                # named from the accepting side's perspective
+                'rx': tx.name,
+                'tx': rx.name,
+                'size': ring_size,
+            }
+        })
+        resp = await chan.recv()
+
+        # the peer has attached (or failed to) so the names are no
+        # longer needed; the mappings stay valid until closed.
+        tx.unlink()
+        rx.unlink()
+
+        if resp.get('shm') != 'ok':
+            tx.close()
+            rx.close()
+            return False
+
+    else:
+        msg = await chan.recv()
+        offer = msg.get('shm')
+        if not offer:
+            await chan.send({'shm': None})
+            return False
+
+        try:
+            rx = RingBuffer.attach(offer['rx'], offer['size'])
+            tx = RingBuffer.attach(offer['tx'], offer['size'])
+        except OSError:
+            log.exception('Failed to attach to shm rings?')
+            await chan.send({'shm': None})
+            return False
+
+        await chan.send({'shm': 'ok'})
+
+    chan.msgstream = MsgpackShmStream(
+        RingBufferStream(stream, tx, rx),  # type: ignore
+    )
+    log.transport(  # type: ignore
+        f'Upgraded {chan.uid} channel to shm transport'
+    )
+    return True
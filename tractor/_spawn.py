@@ -350,6 +350,11 @@ async def trio_proc(
             "--loglevel",
             subactor.loglevel
         ]
+    if subactor._msg_transport:
+        spawn_cmd += [
+            "--msg_transport",
+            subactor._msg_transport
+        ]
     # Tell child to run in guest mode on top of ``asyncio`` loop
     if infect_asyncio:
         spawn_cmd.append("--asyncio")
@@ -405,6 +410,9 @@ async def trio_proc(
             "bind_host": bind_addr[0],
             "bind_port": bind_addr[1],
             "_runtime_vars": _runtime_vars,
+            "rpc_concurrency": subactor.rpc_concurrency,
+            "rpc_queue_size": subactor.rpc_queue_size,
+            "rpc_priorities": subactor.rpc_priorities,
         })
 
         # track subactor in current nursery
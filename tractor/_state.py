@@ -32,7 +32,13 @@ _current_actor: Optional['Actor'] = None  # type: ignore # noqa
 _runtime_vars: dict[str, Any] = {
     '_debug_mode': False,
     '_is_root': False,
-    '_root_mailbox': (None, None)
+    '_root_mailbox': (None, None),
+    # preferred IPC transport for connections between actors
+    # on the same host: one of ``'tcp'``, ``'uds'`` or ``'shm'``.
+    '_msg_transport': 'tcp',
+    # frame compression codecs (in order of preference) this actor
+    # requests for its channels, see ``tractor.msg.register_codec()``.
+    '_compression': [],
 }
 
 
@@ -19,23 +19,46 @@ Message stream types and APIs.
 
 """
 from __future__ import annotations
+from collections import deque
 import inspect
+import math
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from functools import partial
 from typing import (
     Any,
     Optional,
     Callable,
     AsyncGenerator,
-    AsyncIterator
+    AsyncIterator,
+    Iterable,
 )
 
 import warnings
 
 import trio
 
-from ._ipc import Channel
-from ._exceptions import unpack_error, ContextCancelled
+from ._ipc import (
+    Channel,
+    SendQueue,
+    SendQueueStats,
+)
+from ._exceptions import (
+    unpack_error,
+    ContextCancelled,
+    MessagingError,
+    TransportClosed,
+)
+from .msg import (
+    Msg,
+    Started,
+    Yield,
+    YieldBatch,
+    Stop,
+    Credit,
+    Return,
+    Error,
+)
 from ._state import current_actor
 from .log import get_logger
 from .trionics import broadcast_receiver, BroadcastReceiver
@@ -43,6 +66,22 @@ from .trionics import broadcast_receiver, BroadcastReceiver
 
 log = get_logger(__name__)
 
+# send queue size used when ``MsgStream.send_nowait()`` is called on
+# a stream opened without an explicit ``send_buffer_size``.
+_default_send_buffer_size: int = 2**6
+
+# max seconds ``MsgStream.aclose()`` waits for queued msgs to be
+# written before sending the stop anyway.
+_send_flush_timeout: float = 3
+
+
+def _latest(value: Any) -> None:
+    '''
+    Conflation key func of the "latest value" (wholesale) mode.
+
+    '''
+    return None
+
 
 # TODO: the list
 # - generic typing like trio's receive channel but with msgspec
@@ -83,10 +122,37 @@ class MsgStream(trio.abc.Channel):
         self._eoc: bool = False
         self._closed: bool = False
 
+        # set if msgs are sent through a (bounded) queue drained by
+        # the channel's writer task, see ``.open_send_queue()``.
+        self._send_q: Optional[SendQueue] = None
+
+        # the not yet consumed values of a received ``YieldBatch`` and
+        # any non-value msg pulled while draining the feeder mem chan
+        # in ``.receive_batch()``, to be processed by the next receive.
+        self._pending: deque[Any] = deque()
+        self._stashed: Optional[Msg] = None
+
     # delegate directly to underlying mem channel
     def receive_nowait(self):
-        msg = self._rx_chan.receive_nowait()
-        return msg['yield']
+        if self._pending:
+            return self._pending.popleft()
+
+        if self._stashed is not None:
+            msg, self._stashed = self._stashed, None
+        else:
+            msg = self._rx_chan.receive_nowait()
+
+        if isinstance(msg, Yield):
+            self._ctx._consumed_msg(msg)
+            return msg.pld
+
+        if isinstance(msg, YieldBatch):
+            self._ctx._consumed_msg(msg)
+            self._pending.extend(msg.plds)
+            return self._pending.popleft()
+
+        raise MessagingError(
+            f'Expected a `Yield` msg but received:\n{msg}')
 
     async def receive(self):
         '''Async receive a single msg from the IPC transport, the next
@@ -101,24 +167,29 @@ class MsgStream(trio.abc.Channel):
         if self._closed:
             raise trio.ClosedResourceError('This stream was closed')
 
+        if self._pending:
+            return self._pending.popleft()
+
         try:
-            msg = await self._rx_chan.receive()
-            return msg['yield']
+            if self._stashed is not None:
+                msg, self._stashed = self._stashed, None
+            else:
+                msg = await self._rx_chan.receive()
 
-        except KeyError as err:
-            # internal error should never get here
-            assert msg.get('cid'), ("Received internal error at portal?")
+            if isinstance(msg, Yield):
+                self._ctx._consumed_msg(msg)
+                return msg.pld
 
-            # TODO: handle 2 cases with 3.10 match syntax
-            # - 'stop'
-            # - 'error'
-            # possibly just handle msg['stop'] here!
+            if isinstance(msg, YieldBatch):
+                self._ctx._consumed_msg(msg)
+                self._pending.extend(msg.plds)
+                return self._pending.popleft()
 
             if self._closed:
                 raise trio.ClosedResourceError('This stream was closed')
 
-            if msg.get('stop') or self._eoc:
-                log.debug(f"{self} was stopped at remote end")
+            if isinstance(msg, Stop) or self._eoc:
+                log.debug("%s was stopped at remote end", self)
 
                 # XXX: important to set so that a new ``.receive()``
                 # call (likely by another task using a broadcast receiver)
@@ -133,15 +204,16 @@ class MsgStream(trio.abc.Channel):
                 # XXX: this causes ``ReceiveChannel.__anext__()`` to
                 # raise a ``StopAsyncIteration`` **and** in our catch
                 # block below it will trigger ``.aclose()``.
-                raise trio.EndOfChannel from err
+                raise trio.EndOfChannel
 
             # TODO: test that shows stream raising an expected error!!!
-            elif msg.get('error'):
+            elif isinstance(msg, Error):
                 # raise the error message
                 raise unpack_error(msg, self._ctx.chan)
 
             else:
-                raise
+                raise MessagingError(
+                    f'Stream received an unexpected msg:\n{msg}')
 
         except (
             trio.ClosedResourceError,  # by self._rx_chan
@@ -177,6 +249,69 @@ class MsgStream(trio.abc.Channel):
 
             raise  # propagate
 
+    async def receive_batch(
+        self,
+        max_items: Optional[int] = None,
+
+    ) -> list[Any]:
+        '''
+        Receive the next value(s) in sequence: wait for at least one
+        and then take all those already buffered, up to ``max_items``.
+
+        End of stream and errors are raised (as for ``.receive()``)
+        only once the values received ahead of them are consumed.
+
+        On a stream with (broadcast) subscribers only a single value is
+        returned per call.
+
+        '''
+        if max_items is not None and max_items < 1:
+            raise ValueError('`max_items` must be at least 1')
+
+        items = [await self.receive()]
+        if self._broadcaster is not None:
+            return items
+
+        limit = float('inf') if max_items is None else max_items
+        pending = self._pending
+        while len(items) < limit:
+            if pending:
+                items.append(pending.popleft())
+                continue
+
+            if self._stashed is not None:
+                break
+
+            try:
+                msg = self._rx_chan.receive_nowait()
+            except (
+                trio.WouldBlock,
+                trio.ClosedResourceError,
+                trio.EndOfChannel,
+            ):
+                # left to (and raised by) the next ``.receive()``
+                break
+
+            if isinstance(msg, Yield):
+                items.append(msg.pld)
+            elif isinstance(msg, YieldBatch):
+                pending.extend(msg.plds)
+            else:
+                self._stashed = msg
+                break
+
+            self._ctx._consumed_msg(msg)
+
+        return items
+
+    async def receive_many(self) -> list[Any]:
+        '''
+        Receive all values currently buffered, waiting for at least
+        one, see ``.receive_batch()``.
+
+        '''
+        return await self.receive_batch()
+
     async def aclose(self):
         '''
         Cancel associated remote actor task and local memory channel on
@@ -188,7 +323,7 @@ class MsgStream(trio.abc.Channel):
         rx_chan = self._rx_chan
 
         if rx_chan._closed:
-            log.cancel(f"{self} is already closed")
+            log.cancel("%s is already closed", self)
 
             # this stream has already been closed so silently succeed as
             # per ``trio.AsyncResource`` semantics.
@@ -221,6 +356,18 @@ class MsgStream(trio.abc.Channel):
             # will try to re-use a stream after attemping to close
             # it).
             with trio.CancelScope(shield=True):
+                # deliver any still queued msgs ahead of the stop,
+                # but don't let a stalled peer hang teardown.
+                if self._send_q:
+                    with trio.move_on_after(_send_flush_timeout):
+                        await self._send_q.flush()
+
+                    if self._send_q.stats.depth:
+                        log.warning(
+                            f'Dropping {self._send_q.stats.depth} '
+                            f'unsent msgs for stream {self._ctx.cid}'
+                        )
+
                 await self._ctx.send_stop()
 
         except (
@@ -237,6 +384,10 @@ class MsgStream(trio.abc.Channel):
                 f'ctx id: {ctx.cid}'
             )
 
+        finally:
+            if self._send_q:
+                self._ctx.chan.close_send_queue(self._ctx.cid)
+
         self._closed = True
 
         # Do we close the local mem chan ``self._rx_chan`` ??!?
@@ -327,21 +478,147 @@ class MsgStream(trio.abc.Channel):
 
             yield bstream
 
-    async def send(
+    def open_send_queue(
         self,
-        data: Any
-    ) -> None:
+        maxlen: int = _default_send_buffer_size,
+        overflow: str = 'block',
+        conflate: Optional[Callable[[Any], Any]] = None,
+
+    ) -> SendQueue:
         '''
-        Send a message over this stream to the far end.
+        Switch this stream to sending through a bounded, per-context
+        queue drained by the channel's writer task such that sends
+        never wait on the transport (and so other contexts' traffic).
+
+        See ``tractor._ipc.SendQueue`` for the ``overflow`` policies
+        and ``conflate`` key func.
+
+        '''
+        if self._send_q is None:
+            actor = current_actor()
+            assert actor._service_n
+            self._send_q = self._ctx.chan.open_send_queue(
+                self._ctx.cid,
+                actor._service_n,
+                maxlen,
+                overflow=overflow,
+                conflate=conflate,
+            )
+        return self._send_q
+
+    @property
+    def send_stats(self) -> Optional[SendQueueStats]:
+        '''
+        Stats for this stream's send queue, if one was opened.
 
         '''
+        return self._send_q.stats if self._send_q else None
+
+    def _check_can_send(self) -> None:
         if self._ctx._error:
             raise self._ctx._error  # from None
 
         if self._closed:
             raise trio.ClosedResourceError('This stream was already closed')
 
-        await self._ctx.chan.send({'yield': data, 'cid': self._ctx.cid})
+    def send_nowait(
+        self,
+        data: Any,
+    ) -> None:
+        '''
+        Queue a message to be sent over this stream without blocking,
+        opening a default send queue if the stream doesn't have one.
+
+        Raises ``trio.WouldBlock`` (or ``StreamOverrun`` under the
+        ``'raise'`` policy) if the queue is full or, on a flow
+        controlled stream, the far end hasn't granted any credit.
+
+        '''
+        self._check_can_send()
+        send_q = self.open_send_queue()
+        ctx = self._ctx
+        if ctx._flow_control:
+            if ctx._send_credits < 1:
+                raise trio.WouldBlock
+
+            if send_q.send_nowait(Yield(cid=ctx.cid, pld=data)):
+                ctx._send_credits -= 1
+
+        elif send_q.send_nowait(Yield(cid=ctx.cid, pld=data)):
+            ctx._sent_uncredited += 1
+
+    async def send(
+        self,
+        data: Any
+    ) -> None:
+        '''
+        Send a message over this stream to the far end.
+
+        If the stream has a send queue the message is only queued;
+        waiting for space if the queue is full under its ``'block'``
+        overflow policy.
+
+        On a flow controlled stream this first waits for credit from
+        the far end.
+
+        '''
+        self._check_can_send()
+        ctx = self._ctx
+        if ctx._flow_control:
+            await ctx._acquire_credit()
+        else:
+            ctx._sent_uncredited += 1
+
+        msg = Yield(cid=ctx.cid, pld=data)
+        if self._send_q:
+            if not await self._send_q.send(msg):
+                # conflated into a queued msg, refund the credit (or
+                # uncount it if flow control still isn't enabled).
+                if ctx._flow_control:
+                    ctx._grant_credit(1)
+                else:
+                    ctx._sent_uncredited -= 1
+        else:
+            await ctx.chan.send(msg)
+
+    async def send_batch(
+        self,
+        items: Iterable[Any],
+
+    ) -> None:
+        '''
+        Send a sequence of values to the far end in a single msg.
+
+        The values are received in order, one per ``.receive()``, or
+        (more efficiently) together using ``.receive_batch()``.
+
+        On a flow controlled stream each value takes a credit; the
+        values are split over as many msgs as needed to send them
+        with the credit available.
+
+        '''
+        self._check_can_send()
+
+        ctx = self._ctx
+        plds = list(items)
+        while plds:
+            n: int = len(plds)
+            if ctx._flow_control:
+                n = await ctx._acquire_credit(n)
+            else:
+                ctx._sent_uncredited += n
+
+            chunk, plds = plds[:n], plds[n:]
+            msg: Msg
+            if n == 1:
+                msg = Yield(cid=ctx.cid, pld=chunk[0])
+            else:
+                msg = YieldBatch(cid=ctx.cid, plds=chunk)
+
+            if self._send_q:
+                await self._send_q.send(msg)
+            else:
+                await ctx.chan.send(msg)
 
 
 @dataclass
@@ -364,7 +641,7 @@ class Context:
 
     '''
     chan: Channel
-    cid: str
+    cid: int
 
     # these are the "feeder" channels for delivering
     # message values to the local task from the runtime
@@ -392,6 +669,158 @@ class Context:
 
     _backpressure: bool = False
 
+    # credit based flow control state: the window of msgs granted to
+    # the far end, the number consumed since the last grant, the
+    # (remaining) credit granted to us by the far end and the number
+    # of stream msgs sent before flow control was enabled.
+    _flow_control: bool = False
+    _peer_flow_control: bool = False
+    _credit_window: int = 0
+    _consumed: int = 0
+    _send_credits: float = 0
+    _sent_uncredited: int = 0
+    _credit_granted: Optional[trio.Event] = None
+
+    # "latest value" mode: the key func for conflating received values
+    # and the table of those buffered (not yet consumed) by key.
+    _conflate: Optional[Callable[[Any], Any]] = None
+    _buffered: Optional[dict[Any, Yield]] = None
+
+    def _grant_credit(self, n: float) -> None:
+        '''
+        Add credit granted by the far end, waking any waiting sender.
+
+        '''
+        self._send_credits += n
+        if self._credit_granted:
+            self._credit_granted.set()
+            self._credit_granted = None
+
+    async def _acquire_credit(self, n: int = 1) -> int:
+        '''
+        Wait for credit from the far end and take up to ``n`` of it,
+        returning how much was taken.
+
+        '''
+        while self._send_credits < 1:
+            if self._credit_granted is None:
+                self._credit_granted = trio.Event()
+            await self._credit_granted.wait()
+
+        taken = int(min(n, self._send_credits))
+        self._send_credits -= taken
+        return taken
+
+    def _enable_flow_control(
+        self,
+        window: Optional[int] = None,
+
+    ) -> None:
+        '''
+        Pace this context's stream with credits, the far end being
+        granted ``window`` msgs (by default the size of our feeder mem
+        chan). The initial grant must be sent by the caller.
+
+        '''
+        self._flow_control = True
+        self._credit_window = (
+            window
+            or self._send_chan._state.max_buffer_size  # type: ignore
+        )
+        # the window bounds the number of stream msgs buffered,
+        # leave room for the (few) trailing control msgs.
+        self._send_chan._state.max_buffer_size = math.inf  # type: ignore
+
+        # any stream msgs already sent are credited back by the far
+        # end as consumed, so charge them to its grant.
+        self._send_credits -= self._sent_uncredited
+        self._sent_uncredited = 0
+
+    def _conflate_msg(
+        self,
+        msg: Yield,
+
+    ) -> bool:
+        '''
+        Replace the value of a buffered msg with the same key as that
+        of ``msg`` in place, returning whether there was one.
+
+        '''
+        assert self._conflate and self._buffered is not None
+        buffered = self._buffered.get(self._conflate(msg.pld))
+        if buffered is None:
+            return False
+
+        buffered.pld = msg.pld
+
+        # the replaced msg is never consumed by our task
+        self._return_credit()
+        return True
+
+    def _buffered_msg(
+        self,
+        msg: Msg,
+
+    ) -> None:
+        '''
+        Track a stream msg which was pushed to our feeder mem chan as
+        the one to conflate later values with the same key into.
+
+        '''
+        if (
+            self._buffered is not None
+            and type(msg) is Yield
+        ):
+            self._buffered[self._conflate(msg.pld)] = msg  # type: ignore
+
+    def _consumed_msg(
+        self,
+        msg: Msg,
+
+    ) -> None:
+        '''
+        Account for a stream msg consumed by the local task.
+
+        '''
+        if (
+            self._buffered
+            and type(msg) is Yield
+        ):
+            key = self._conflate(msg.pld)  # type: ignore
+            if self._buffered.get(key) is msg:
+                del self._buffered[key]
+
+        if type(msg) is YieldBatch:
+            self._return_credit(len(msg.plds))  # type: ignore
+        else:
+            self._return_credit()
+
+    def _return_credit(self, n: int = 1) -> None:
+        '''
+        Count ``n`` consumed values and, once half the window has
+        been, return the credit to the far end.
+
+        '''
+        if not self._flow_control:
+            return
+
+        self._consumed += n
+        if self._consumed >= max(1, self._credit_window // 2):
+            n, self._consumed = self._consumed, 0
+            actor = current_actor()
+            assert actor._service_n
+            actor._service_n.start_soon(self._send_credit, n)
+
+    async def _send_credit(self, n: int) -> None:
+        try:
+            await self.chan.send(Credit(cid=self.cid, n=n))
+        except (
+            trio.BrokenResourceError,
+            trio.ClosedResourceError,
+            TransportClosed,
+        ):
+            log.runtime('Failed to send credit for %s', self.cid)
+
     async def send_yield(self, data: Any) -> None:
 
         warnings.warn(
@@ -400,14 +829,14 @@ class Context:
             DeprecationWarning,
             stacklevel=2,
         )
-        await self.chan.send({'yield': data, 'cid': self.cid})
+        await self.chan.send(Yield(cid=self.cid, pld=data))
 
     async def send_stop(self) -> None:
-        await self.chan.send({'stop': True, 'cid': self.cid})
+        await self.chan.send(Stop(cid=self.cid))
 
     async def _maybe_raise_from_remote_msg(
         self,
-        msg: dict[str, Any],
+        msg: Msg,
 
     ) -> None:
         '''
@@ -418,8 +847,7 @@ class Context:
         in the corresponding remote callee task.
 
         '''
-        error = msg.get('error')
-        if error:
+        if isinstance(msg, Error):
             # If this is an error message from a context opened by
             # ``Portal.open_context()`` we want to interrupt any ongoing
             # (child) tasks within that context to be notified of the remote
@@ -437,7 +865,7 @@ class Context:
             # of the call and result processing.
             log.error(
                 f'Remote context error for {self.chan.uid}:{self.cid}:\n'
-                f'{msg["error"]["tb_str"]}'
+                f'{msg.tb_str}'
             )
             error = unpack_error(msg, self.chan)
             if (
@@ -449,6 +877,18 @@ class Context:
                 # potentially override a real error
                 return
 
+            if self._error is not None:
+                # only the first remote error is relayed into the scope,
+                # any later ones (eg. a far end overrun caused by our
+                # teardown 'stop') would otherwise be raised alongside.
+                log.warning(
+                    f'Context {self.chan.uid}:{self.cid} already errored '
+                    f'with {self._error!r}\n'
+                    f'dropping later remote error {error!r}:\n'
+                    f'{msg.tb_str}'
+                )
+                return
+
             self._error = error
 
             # TODO: tempted to **not** do this by-reraising in a
@@ -537,6 +977,10 @@ class Context:
         self,
         backpressure: Optional[bool] = True,
         msg_buffer_size: Optional[int] = None,
+        send_buffer_size: Optional[int] = None,
+        overflow: str = 'block',
+        flow_control: bool = False,
+        conflate: bool | Callable[[Any], Any] = False,
 
     ) -> AsyncGenerator[MsgStream, None]:
         '''
@@ -557,6 +1001,28 @@ class Context:
               scope of the inter-actor task context due to the nature of
               ``trio``'s cancellation system.
 
+        Passing ``send_buffer_size`` opens the stream with a send queue
+        of that size and ``overflow`` policy, see
+        ``MsgStream.open_send_queue()``.
+
+        With ``flow_control`` sends are paced by credits: each end
+        grants the other a window of ``msg_buffer_size`` values,
+        replenished as its local task consumes them, and
+        ``MsgStream.send()`` waits for credit. The far end can thus
+        never overrun our buffer, and backpressure is applied to the
+        sending task only (never to the channel's msg loop);
+        ``backpressure`` is ignored. Enabling it on either end enables
+        it on both: the first grant from a flow controlled far end
+        switches our end over.
+
+        With ``conflate`` the stream only delivers the latest value per
+        key, computed by ``conflate`` if it's a callable, otherwise the
+        latest value: a value sent while one with the same key is
+        still queued to send or not yet received by the local task
+        replaces it in place. Sends always go through a send queue (of
+        ``send_buffer_size`` or a default size). ``send_batch()`` msgs
+        are not conflated.
+
         '''
         actor = current_actor()
 
@@ -591,6 +1057,16 @@ class Context:
         ctx._backpressure = backpressure
         assert ctx is self
 
+        if flow_control or self._peer_flow_control:
+            self._enable_flow_control(msg_buffer_size)
+            await self._send_credit(self._credit_window)
+
+        key: Optional[Callable[[Any], Any]] = None
+        if conflate:
+            key = conflate if callable(conflate) else _latest
+            self._conflate = key
+            self._buffered = {}
+
         # XXX: If the underlying channel feeder receive mem chan has
         # been closed then likely client code has already exited
         # a ``.open_stream()`` block prior or there was some other
@@ -605,6 +1081,13 @@ class Context:
             rx_chan=ctx._recv_chan,
         ) as stream:
 
+            if send_buffer_size or key:
+                stream.open_send_queue(
+                    send_buffer_size or _default_send_buffer_size,
+                    overflow=overflow,
+                    conflate=key,
+                )
+
             if self._portal:
                 self._portal._streams.add(stream)
 
@@ -651,27 +1134,28 @@ class Context:
                 while True:
 
                     msg = await self._recv_chan.receive()
-                    try:
-                        self._result = msg['return']
-                        break
-                    except KeyError as msgerr:
+                    match msg:
+                        case Return(pld=result):
+                            self._result = result
+                            break
 
-                        if 'yield' in msg:
+                        case Yield() | YieldBatch():
                             # far end task is still streaming to us so discard
-                            log.warning(f'Discarding stream delivered {msg}')
+                            log.warning("Discarding stream delivered %s", msg)
                             continue
 
-                        elif 'stop' in msg:
+                        case Stop():
                             log.debug('Remote stream terminated')
                             continue
 
-                        # internal error should never get here
-                        assert msg.get('cid'), (
-                            "Received internal error at portal?")
+                        case Error():
+                            raise unpack_error(msg, self._portal.channel)
 
-                        raise unpack_error(
-                            msg, self._portal.channel
-                        ) from msgerr
+                        case _:
+                            raise MessagingError(
+                                f'Context for {self.cid} was expecting a '
+                                f'`return` msg but received:\n{msg}'
+                            )
 
         return self._result
 
@@ -696,7 +1180,7 @@ class Context:
             raise RuntimeError(
                 f"called 'started' twice on context with {self.chan.uid}")
 
-        await self.chan.send({'started': value, 'cid': self.cid})
+        await self.chan.send(Started(cid=self.cid, pld=value))
         self._started_called = True
 
     # TODO: do we need a restart api?
@@ -753,3 +1237,45 @@ def context(func: Callable) -> Callable:
             f"{func.__name__} must be `ctx: tractor.Context`"
         )
     return func
+
+
+def rpc(
+    func: Optional[Callable] = None,
+    *,
+    inline: bool = False,
+    max_concurrency: Optional[int] = None,
+
+) -> Callable:
+    '''
+    Mark an async function as an RPC endpoint with ``@rpc`` (or
+    ``@rpc(inline=True)``).
+
+    An ``inline`` endpoint is run directly in the callee's msg loop,
+    instead of in a newly spawned task, when called via
+    ``Portal.run()``. It should be short and never block on IPC;
+    a call which overruns ``Actor.inline_budget`` is aborted at its
+    next checkpoint and run again in a task, as are all later calls.
+
+    ``max_concurrency`` bounds the number of tasks running the
+    function at once; further requests are queued by the actor's
+    admission control (see ``Actor.rpc_queue_size``).
+
+    '''
+    if func is None:
+        return partial(
+            rpc,
+            inline=inline,
+            max_concurrency=max_concurrency,
+        )
+
+    if max_concurrency is not None:
+        func._tractor_max_concurrency = max_concurrency  # type: ignore
+
+    if inline:
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(
+                f'Inline endpoint {func.__name__} must be an async function'
+            )
+        func._tractor_inline_function = True  # type: ignore
+
+    return func
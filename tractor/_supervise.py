@@ -84,6 +84,7 @@ class ActorNursery:
         ria_nursery: trio.Nursery,
         da_nursery: trio.Nursery,
         errors: dict[tuple[str, str], BaseException],
+        msg_transport: str | None = None,
     ) -> None:
         # self.supervisor = supervisor  # TODO
         self._actor: Actor = actor
@@ -106,6 +107,13 @@ class ActorNursery:
         self.errors = errors
         self.exited = trio.Event()
 
+        # preferred transport for channels to children spawned by this
+        # nursery, defaults to the runtime-wide setting.
+        self._msg_transport: str = (
+            msg_transport
+            or _state._runtime_vars['_msg_transport']
+        )
+
     async def start_actor(
         self,
         name: str,
@@ -117,11 +125,20 @@ class ActorNursery:
         nursery: trio.Nursery | None = None,
         debug_mode: Optional[bool] | None = None,
         infect_asyncio: bool = False,
+        rpc_concurrency: int | None = None,
+        rpc_queue_size: int | None = None,
+        rpc_priorities: dict[str, int] | None = None,
     ) -> Portal:
         '''
         Start a (daemon) actor: an process that has no designated
         "main task" besides the runtime.
 
+        ``rpc_concurrency`` bounds the number of rpc tasks the child
+        runs at once; excess requests wait in a queue of at most
+        ``rpc_queue_size`` entries, ordered by the per caller (actor
+        name) ``rpc_priorities`` (lower first), after which callers
+        receive an ``Overloaded`` error.
+
         '''
         loglevel = loglevel or self._actor.loglevel or get_loglevel()
 
@@ -134,6 +151,9 @@ class ActorNursery:
             _rtv['_debug_mode'] = debug_mode
             self._at_least_one_child_in_debug = True
 
+        # children inherit this nursery's transport preference
+        _rtv['_msg_transport'] = self._msg_transport
+
         enable_modules = enable_modules or []
 
         if rpc_module_paths:
@@ -151,8 +171,22 @@ class ActorNursery:
             enable_modules=enable_modules,
             loglevel=loglevel,
             arbiter_addr=current_actor()._arb_addr,
+            msg_transport=self._msg_transport,
         )
-        parent_addr = self._actor.accept_addr
+        if rpc_concurrency is not None:
+            subactor.rpc_concurrency = rpc_concurrency
+        if rpc_queue_size is not None:
+            subactor.rpc_queue_size = rpc_queue_size
+        if rpc_priorities is not None:
+            subactor.rpc_priorities = rpc_priorities
+
+        parent_addr: tuple[str, int] | tuple[str] | None = None
+        if self._msg_transport == 'uds':
+            # the child is always spawned on this host so connect back
+            # over our UDS channel server.
+            parent_addr = self._actor.uds_addr
+
+        parent_addr = parent_addr or self._actor.accept_addr
         assert parent_addr
 
         # start a task to spawn a process
@@ -298,6 +332,7 @@ class ActorNursery:
 @acm
 async def _open_and_supervise_one_cancels_all_nursery(
     actor: Actor,
+    msg_transport: str | None = None,
 
 ) -> typing.AsyncGenerator[ActorNursery, None]:
 
@@ -331,7 +366,8 @@ async def _open_and_supervise_one_cancels_all_nursery(
                     actor,
                     ria_nursery,
                     da_nursery,
-                    errors
+                    errors,
+                    msg_transport=msg_transport,
                 )
                 try:
                     # spawning of actors happens in the caller's scope
@@ -447,6 +483,11 @@ async def _open_and_supervise_one_cancels_all_nursery(
 
 @acm
 async def open_nursery(
+    *,
+    # preferred transport for channels to spawned children, one of
+    # ``'tcp'``, ``'uds'`` or ``'shm'``; defaults to the runtime-wide
+    # setting.
+    msg_transport: str | None = None,
     **kwargs,
 
 ) -> typing.AsyncGenerator[ActorNursery, None]:
@@ -479,12 +520,16 @@ async def open_nursery(
             # mark us for teardown on exit
             implicit_runtime = True
 
+            if msg_transport is not None:
+                kwargs['msg_transport'] = msg_transport
+
             async with open_root_actor(**kwargs) as actor:
                 assert actor is current_actor()
 
                 try:
                     async with _open_and_supervise_one_cancels_all_nursery(
-                        actor
+                        actor,
+                        msg_transport=msg_transport,
                     ) as anursery:
                         yield anursery
                 finally:
@@ -494,7 +539,8 @@ async def open_nursery(
 
             try:
                 async with _open_and_supervise_one_cancels_all_nursery(
-                    actor
+                    actor,
+                    msg_transport=msg_transport,
                 ) as anursery:
                     yield anursery
             finally:
@@ -73,41 +73,59 @@ BOLD_PALETTE = {
 }
 
 
-# TODO: this isn't showing the correct '{filename}'
-# as it did before..
 class StackLevelAdapter(logging.LoggerAdapter):
+    '''
+    Logger adapter with methods for our custom levels.
+
+    Like the stdlib methods, these accept ``%``-style ``args`` which are
+    only interpolated (and their ``repr()``s taken) if a record is
+    actually emitted; use them instead of f-strings in hot paths, eg.
+    ``log.runtime('Delivering %s to %s', msg, cid)``.
 
+    '''
     def transport(
         self,
         msg: str,
+        *args,
 
     ) -> None:
-        return self.log(5, msg)
+        # level check inlined (rather than via ``.log()``) to keep
+        # the disabled case as cheap as possible in hot paths
+        if self.logger.isEnabledFor(5):
+            self._log(5, msg, args)
 
     def runtime(
         self,
         msg: str,
+        *args,
     ) -> None:
-        return self.log(15, msg)
+        if self.logger.isEnabledFor(15):
+            self._log(15, msg, args)
 
     def cancel(
         self,
         msg: str,
+        *args,
     ) -> None:
-        return self.log(16, msg)
+        if self.logger.isEnabledFor(16):
+            self._log(16, msg, args)
 
     def pdb(
         self,
         msg: str,
+        *args,
     ) -> None:
-        return self.log(500, msg)
+        if self.logger.isEnabledFor(500):
+            self._log(500, msg, args)
 
     def log(self, level, msg, *args, **kwargs):
         """
         Delegate a log call to the underlying logger, after adding
         contextual information from this adapter instance.
         """
-        if self.isEnabledFor(level):
+        # check the underlying logger's (cached) level directly,
+        # ``LoggerAdapter.isEnabledFor()`` is just an extra call layer
+        if self.logger.isEnabledFor(level):
             # msg, kwargs = self.process(msg, kwargs)
             self._log(level, msg, args, **kwargs)
 
@@ -43,7 +43,18 @@ Built-in messaging patterns, types, APIs and helpers.
 # - https://github.com/msgpack/msgpack-python#packingunpacking-of-custom-data-type
 
 from __future__ import annotations
+from functools import partial
+import lzma
 from pkgutil import resolve_name
+from typing import (
+    Any,
+    Callable,
+    Optional,
+    Union,
+)
+import zlib
+
+import msgspec
 
 
 class NamespacePath(str):
@@ -78,3 +89,304 @@ class NamespacePath(str):
             (ref.__module__,
              getattr(ref, '__name__', ''))
         ))
+
+
+# The runtime's IPC wire protocol: every msg exchanged between actor
+# runtimes (after connection) is one of the below tagged structs which
+# are encoded as (compact) msgpack arrays of the form ``[tag, *fields]``
+# such that a (single) decoder can dispatch on the tag instead of the
+# receiver probing dict keys.
+class Msg(
+    msgspec.Struct,
+    array_like=True,
+):
+    '''
+    Base type for all runtime protocol msgs.
+
+    '''
+
+
+class Handshake(Msg, tag='handshake'):
+    '''
+    First msg sent by both sides of a new channel.
+
+    '''
+    uid: tuple[str, str]
+    caps: dict[str, Any] = {}
+
+
+class Cmd(Msg, tag='cmd'):
+    '''
+    Request to start a remote task-as-function.
+
+    If the caller sets ``expect`` the callee validates the function
+    type against it (replying with an error on mismatch) and, for an
+    ``'asyncfunc'`` or ``'context'``, elides the leading ``FuncType``
+    response such that the first msg is the ``Return`` or ``Started``
+    (or ``Error``).
+
+    '''
+    cid: int
+    ns: str
+    func: str
+    kwargs: dict[str, Any]
+    uid: tuple[str, str]
+    expect: Optional[str] = None
+
+
+class FuncType(Msg, tag='functype'):
+    '''
+    First response to a ``Cmd`` indicating the kind of the invoked
+    function: one of ``'asyncfunc'``, ``'asyncgen'`` or ``'context'``.
+
+    '''
+    cid: int
+    functype: str
+
+
+class Started(Msg, tag='started'):
+    cid: int
+    pld: Any = None
+
+
+class Yield(Msg, tag='yield'):
+    cid: int
+    pld: Any = None
+
+
+class YieldBatch(Msg, tag='yields'):
+    '''
+    A sequence of stream values sent in a single msg, see
+    ``MsgStream.send_batch()``.
+
+    '''
+    cid: int
+    plds: list[Any] = []
+
+
+class Stop(Msg, tag='stop'):
+    cid: int
+
+
+class Credit(Msg, tag='credit'):
+    '''
+    Grant of ``n`` more (stream value) msgs the receiving end of
+    a flow controlled stream may send, see
+    ``Context.open_stream(flow_control=True)``.
+
+    '''
+    cid: int
+    n: int
+
+
+class Return(Msg, tag='return'):
+    cid: int
+    pld: Any = None
+
+
+class Error(Msg, tag='error'):
+    '''
+    A boxed remote error; a null ``cid`` indicates an "internal"
+    (non-RPC task) error of the sending actor's runtime.
+
+    '''
+    type_str: str
+    tb_str: str = ''
+    cid: Optional[int] = None
+
+
+_msg_types: tuple[type[Msg], ...] = (
+    Handshake,
+    Cmd,
+    FuncType,
+    Started,
+    Yield,
+    YieldBatch,
+    Stop,
+    Credit,
+    Return,
+    Error,
+)
+
+# the type decoded from every received frame: besides the protocol
+# msgs above a channel may only carry plain ``dict`` payloads (eg. the
+# spawn time parent data) and ``None`` (the msg loop terminate
+# sentinel).
+WireMsg = Union[_msg_types + (dict[str, Any], None)]  # type: ignore
+
+
+# runtime methods whose (request) msgs are "control" traffic
+_control_funcs: frozenset[str] = frozenset({
+    'cancel',
+    '_cancel_task',
+})
+
+
+def is_control_msg(msg: Any) -> bool:
+    '''
+    Predicate for whether ``msg`` is runtime control traffic (cancel
+    requests, stream stops, flow control credits and errors) which
+    transports should send ahead of any pending bulk (eg. ``Yield``)
+    msgs.
+
+    '''
+    match msg:
+        case Stop() | Credit() | Error():
+            return True
+        case Cmd(ns='self', func=func):
+            return func in _control_funcs
+
+    return False
+
+
+# Frame (payload) compression codecs available for negotiation between
+# actors, keyed by name: ``(compress, decompress)`` pairs of functions
+# which each accept a bytes-like and return ``bytes``.
+_codecs: dict[
+    str,
+    tuple[
+        Callable[[bytes | memoryview], bytes],
+        Callable[[bytes | memoryview], bytes],
+    ],
+] = {
+    # favour speed over ratio since this is on the (hot) send path
+    'zlib': (partial(zlib.compress, level=1), zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+
+def register_codec(
+    name: str,
+    compress: Callable[[bytes | memoryview], bytes],
+    decompress: Callable[[bytes | memoryview], bytes],
+
+) -> None:
+    '''
+    Register a (non-stdlib) frame compression codec under ``name``.
+
+    The codec can only be negotiated for channels between actors which
+    have both registered it (under the same name) before connecting.
+
+    '''
+    _codecs[name] = (compress, decompress)
+
+
+def get_codec(
+    name: str,
+
+) -> tuple[
+    Callable[[bytes | memoryview], bytes],
+    Callable[[bytes | memoryview], bytes],
+]:
+    return _codecs[name]
+
+
+class OOBBuffer:
+    '''
+    Wrapper marking a bytes-like (buffer protocol supporting) object
+    for "out-of-band" transfer, much like ``pickle.PickleBuffer``.
+
+    Instead of being copied into the encoded msg the wrapped memory is
+    written directly to the transport after the frame's (inline) msg
+    and the receiver is delivered a ``memoryview`` of the buffer which
+    it was received into. Buffers smaller than the transport's
+    ``oob_threshold`` are still copied into the msg.
+
+    '''
+    __slots__ = ('buf',)
+
+    def __init__(self, buf: Any) -> None:
+        self.buf = buf
+
+    def raw(self) -> memoryview:
+        return memoryview(self.buf).cast('B')
+
+
+# Out-of-band buffer (ext) type hooks keyed by type (or its fully
+# qualified name for lazily imported libs): a ``(kind, to_buffer,
+# from_buffer)`` triple where ``to_buffer(obj)`` returns a ``(buffer,
+# meta)`` pair and ``from_buffer(memoryview, meta)`` rebuilds an object
+# from its received memory.
+_oob_types: dict[
+    type | str,
+    tuple[
+        str,
+        Callable[[Any], tuple[Any, Any]],
+        Callable[[memoryview, Any], Any],
+    ],
+] = {}
+_oob_kinds: dict[str, Callable[[memoryview, Any], Any]] = {}
+
+
+def register_oob_type(
+    typ: type | str,
+    to_buffer: Callable[[Any], tuple[Any, Any]],
+    from_buffer: Callable[[memoryview, Any], Any],
+    kind: Optional[str] = None,
+
+) -> None:
+    '''
+    Register encode/decode hooks for transferring objects of type
+    ``typ`` as out-of-band buffers.
+
+    ``typ`` may be given as a fully qualified name (eg.
+    ``'numpy.ndarray'``) to avoid importing its lib up front. The
+    ``meta`` returned by ``to_buffer()`` must itself be msgpack
+    serializable. Both actors must register the same ``kind`` (which
+    defaults to the type's name).
+
+    '''
+    if kind is None:
+        kind = typ if isinstance(typ, str) else (
+            f'{typ.__module__}.{typ.__qualname__}'
+        )
+    _oob_types[typ] = (kind, to_buffer, from_buffer)
+    _oob_kinds[kind] = from_buffer
+
+
+def get_oob_type(
+    obj: Any,
+
+) -> Optional[tuple[
+    str,
+    Callable[[Any], tuple[Any, Any]],
+    Callable[[memoryview, Any], Any],
+]]:
+    typ = type(obj)
+    entry = _oob_types.get(typ)
+    if entry is None:
+        entry = _oob_types.get(f'{typ.__module__}.{typ.__qualname__}')
+    return entry
+
+
+def _ndarray_to_buffer(arr) -> tuple[Any, Any]:
+    import numpy as np
+    arr = np.ascontiguousarray(arr)
+    return (
+        arr.reshape(-1).view(np.uint8),
+        (np.lib.format.dtype_to_descr(arr.dtype), arr.shape),
+    )
+
+
+def _ndarray_from_buffer(buf: memoryview, meta: Any):
+    import numpy as np
+    descr, shape = meta
+    if isinstance(descr, list):
+        # structured dtypes are described by lists of tuples
+        descr = [tuple(field) for field in descr]
+
+    dtype = np.lib.format.descr_to_dtype(descr)
+    return np.frombuffer(buf, dtype=dtype).reshape(shape)
+
+
+register_oob_type(
+    OOBBuffer,
+    lambda obj: (obj.raw(), None),
+    lambda buf, meta: buf,
+    kind='buffer',
+)
+register_oob_type(
+    'numpy.ndarray',
+    _ndarray_to_buffer,
+    _ndarray_from_buffer,
+)